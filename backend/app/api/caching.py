@@ -0,0 +1,102 @@
+"""
+HTTP caching helpers - strong ETags and conditional GET for cached payloads
+"""
+import hashlib
+from typing import Dict, Optional
+
+from fastapi import Request, Response
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Clients may store payloads but must revalidate them on every use
+REVALIDATE = "no-cache"
+
+# Versioned URLs (?v=<data_version>) name a body that never changes
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+def make_etag(body: bytes) -> str:
+    """Strong ETag for a response body"""
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Whether the request's If-None-Match covers this ETag"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [candidate.strip() for candidate in header.split(",")]
+    # If-None-Match uses weak comparison
+    return "*" in candidates or any(
+        candidate.removeprefix("W/") == etag for candidate in candidates
+    )
+
+
+def cache_headers(etag: str, immutable: bool = False) -> Dict[str, str]:
+    """ETag and Cache-Control headers for a cacheable resource (immutable: served at a versioned URL)"""
+    return {"ETag": etag, "Cache-Control": IMMUTABLE if immutable else REVALIDATE}
+
+
+def not_modified(headers: Dict[str, str]) -> Response:
+    """304 answer carrying the resource's cache headers"""
+    return Response(status_code=304, headers=headers)
+
+
+def cached_json_response(
+    request: Request,
+    body: bytes,
+    immutable: bool = False,
+    extra_headers: Optional[Dict[str, str]] = None
+) -> Response:
+    """
+    Answer with a serialized JSON body, or 304 if the client already has it
+
+    Cache-Control: no-cache lets clients store the body but makes them
+    revalidate it with If-None-Match on every use; immutable bodies (versioned
+    URLs) may be kept and reused for a year without asking.
+    """
+    etag = make_etag(body)
+    headers = {**cache_headers(etag, immutable), **(extra_headers or {})}
+    if etag_matches(request, etag):
+        return not_modified(headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+class EncodedETagMiddleware:
+    """
+    Keep ETags correct for content-encoded responses (install outside GZipMiddleware)
+    
+    ETags are computed from the identity body. When the body was compressed on
+    the way out, the ETag is made weak, since the bytes sent differ from the
+    ones it names; a 304 repeats the weak form if that is what the client
+    holds. Every response with an ETag, 304s included, gets
+    Vary: Accept-Encoding so shared caches keep the representations apart.
+    If-None-Match still matches either form (weak comparison).
+    """
+    
+    def __init__(self, app: ASGIApp):
+        self.app = app
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        if_none_match = Headers(scope=scope).get("if-none-match", "")
+        
+        async def send_with_etag(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(raw=message["headers"])
+                etag = headers.get("etag")
+                if etag is not None and not etag.startswith("W/"):
+                    held = message["status"] == 304 and "W/" + etag in (
+                        candidate.strip() for candidate in if_none_match.split(",")
+                    )
+                    if "content-encoding" in headers or held:
+                        headers["ETag"] = "W/" + etag
+                if etag is not None:
+                    if "accept-encoding" not in headers.get("vary", "").lower():
+                        headers.add_vary_header("Accept-Encoding")
+            await send(message)
+        
+        await self.app(scope, receive, send_with_etag)
@@ -1,16 +1,19 @@
 """
 Experiments API routes
 """
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import datetime
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
 from app.db.database import get_db
 from app.repositories.experiment_repository import ExperimentRepository
 from app.services.experiment_service import ExperimentService
+from app.services.export_service import ExportService
 from app.schemas.experiment import ExperimentCreate, ExperimentResponse, ExperimentDetail
-from app.core.exceptions import raise_experiment_not_found
-from app.core.constants import DEFAULT_PAGINATION_LIMIT
+from app.core.exceptions import raise_experiment_not_found, raise_invalid_cursor
+from app.core.constants import DEFAULT_PAGINATION_LIMIT, MAX_PAGINATION_LIMIT
+from app.core.pagination import decode_cursor, encode_cursor
 
 router = APIRouter()
 
@@ -18,34 +21,45 @@ router = APIRouter()
 @router.post("/", response_model=ExperimentResponse)
 async def create_experiment(
     experiment_data: ExperimentCreate,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db)
 ):
     """Create a new experiment and generate responses"""
     try:
         service = ExperimentService()
         result = await service.create_experiment(db, experiment_data)
+        # Exports of the finished experiment are stored for later downloads
+        background_tasks.add_task(ExportService.pregenerate, result["id"])
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error creating experiment: {str(e)}")
 
 
-@router.get("/", response_model=List[ExperimentResponse])
+@router.get("/", response_model=List[ExperimentDetail])
 async def list_experiments(
-    skip: int = 0,
-    limit: int = DEFAULT_PAGINATION_LIMIT,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGINATION_LIMIT, ge=1, le=MAX_PAGINATION_LIMIT),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor header of the previous page"),
+    name: Optional[str] = Query(None, description="Only experiments whose name contains this text"),
+    prompt: Optional[str] = Query(None, description="Only experiments whose prompt contains this text"),
     db: Session = Depends(get_db)
 ):
-    """List all experiments"""
-    experiments = ExperimentRepository.get_all(db, skip=skip, limit=limit)
-    return [
-        {
-            "id": exp.id,
-            "name": exp.name,
-            "prompt": exp.prompt,
-            "created_at": exp.created_at.isoformat() if exp.created_at else ""
-        }
-        for exp in experiments
-    ]
+    """List experiments newest first, with response counts and mean overall score"""
+    before = None
+    if cursor:
+        try:
+            created_at, experiment_id = decode_cursor(cursor, 2)
+            before = (datetime.fromisoformat(created_at), int(experiment_id))
+        except (TypeError, ValueError):
+            raise_invalid_cursor(cursor)
+    
+    # One extra row tells whether another page exists
+    rows = ExperimentRepository.get_page_with_stats(db, limit + 1, before, name, prompt)
+    page = rows[:limit]
+    if len(rows) > limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(page[-1].created_at.isoformat(), page[-1].id)
+    
+    return [_experiment_payload(row) for row in page]
 
 
 @router.get("/{experiment_id}", response_model=ExperimentDetail)
@@ -54,18 +68,27 @@ async def get_experiment(
     db: Session = Depends(get_db)
 ):
     """Get experiment details"""
-    experiment = ExperimentRepository.get_by_id(db, experiment_id)
+    experiment = ExperimentRepository.get_with_stats(db, experiment_id)
     if not experiment:
         raise_experiment_not_found(experiment_id)
     
-    response_count = ExperimentRepository.get_response_count(db, experiment_id)
-    
+    return _experiment_payload(experiment)
+
+
+def _experiment_payload(row) -> dict:
+    """Build the ExperimentDetail payload of an experiment row with statistics"""
     return {
-        "id": experiment.id,
-        "name": experiment.name,
-        "prompt": experiment.prompt,
-        "created_at": experiment.created_at.isoformat() if experiment.created_at else "",
-        "response_count": response_count
+        "id": row.id,
+        "name": row.name,
+        "prompt": row.prompt,
+        "model": row.model,
+        "created_at": row.created_at.isoformat() if row.created_at else "",
+        "completed_at": row.completed_at.isoformat() if row.completed_at else None,
+        "data_version": row.data_version,
+        "response_count": row.response_count,
+        "valid_count": row.valid_count,
+        "corrupted_count": row.corrupted_count,
+        "mean_overall_score": row.mean_overall_score
     }
 
 
@@ -75,8 +98,16 @@ async def delete_experiment(
     db: Session = Depends(get_db)
 ):
     """Delete an experiment"""
+    experiment = ExperimentRepository.get_by_id(db, experiment_id)
+    if not experiment:
+        raise_experiment_not_found(experiment_id)
+    completed = experiment.completed_at is not None
+    
     success = ExperimentRepository.delete(db, experiment_id)
     if not success:
         raise_experiment_not_found(experiment_id)
+    # After the commit: a failed delete keeps the stored exports
+    if completed:
+        ExportService.forget_artifacts(experiment_id)
     
     return {"message": "Experiment deleted successfully"}
\ No newline at end of file
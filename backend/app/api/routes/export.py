@@ -1,127 +1,256 @@
 """
 Export API routes
 """
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.orm import Session
-import csv
-import io
-import json
+from typing import Dict, List, Optional
 
 from app.db.database import get_db
 from app.repositories.experiment_repository import ExperimentRepository
-from app.repositories.response_repository import ResponseRepository
-from app.repositories.metric_repository import MetricRepository
-from app.core.exceptions import raise_experiment_not_found
+from app.services.export_service import EXPORT_FORMAT_VERSION, EXPORT_MEDIA_TYPES, ExportService, parquet_available
+from app.core.exceptions import raise_experiment_not_found, raise_export_format_unavailable, raise_invalid_fields
+from app.core.constants import MAX_EXPORT_EXPERIMENTS
+from app.schemas.export import BulkExportRequest
+from app.core.projection import EXPORT_FIELDS, fields_key, parse_fields
+from app.api.caching import cache_headers, etag_matches, make_etag, not_modified
 
 router = APIRouter()
 
+_FIELDS_DESCRIPTION = "Comma-separated response fields to include: " + ", ".join(EXPORT_FIELDS)
+_EXCLUDE_DESCRIPTION = "Comma-separated response fields to leave out, e.g. text,metrics.metadata"
+_VERSION_DESCRIPTION = "data_version of the experiment; a matching version of a completed experiment makes the export immutable"
+
+
+def _export_cache_headers(experiments: List, *variant, version: Optional[int] = None) -> Dict[str, str]:
+    """
+    Cache headers of an export
+    
+    An export of completed experiments only changes with their data_version, so
+    its ETag is derived from the experiments' completion times and data versions
+    and the export options, and can be checked before any response is read.
+    Clients revalidate it on every use, unless the URL names the current
+    data_version of its one experiment (?v=): that URL's body never changes.
+    """
+    if any(experiment.completed_at is None for experiment in experiments):
+        return {}
+    key = repr((EXPORT_FORMAT_VERSION,) + tuple(
+        (experiment.id, experiment.completed_at.isoformat(), experiment.data_version) for experiment in experiments
+    ) + variant)
+    immutable = version is not None and len(experiments) == 1 and experiments[0].data_version == version
+    return cache_headers(make_etag(key.encode("utf-8")), immutable)
+
 
 @router.get("/experiment/{experiment_id}/csv")
 async def export_experiment_csv(
     experiment_id: int,
+    request: Request,
+    fields: Optional[str] = Query(None, description=_FIELDS_DESCRIPTION),
+    exclude: Optional[str] = Query(None, description=_EXCLUDE_DESCRIPTION),
+    text_preview: Optional[int] = Query(None, ge=0, description="Truncate text to this many characters"),
+    v: Optional[int] = Query(None, description=_VERSION_DESCRIPTION),
     db: Session = Depends(get_db)
 ):
     """Export experiment data as CSV"""
+    try:
+        selected = parse_fields(fields, exclude, EXPORT_FIELDS, required=("id",))
+    except ValueError as e:
+        raise_invalid_fields(str(e))
+    
     experiment = ExperimentRepository.get_by_id(db, experiment_id)
     if not experiment:
         raise_experiment_not_found(experiment_id)
     
-    responses = ResponseRepository.get_by_experiment_id(db, experiment_id)
-    
-    # Create CSV in memory
-    output = io.StringIO()
-    writer = csv.writer(output)
-    
-    # Write header
-    writer.writerow([
-        "Response ID", "Temperature", "Top P", "Max Tokens",
-        "Text", "Finish Reason", "Length Score", "Coherence Score",
-        "Completeness Score", "Structure Score", "Readability Score",
-        "Overall Score"
-    ])
-    
-    # Write data rows
-    for response in responses:
-        metrics = MetricRepository.get_by_response_id(db, response.id)
-        metrics_dict = {m.name: m.value for m in metrics}
-        
-        writer.writerow([
-            response.id,
-            response.temperature,
-            response.top_p,
-            response.max_tokens,
-            response.text.replace('\n', ' ').replace('\r', ' '),  # Clean newlines
-            response.finish_reason or "",
-            metrics_dict.get("length_score", ""),
-            metrics_dict.get("coherence_score", ""),
-            metrics_dict.get("completeness_score", ""),
-            metrics_dict.get("structure_score", ""),
-            metrics_dict.get("readability_score", ""),
-            metrics_dict.get("overall_score", "")
-        ])
-    
-    output.seek(0)
-    
-    return StreamingResponse(
-        io.BytesIO(output.getvalue().encode('utf-8')),
-        media_type="text/csv",
-        headers={
-            "Content-Disposition": f"attachment; filename=experiment_{experiment_id}.csv"
-        }
-    )
+    return _experiment_export(request, experiment, "csv", selected, text_preview, version=v)
 
 
 @router.get("/experiment/{experiment_id}/json")
 async def export_experiment_json(
     experiment_id: int,
+    request: Request,
+    fields: Optional[str] = Query(None, description=_FIELDS_DESCRIPTION),
+    exclude: Optional[str] = Query(None, description=_EXCLUDE_DESCRIPTION),
+    text_preview: Optional[int] = Query(None, ge=0, description="Truncate text to this many characters"),
+    v: Optional[int] = Query(None, description=_VERSION_DESCRIPTION),
     db: Session = Depends(get_db)
 ):
     """Export experiment data as JSON"""
+    try:
+        selected = parse_fields(fields, exclude, EXPORT_FIELDS, required=("id",))
+    except ValueError as e:
+        raise_invalid_fields(str(e))
+    
+    experiment = ExperimentRepository.get_by_id(db, experiment_id)
+    if not experiment:
+        raise_experiment_not_found(experiment_id)
+    
+    return _experiment_export(request, experiment, "json", selected, text_preview, version=v)
+
+
+@router.get("/experiment/{experiment_id}/ndjson")
+async def export_experiment_ndjson(
+    experiment_id: int,
+    request: Request,
+    fields: Optional[str] = Query(None, description=_FIELDS_DESCRIPTION),
+    exclude: Optional[str] = Query(None, description=_EXCLUDE_DESCRIPTION),
+    text_preview: Optional[int] = Query(None, ge=0, description="Truncate text to this many characters"),
+    v: Optional[int] = Query(None, description=_VERSION_DESCRIPTION),
+    db: Session = Depends(get_db)
+):
+    """Export experiment data as newline-delimited JSON (one response per line, metrics inlined)"""
+    try:
+        selected = parse_fields(fields, exclude, EXPORT_FIELDS, required=("id",))
+    except ValueError as e:
+        raise_invalid_fields(str(e))
+    
     experiment = ExperimentRepository.get_by_id(db, experiment_id)
     if not experiment:
         raise_experiment_not_found(experiment_id)
     
-    responses = ResponseRepository.get_by_experiment_id(db, experiment_id)
-    
-    # Build JSON structure
-    data = {
-        "experiment": {
-            "id": experiment.id,
-            "name": experiment.name,
-            "prompt": experiment.prompt,
-            "created_at": experiment.created_at.isoformat() if experiment.created_at else None
-        },
-        "responses": []
-    }
-    
-    for response in responses:
-        metrics = MetricRepository.get_by_response_id(db, response.id)
-        metrics_dict = {
-            m.name: {
-                "value": m.value,
-                "metadata": m.metadata_json
-            }
-            for m in metrics
+    return _experiment_export(request, experiment, "ndjson", selected, text_preview, version=v)
+
+
+@router.get("/experiment/{experiment_id}/parquet")
+async def export_experiment_parquet(
+    experiment_id: int,
+    request: Request,
+    include_text: bool = Query(True, description="Include the response text column"),
+    v: Optional[int] = Query(None, description=_VERSION_DESCRIPTION),
+    db: Session = Depends(get_db)
+):
+    """Export experiment data as a typed, compressed Parquet file (one column per metric)"""
+    if not parquet_available():
+        raise_export_format_unavailable("Parquet", "pyarrow")
+    
+    experiment = ExperimentRepository.get_by_id(db, experiment_id)
+    if not experiment:
+        raise_experiment_not_found(experiment_id)
+    
+    return _experiment_export(request, experiment, "parquet", include_text=include_text, version=v)
+
+
+@router.get("/parquet")
+async def export_experiments_parquet(
+    request: Request,
+    experiment_id: List[int] = Query(..., description="Experiments to include (repeatable)"),
+    include_text: bool = Query(True, description="Include the response text column"),
+    db: Session = Depends(get_db)
+):
+    """Export several experiments as one Parquet file (experiment_id column tells them apart)"""
+    if len(experiment_id) > MAX_EXPORT_EXPERIMENTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {MAX_EXPORT_EXPERIMENTS} experiments can be exported at once"
+        )
+    return _parquet_export(request, db, experiment_id, include_text, "experiments.parquet")
+
+
+def _experiment_export(
+    request: Request,
+    experiment,
+    export_format: str,
+    selected: Optional[frozenset] = None,
+    text_preview: Optional[int] = None,
+    include_text: bool = True,
+    version: Optional[int] = None
+):
+    """
+    Answer with an export of one experiment
+    
+    Completed experiments are served from the stored artifact when there is one
+    (a plain file, with Range support); otherwise the export is streamed from a
+    server-side cursor as rows are produced, and stored on the way if the
+    experiment has completed.
+    """
+    if export_format == "parquet":
+        variant = (include_text,)
+    else:
+        variant = (fields_key(selected), text_preview)
+    headers = _export_cache_headers([experiment], export_format, *variant, version=version)
+    if "ETag" in headers and etag_matches(request, headers["ETag"]):
+        return not_modified(headers)
+    
+    filename = f"experiment_{experiment.id}.{export_format}"
+    media_type = EXPORT_MEDIA_TYPES[export_format]
+    path = ExportService.get_artifact(experiment, export_format, *variant)
+    if path:
+        return FileResponse(path, media_type=media_type, filename=filename, headers=headers)
+    
+    chunks = ExportService.export_chunks(experiment, export_format, selected, text_preview, include_text)
+    return StreamingResponse(
+        ExportService.store_while_streaming(experiment, export_format, chunks, *variant),
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f"attachment; filename={filename}",
+            **headers
         }
-        
-        data["responses"].append({
-            "id": response.id,
-            "temperature": response.temperature,
-            "top_p": response.top_p,
-            "max_tokens": response.max_tokens,
-            "text": response.text,
-            "finish_reason": response.finish_reason,
-            "created_at": response.created_at.isoformat() if response.created_at else None,
-            "metrics": metrics_dict
-        })
-    
-    json_str = json.dumps(data, indent=2, ensure_ascii=False)
+    )
+
+
+def _parquet_export(
+    request: Request,
+    db: Session,
+    experiment_ids: List[int],
+    include_text: bool,
+    filename: str
+):
+    """Stream a Parquet export of the given experiments (404 if any does not exist)"""
+    if not parquet_available():
+        raise_export_format_unavailable("Parquet", "pyarrow")
+    
+    experiment_ids = sorted(set(experiment_ids))
+    experiments = ExperimentRepository.get_by_ids(db, experiment_ids)
+    if len(experiments) < len(experiment_ids):
+        found = {experiment.id for experiment in experiments}
+        raise_experiment_not_found(next(i for i in experiment_ids if i not in found))
+    
+    headers = _export_cache_headers(experiments, "parquet", include_text)
+    if "ETag" in headers and etag_matches(request, headers["ETag"]):
+        return not_modified(headers)
     
+    # Row groups are streamed from a server-side cursor as they are written
     return StreamingResponse(
-        io.BytesIO(json_str.encode('utf-8')),
-        media_type="application/json",
+        ExportService.stream_parquet(experiment_ids, include_text),
+        media_type=EXPORT_MEDIA_TYPES["parquet"],
         headers={
-            "Content-Disposition": f"attachment; filename=experiment_{experiment_id}.json"
+            "Content-Disposition": f"attachment; filename={filename}",
+            **headers
         }
-    )
\ No newline at end of file
+    )
+
+
+@router.post("/bulk")
+async def export_bulk(
+    export: BulkExportRequest,
+    db: Session = Depends(get_db)
+):
+    """Export many experiments (by ID and/or filter) as a zip archive with one file each and a manifest"""
+    try:
+        selected = parse_fields(export.fields, export.exclude, EXPORT_FIELDS, required=("id",))
+    except ValueError as e:
+        raise_invalid_fields(str(e))
+    if export.format == "parquet" and not parquet_available():
+        raise_export_format_unavailable("Parquet", "pyarrow")
+    
+    # One extra row tells whether the filter matches too many experiments
+    experiments = ExperimentRepository.find(
+        db, export.experiment_ids, export.name, export.prompt, export.model,
+        export.created_from, export.created_to, export.completed_only,
+        limit=MAX_EXPORT_EXPERIMENTS + 1
+    )
+    if len(experiments) > MAX_EXPORT_EXPERIMENTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"More than {MAX_EXPORT_EXPERIMENTS} experiments match; narrow the selection"
+        )
+    if not experiments:
+        raise HTTPException(status_code=404, detail="No experiments match the selection")
+    
+    # The archive is streamed as it is generated
+    return StreamingResponse(
+        ExportService.stream_bulk_zip(
+            experiments, export.format, selected, export.text_preview, export.include_text
+        ),
+        media_type="application/zip",
+        headers={"Content-Disposition": "attachment; filename=experiments.zip"}
+    )
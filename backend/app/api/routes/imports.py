@@ -0,0 +1,47 @@
+"""
+Import API routes
+"""
+from fastapi import APIRouter, BackgroundTasks, Depends, File, Form, HTTPException, UploadFile
+from sqlalchemy.orm import Session
+from typing import Optional
+
+from app.db.database import get_db
+from app.services.import_service import ImportService
+from app.services.export_service import ExportService
+from app.schemas.export import ImportResult
+from app.core.exceptions import ValidationError, raise_invalid_import
+
+router = APIRouter()
+
+
+@router.post("/", response_model=ImportResult)
+def import_experiment(
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(..., description="NDJSON or CSV export of an experiment"),
+    name: str = Form(..., min_length=1, max_length=255, description="Experiment name"),
+    prompt: str = Form(..., min_length=1, description="Prompt the responses were generated for"),
+    model: Optional[str] = Form(None, max_length=100, description="LLM that generated the responses"),
+    format: Optional[str] = Form(None, pattern="^(csv|ndjson)$", description="File format (default: from the file name)"),
+    rescore: bool = Form(False, description="Recompute validation and metrics instead of using the file's metrics"),
+    db: Session = Depends(get_db)
+):
+    """
+    Create a completed experiment from an uploaded export
+
+    A plain function: FastAPI runs it in the threadpool, so a long load does not
+    block the event loop. The upload is spooled to disk by the multipart parser
+    and read back row by row.
+    """
+    import_format = format or ImportService.detect_format(file.filename)
+    if import_format is None:
+        raise HTTPException(status_code=400, detail="Unknown file format: pass format=csv or format=ndjson")
+
+    try:
+        result = ImportService().import_experiment(
+            db, file.file, import_format, name, prompt, model=model, rescore=rescore
+        )
+    except ValidationError as e:
+        raise_invalid_import(str(e))
+
+    background_tasks.add_task(ExportService.pregenerate, result["experiment"]["id"])
+    return result
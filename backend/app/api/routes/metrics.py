@@ -1,13 +1,28 @@
 """
 Metrics API routes
 """
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import List, Optional
 
 from app.db.database import get_db
 from app.repositories.experiment_repository import ExperimentRepository
 from app.services.metrics_aggregation_service import MetricsAggregationService
-from app.core.exceptions import raise_experiment_not_found
+from app.services.diversity_service import DiversityService
+from app.schemas.metrics import DiversitySummary, Leaderboard, MetricQuantiles, ParameterHeatmap
+from app.core.exceptions import raise_experiment_not_found, raise_invalid_cursor, raise_invalid_fields
+from app.core.projection import SUMMARY_FIELDS, fields_key, parse_fields
+from app.core.constants import (
+    DEFAULT_TEMPERATURE_BIN,
+    DEFAULT_TOP_P_BIN,
+    DEFAULT_LEADERBOARD_LIMIT,
+    MAX_LEADERBOARD_LIMIT,
+)
+from app.core.pagination import decode_cursor
+from app.core.payload_cache import payload_cache
+from app.api.caching import cached_json_response
+from app.core.serialization import dumps
 
 router = APIRouter()
 
@@ -15,21 +30,120 @@ router = APIRouter()
 @router.get("/experiment/{experiment_id}/summary")
 async def get_experiment_metrics_summary(
     experiment_id: int,
+    request: Request,
+    include_responses: bool = Query(True, description="Include per-response values; false serves statistics from rollups"),
+    fields: Optional[str] = Query(None, description="Comma-separated statistics to include, e.g. mean,std_dev,count"),
+    exclude: Optional[str] = Query(None, description="Comma-separated statistics to leave out, e.g. responses"),
     db: Session = Depends(get_db)
 ):
     """Get metrics summary for all responses in an experiment"""
+    try:
+        selected = parse_fields(fields, exclude, SUMMARY_FIELDS)
+    except ValueError as e:
+        raise_invalid_fields(str(e))
+    
     # Verify experiment exists
     experiment = ExperimentRepository.get_by_id(db, experiment_id)
     if not experiment:
         raise_experiment_not_found(experiment_id)
     
-    # Get metrics summary
-    summary = MetricsAggregationService.get_experiment_metrics_summary(db, experiment_id)
+    # Read the version before computing, so concurrent writes invalidate the result
+    version = experiment.data_version
+    variant = (include_responses, fields_key(selected))
+    body = payload_cache.get("metrics_summary", experiment_id, version, *variant)
+    if body is None:
+        # Get metrics summary
+        if include_responses:
+            summary = MetricsAggregationService.get_experiment_metrics_summary(db, experiment_id, selected)
+        else:
+            summary = MetricsAggregationService.get_experiment_rollup_summary(db, experiment_id, selected)
+        
+        if not summary:
+            raise HTTPException(
+                status_code=404,
+                detail="No responses found for this experiment"
+            )
+        
+        body = dumps(summary)
+        payload_cache.set("metrics_summary", experiment_id, version, body, *variant)
+    
+    return cached_json_response(request, body)
+
+
+@router.get("/experiment/{experiment_id}/diversity", response_model=DiversitySummary)
+async def get_experiment_diversity(
+    experiment_id: int,
+    db: Session = Depends(get_db)
+):
+    """Get cross-response diversity, near-duplicate clusters and novelty scores"""
+    experiment = ExperimentRepository.get_by_id(db, experiment_id)
+    if not experiment:
+        raise_experiment_not_found(experiment_id)
     
-    if not summary:
+    return DiversityService.get_experiment_diversity(db, experiment_id)
+
+
+@router.get("/quantiles", response_model=MetricQuantiles)
+async def get_metric_quantiles(
+    metric: str = Query(..., description="Metric name, e.g. overall_score"),
+    experiment_ids: Optional[List[int]] = Query(None, description="Experiments to include (all if omitted)"),
+    temperature: Optional[float] = Query(None),
+    top_p: Optional[float] = Query(None),
+    db: Session = Depends(get_db)
+):
+    """Get percentiles of a metric across experiments, merged from rollup sketches"""
+    quantiles = MetricsAggregationService.get_metric_quantiles(
+        db, metric, experiment_ids, temperature, top_p
+    )
+    if quantiles is None:
         raise HTTPException(
             status_code=404,
-            detail="No responses found for this experiment"
+            detail=f"No values found for metric '{metric}'"
         )
     
-    return summary
\ No newline at end of file
+    return quantiles
+
+
+@router.get("/heatmap", response_model=ParameterHeatmap)
+async def get_parameter_heatmap(
+    metric: str = Query(..., description="Metric name, e.g. overall_score"),
+    model: Optional[str] = Query(None, description="Only experiments run with this model"),
+    created_from: Optional[datetime] = Query(None, description="Only experiments created at or after this time"),
+    created_to: Optional[datetime] = Query(None, description="Only experiments created before this time"),
+    experiment_ids: Optional[List[int]] = Query(None, description="Only these experiments"),
+    temperature_bin: float = Query(DEFAULT_TEMPERATURE_BIN, gt=0),
+    top_p_bin: float = Query(DEFAULT_TOP_P_BIN, gt=0),
+    db: Session = Depends(get_db)
+):
+    """Get mean, count and std dev of a metric on a temperature x top_p grid across experiments"""
+    return MetricsAggregationService.get_parameter_heatmap(
+        db, metric, temperature_bin, top_p_bin,
+        model, created_from, created_to, experiment_ids
+    )
+
+
+@router.get("/leaderboard", response_model=Leaderboard)
+async def get_leaderboard(
+    metric: str = Query(..., description="Metric to rank by, e.g. coherence_score"),
+    order: str = Query("desc", pattern="^(asc|desc)$", description="desc for the best responses first"),
+    limit: int = Query(DEFAULT_LEADERBOARD_LIMIT, ge=1, le=MAX_LEADERBOARD_LIMIT),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    min_temperature: Optional[float] = Query(None),
+    max_temperature: Optional[float] = Query(None),
+    min_top_p: Optional[float] = Query(None),
+    max_top_p: Optional[float] = Query(None),
+    db: Session = Depends(get_db)
+):
+    """Get the top (or bottom) responses by a metric across all experiments"""
+    after = None
+    if cursor:
+        try:
+            value, metric_id = decode_cursor(cursor, 2)
+            after = (float(value), int(metric_id))
+        except (TypeError, ValueError):
+            raise_invalid_cursor(cursor)
+    
+    return MetricsAggregationService.get_leaderboard(
+        db, metric, order == "desc", limit, after,
+        min_temperature, max_temperature, min_top_p, max_top_p
+    )
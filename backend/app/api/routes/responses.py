@@ -1,14 +1,25 @@
 """
 Responses API routes
 """
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
 from app.db.database import get_db
+from app.repositories.experiment_repository import ExperimentRepository
 from app.services.response_service import ResponseService
-from app.schemas.response import ResponseWithMetrics
-from app.core.exceptions import raise_response_not_found
+from app.services.relevance_service import RelevanceService
+from app.schemas.response import ResponseBatchRequest, ResponseWithMetrics, ResponseSearchResults, SimilarResponse
+from app.core.exceptions import raise_response_not_found, raise_invalid_cursor, raise_invalid_fields
+from app.core.projection import RESPONSE_FIELDS, fields_key, parse_fields
+from app.core.constants import (
+    DEFAULT_SIMILAR_LIMIT, MAX_SIMILAR_LIMIT, MAX_PAGINATION_LIMIT,
+    DEFAULT_SEARCH_LIMIT, MAX_SEARCH_LIMIT
+)
+from app.core.pagination import decode_cursor
+from app.core.payload_cache import payload_cache
+from app.api.caching import cached_json_response
+from app.core.serialization import dumps
 
 router = APIRouter()
 
@@ -16,20 +27,111 @@ router = APIRouter()
 @router.get("/experiment/{experiment_id}", response_model=List[ResponseWithMetrics])
 async def get_experiment_responses(
     experiment_id: int,
+    request: Request,
+    after_id: Optional[int] = Query(None, description="Return responses after this ID (last ID of the previous page)"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGINATION_LIMIT, description="Page size (all responses if omitted)"),
+    temperature: Optional[float] = Query(None),
+    top_p: Optional[float] = Query(None),
+    is_valid: Optional[bool] = Query(None),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to include, e.g. id,temperature,top_p,metrics"),
+    exclude: Optional[str] = Query(None, description="Comma-separated fields to leave out, e.g. text,metrics.metadata"),
+    text_preview: Optional[int] = Query(None, ge=0, description="Truncate text to this many characters"),
     db: Session = Depends(get_db)
 ):
-    """Get all responses for an experiment with their metrics"""
-    responses = ResponseService.get_experiment_responses_with_metrics(db, experiment_id)
-    return responses
+    """Get responses for an experiment with their metrics, optionally filtered, projected and paginated"""
+    try:
+        selected = parse_fields(fields, exclude, RESPONSE_FIELDS, required=("id",))
+    except ValueError as e:
+        raise_invalid_fields(str(e))
+    
+    variant = (after_id, limit, temperature, top_p, is_valid, fields_key(selected), text_preview)
+    # Read the version before computing, so concurrent writes invalidate the result
+    version = ExperimentRepository.get_version(db, experiment_id)
+    body = payload_cache.get("responses", experiment_id, version, *variant)
+    if body is None:
+        responses = ResponseService.get_experiment_responses_with_metrics(
+            db, experiment_id, after_id, limit, temperature, top_p, is_valid,
+            selected, text_preview
+        )
+        # Payloads are built to match ResponseWithMetrics; serialized without re-validation
+        body = dumps(responses)
+        payload_cache.set("responses", experiment_id, version, body, *variant)
+    
+    return cached_json_response(request, body)
+
+
+@router.post("/batch", response_model=List[ResponseWithMetrics])
+async def get_responses_batch(
+    batch: ResponseBatchRequest,
+    db: Session = Depends(get_db)
+):
+    """Get many responses with their metrics in one round trip, in the requested order (unknown IDs skipped)"""
+    try:
+        selected = parse_fields(batch.fields, batch.exclude, RESPONSE_FIELDS, required=("id",))
+    except ValueError as e:
+        raise_invalid_fields(str(e))
+    
+    responses = ResponseService.get_responses_by_ids(db, batch.ids, selected, batch.text_preview)
+    # Built to match ResponseWithMetrics; serialized without re-validation
+    return Response(content=dumps(responses), media_type="application/json")
+
+
+@router.get("/search", response_model=ResponseSearchResults)
+async def search_responses(
+    q: str = Query(..., min_length=1, description='Search terms; supports "phrases", or, and -excluded words'),
+    limit: int = Query(DEFAULT_SEARCH_LIMIT, ge=1, le=MAX_SEARCH_LIMIT),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    experiment_id: Optional[List[int]] = Query(None, description="Only these experiments (repeatable)"),
+    min_temperature: Optional[float] = Query(None),
+    max_temperature: Optional[float] = Query(None),
+    min_top_p: Optional[float] = Query(None),
+    max_top_p: Optional[float] = Query(None),
+    db: Session = Depends(get_db)
+):
+    """Full-text search over response text across experiments, ranked, with highlighted snippets"""
+    after = None
+    if cursor:
+        try:
+            rank, response_id = decode_cursor(cursor, 2)
+            after = (float(rank), int(response_id))
+        except (TypeError, ValueError):
+            raise_invalid_cursor(cursor)
+    
+    return ResponseService.search_responses(
+        db, q, limit, after, experiment_id,
+        min_temperature, max_temperature, min_top_p, max_top_p
+    )
 
 
 @router.get("/{response_id}", response_model=ResponseWithMetrics)
 async def get_response(
     response_id: int,
+    request: Request,
+    v: Optional[int] = Query(None, description="data_version of the experiment; a matching version makes the body immutable"),
     db: Session = Depends(get_db)
 ):
     """Get a single response with its metrics"""
-    response = ResponseService.get_response_with_metrics(db, response_id)
-    if not response:
+    result = ResponseService.get_response_body(db, response_id, v)
+    if result is None:
+        raise_response_not_found(response_id)
+    # Built to match ResponseWithMetrics; serialized without re-validation
+    body, version = result
+    if v == version:
+        return cached_json_response(request, body, immutable=True)
+    # Current body, revalidated; Content-Location names its immutable URL
+    return cached_json_response(
+        request, body, extra_headers={"Content-Location": f"{request.url.path}?v={version}"}
+    )
+
+
+@router.get("/{response_id}/similar", response_model=List[SimilarResponse])
+async def get_similar_responses(
+    response_id: int,
+    limit: int = Query(DEFAULT_SIMILAR_LIMIT, ge=1, le=MAX_SIMILAR_LIMIT),
+    db: Session = Depends(get_db)
+):
+    """Get the most similar responses from the same experiment (TF-IDF cosine similarity)"""
+    similar = RelevanceService.get_similar_responses(db, response_id, limit)
+    if similar is None:
         raise_response_not_found(response_id)
-    return response
\ No newline at end of file
+    return similar
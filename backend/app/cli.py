@@ -0,0 +1,92 @@
+"""
+Command-line maintenance tasks
+
+Usage (from the backend directory):
+    python -m app.cli rebuild-rollups [--experiment-id ID]
+    python -m app.cli import FILE --name NAME --prompt PROMPT [--model MODEL] [--format csv|ndjson] [--rescore]
+"""
+import argparse
+import sys
+
+from app.db.database import SessionLocal
+from app.repositories.experiment_repository import ExperimentRepository
+from app.repositories.rollup_repository import RollupRepository
+from app.services.import_service import ImportService
+from app.core.exceptions import ValidationError
+
+
+def rebuild_rollups(args: argparse.Namespace) -> int:
+    """Recompute metric rollups from the metrics table"""
+    db = SessionLocal()
+    try:
+        if args.experiment_id is not None:
+            experiment_ids = [args.experiment_id]
+        else:
+            experiment_ids = ExperimentRepository.get_all_ids(db)
+        
+        # One transaction per experiment keeps locks short on large databases
+        total_rows = 0
+        for experiment_id in experiment_ids:
+            rows = RollupRepository.rebuild(db, experiment_id)
+            ExperimentRepository.bump_version(db, experiment_id)
+            db.commit()
+            total_rows += rows
+            print(f"Experiment {experiment_id}: {rows} rollup rows")
+        print(f"Rebuilt {total_rows} rollup rows for {len(experiment_ids)} experiment(s)")
+        return 0
+    finally:
+        db.close()
+
+
+def import_experiment(args: argparse.Namespace) -> int:
+    """Create an experiment from an NDJSON or CSV export"""
+    import_format = args.format or ImportService.detect_format(args.file)
+    if import_format is None:
+        print("Unknown file format: pass --format csv or --format ndjson", file=sys.stderr)
+        return 2
+    
+    db = SessionLocal()
+    stream = sys.stdin.buffer if args.file == "-" else open(args.file, "rb")
+    try:
+        result = ImportService().import_experiment(
+            db, stream, import_format, args.name, args.prompt, model=args.model, rescore=args.rescore
+        )
+    except ValidationError as e:
+        print(f"Import failed: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if stream is not sys.stdin.buffer:
+            stream.close()
+        db.close()
+    
+    print(
+        f"Experiment {result['experiment']['id']}: "
+        f"{result['response_count']} responses, {result['metric_count']} metrics"
+    )
+    return 0
+
+
+def main(argv=None) -> int:
+    """Parse arguments and run the selected command"""
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="LLM Lab maintenance tasks")
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    rebuild = commands.add_parser("rebuild-rollups", help="Recompute metric rollups from stored metrics")
+    rebuild.add_argument("--experiment-id", type=int, help="Only rebuild this experiment")
+    rebuild.set_defaults(handler=rebuild_rollups)
+    
+    importer = commands.add_parser("import", help="Create an experiment from an NDJSON or CSV export")
+    importer.add_argument("file", help="Export file ('-' for standard input)")
+    importer.add_argument("--name", required=True, help="Experiment name")
+    importer.add_argument("--prompt", required=True, help="Prompt the responses were generated for")
+    importer.add_argument("--model", help="LLM that generated the responses")
+    importer.add_argument("--format", choices=["csv", "ndjson"], help="File format (default: from the file name)")
+    importer.add_argument("--rescore", action="store_true", help="Recompute validation and metrics from the text")
+    importer.set_defaults(handler=import_experiment)
+    
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,173 @@
+"""
+Content-addressed store of generated files (export artifacts) on local disk
+
+Files live under objects/ named by the BLAKE2b digest of their content, so
+identical exports are stored once. Per-experiment refs under refs/<id>/ map an
+artifact key (format, options and data version) to a digest, so writes to an
+experiment make its old artifacts unreachable without touching the disk;
+invalidating an experiment (after it is deleted) drops its refs. Reads touch
+the file's mtime, and when the objects outgrow the size limit the least
+recently used ones are removed. Everything is plain files, so
+workers on the same host share the store.
+"""
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from typing import Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ArtifactWriter:
+    """Writes one artifact to a temporary file, hashing it; commit() publishes it"""
+
+    def __init__(self, store: "ArtifactStore", experiment_id: int, key: str, extension: str):
+        self._store = store
+        self._experiment_id = experiment_id
+        self._key = key
+        self._extension = extension
+        self._hash = hashlib.blake2b(digest_size=20)
+        self._started_at = time.time()
+        fd, self._temp_path = tempfile.mkstemp(dir=store.temp_dir, suffix=".part")
+        self._file = os.fdopen(fd, "wb")
+
+    def write(self, chunk: bytes) -> None:
+        self._file.write(chunk)
+        self._hash.update(chunk)
+
+    def commit(self) -> str:
+        """Move the file into the store and point the experiment's ref at it"""
+        self._file.close()
+        digest = self._hash.hexdigest()
+        path = self._store._object_path(digest, self._extension)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Atomic; an identical artifact published meanwhile is simply replaced
+        os.replace(self._temp_path, path)
+        # Data read before an invalidation must not be published under the experiment
+        if self._store._invalidated_at(self._experiment_id) < self._started_at:
+            self._store._write_ref(self._experiment_id, self._key, digest, self._extension)
+        self._store.evict()
+        return path
+
+    def abort(self) -> None:
+        """Discard the partial file"""
+        self._file.close()
+        try:
+            os.remove(self._temp_path)
+        except OSError:
+            pass
+
+
+class ArtifactStore:
+    """Content-addressed file store with per-experiment refs and size-based LRU eviction"""
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = os.path.abspath(root)
+        self.max_bytes = max_bytes
+        self.temp_dir = os.path.join(self.root, "tmp")
+        self._objects_dir = os.path.join(self.root, "objects")
+        self._refs_dir = os.path.join(self.root, "refs")
+        self._invalidated_dir = os.path.join(self.root, "invalidated")
+        self._evict_lock = threading.Lock()
+
+    def get(self, experiment_id: int, key: str) -> Optional[str]:
+        """Path of an experiment's artifact (None if missing), marked as recently used"""
+        ref = self._ref_path(experiment_id, key)
+        try:
+            with open(ref) as f:
+                digest, extension = f.read().split()
+        except (OSError, ValueError):
+            return None
+        path = self._object_path(digest, extension)
+        try:
+            os.utime(path)
+        except OSError:
+            # Evicted: forget the ref
+            self._remove(ref)
+            return None
+        return path
+
+    def writer(self, experiment_id: int, key: str, extension: str) -> ArtifactWriter:
+        """Start writing an artifact of an experiment"""
+        os.makedirs(self.temp_dir, exist_ok=True)
+        return ArtifactWriter(self, experiment_id, key, extension)
+
+    def invalidate(self, experiment_id: int) -> None:
+        """Forget every artifact of an experiment (files shared with other refs age out by LRU)"""
+        marker = os.path.join(self._invalidated_dir, str(experiment_id))
+        try:
+            os.makedirs(self._invalidated_dir, exist_ok=True)
+            with open(marker, "w"):
+                pass
+        except OSError as e:
+            logger.warning("Could not mark experiment %s invalidated: %s", experiment_id, e)
+        shutil.rmtree(os.path.join(self._refs_dir, str(experiment_id)), ignore_errors=True)
+
+    def evict(self) -> int:
+        """
+        Remove least recently used objects until the store fits its size limit
+
+        Returns:
+            Number of bytes removed
+        """
+        with self._evict_lock:
+            entries = []
+            total = 0
+            for directory in self._scandir(self._objects_dir):
+                for entry in self._scandir(directory.path):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+            removed = 0
+            for _, size, path in sorted(entries):
+                if total - removed <= self.max_bytes:
+                    break
+                if self._remove(path):
+                    removed += size
+            if removed:
+                logger.info("Evicted %s bytes (limit %s)", removed, self.max_bytes)
+            return removed
+
+    def _object_path(self, digest: str, extension: str) -> str:
+        return os.path.join(self._objects_dir, digest[:2], f"{digest}.{extension}")
+
+    def _invalidated_at(self, experiment_id: int) -> float:
+        try:
+            return os.stat(os.path.join(self._invalidated_dir, str(experiment_id))).st_mtime
+        except OSError:
+            return 0.0
+
+    def _ref_path(self, experiment_id: int, key: str) -> str:
+        return os.path.join(self._refs_dir, str(experiment_id), key)
+
+    def _write_ref(self, experiment_id: int, key: str, digest: str, extension: str) -> None:
+        ref = self._ref_path(experiment_id, key)
+        os.makedirs(os.path.dirname(ref), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=self.temp_dir, suffix=".ref")
+        with os.fdopen(fd, "w") as f:
+            f.write(f"{digest} {extension}")
+        os.replace(temp_path, ref)
+
+    @staticmethod
+    def _scandir(path: str):
+        try:
+            return [entry for entry in os.scandir(path) if not entry.name.startswith(".")]
+        except OSError:
+            return []
+
+    @staticmethod
+    def _remove(path: str) -> bool:
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
+
+
+artifact_store = ArtifactStore(settings.EXPORT_ARTIFACT_DIR, settings.EXPORT_ARTIFACT_MAX_BYTES)
@@ -28,6 +28,16 @@ class Settings(BaseSettings):
     # Can be overridden via .env file or environment variable
     DATABASE_URL: str = ""
     
+    # Shared payload cache (e.g. redis://localhost:6379/0); empty uses an in-process cache
+    CACHE_BACKEND_URL: str = ""
+    
+    # Export files of completed experiments, kept on local disk (least recently used evicted beyond the size limit)
+    EXPORT_ARTIFACT_DIR: str = "./export_artifacts"
+    EXPORT_ARTIFACT_MAX_BYTES: int = 5 * 1024 * 1024 * 1024
+    
+    # Store the metadata of calculated metrics (values are always stored)
+    STORE_METRIC_METADATA: bool = True
+    
     # Application Settings
     MAX_CONCURRENT_REQUESTS: int = 10
     REQUEST_TIMEOUT: int = 60
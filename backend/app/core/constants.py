@@ -22,7 +22,67 @@ MAX_CONCURRENT_REQUESTS = 10
 # Database
 DEFAULT_PAGINATION_LIMIT = 100
 MAX_PAGINATION_LIMIT = 1000
+MAX_BATCH_FETCH_IDS = 500
+
+# Streaming Exports (rows per server-side cursor fetch and per yielded chunk)
+EXPORT_BATCH_SIZE = 1000
+PARQUET_ROW_GROUP_SIZE = 10000
+PARQUET_COMPRESSION = "zstd"
+MAX_EXPORT_EXPERIMENTS = 500
+BULK_EXPORT_QUERY_EXPERIMENTS = 50
+
+# Export Artifacts (exports of completed experiments stored on disk, see EXPORT_ARTIFACT_DIR)
+EXPORT_PREGENERATE_FORMATS = ("csv", "json")
+
+# Bulk Import (responses per COPY batch)
+IMPORT_BATCH_SIZE = 10000
+
+# Metric Storage (one column per metric on responses, in this order)
+METRIC_NAMES = (
+    "length_score", "coherence_score", "completeness_score",
+    "structure_score", "readability_score", "overall_score",
+)
 
 # Response Validation
 MIN_RESPONSE_LENGTH = 10
 CORRUPTION_THRESHOLD = 0.6
+
+# Result Caching (memoized metric and validation results)
+METRIC_CACHE_SIZE = 4096
+VALIDATION_CACHE_SIZE = 4096
+
+# Response Diversity (MinHash / LSH)
+MINHASH_NUM_PERM = 64
+MINHASH_SHINGLE_SIZE = 3
+LSH_BANDS = 16
+NEAR_DUPLICATE_THRESHOLD = 0.8
+
+# Prompt Relevance (per-experiment TF-IDF indexes kept in memory)
+TFIDF_INDEX_CACHE_SIZE = 32
+DEFAULT_SIMILAR_LIMIT = 5
+MAX_SIMILAR_LIMIT = 50
+
+# Metric Percentiles (KLL quantile sketches stored on metric rollups)
+QUANTILE_SKETCH_K = 128
+SUMMARY_PERCENTILES = (5, 25, 50, 75, 95)
+
+# Parameter Heatmap (temperature x top_p bins over metric rollups)
+DEFAULT_TEMPERATURE_BIN = 0.1
+DEFAULT_TOP_P_BIN = 0.1
+
+# Leaderboard (top/bottom responses by metric across experiments)
+DEFAULT_LEADERBOARD_LIMIT = 50
+MAX_LEADERBOARD_LIMIT = 500
+
+# API Payload Cache (summary and response lists, invalidated on writes)
+PAYLOAD_CACHE_SIZE = 256
+PAYLOAD_CACHE_TTL_SECONDS = 24 * 60 * 60
+
+# Single Response Payload Cache (in-process, keyed by the experiment's data_version)
+RESPONSE_PAYLOAD_CACHE_SIZE = 4096
+
+# Full-Text Search (tsvector column on responses, GIN-indexed)
+SEARCH_TEXT_CONFIG = "english"
+SEARCH_HEADLINE_OPTIONS = "StartSel=<mark>, StopSel=</mark>, MaxWords=35, MinWords=15, MaxFragments=2"
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
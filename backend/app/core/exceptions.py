@@ -44,3 +44,35 @@ def raise_response_not_found(response_id: int) -> HTTPException:
         status_code=404,
         detail=f"Response with id {response_id} not found"
     )
+
+
+def raise_invalid_cursor(cursor: str) -> HTTPException:
+    """Raise HTTP 400 for a malformed pagination cursor"""
+    raise HTTPException(
+        status_code=400,
+        detail=f"Invalid cursor: {cursor}"
+    )
+
+
+def raise_export_format_unavailable(export_format: str, package: str) -> HTTPException:
+    """Raise HTTP 501 for an export format whose optional dependency is not installed"""
+    raise HTTPException(
+        status_code=501,
+        detail=f"{export_format} export requires the {package} package"
+    )
+
+
+def raise_invalid_fields(message: str) -> HTTPException:
+    """Raise HTTP 400 for an invalid fields / exclude projection"""
+    raise HTTPException(
+        status_code=400,
+        detail=message
+    )
+
+
+def raise_invalid_import(message: str) -> HTTPException:
+    """Raise HTTP 422 for an import file that is malformed or has an invalid row"""
+    raise HTTPException(
+        status_code=422,
+        detail=message
+    )
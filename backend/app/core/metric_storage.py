@@ -0,0 +1,91 @@
+"""
+Wide metric storage - calculated metrics as typed columns on responses
+
+Each response row holds one float column per metric (METRIC_NAMES) and, when
+STORE_METRIC_METADATA is set, the metrics' metadata in a single JSONB document
+keyed by metric name. Metadata that repeats stored values is left out:
+overall_score's component_scores are the other metrics' values, so they are
+dropped on write and rebuilt on read, here and by the `metrics` view.
+"""
+from typing import Dict, List, Optional
+
+from app.core.config import settings
+from app.core.constants import METRIC_NAMES
+
+# Metrics whose values make up overall_score's component_scores
+COMPONENT_METRICS = (
+    "length_score", "coherence_score", "completeness_score",
+    "structure_score", "readability_score",
+)
+
+# IDs of the rows of the `metrics` view: response ID * METRIC_ID_STRIDE + position in METRIC_NAMES
+METRIC_ID_STRIDE = 8
+
+
+def column_values(metrics: Dict[str, dict]) -> Dict[str, float]:
+    """
+    Column values of calculated metrics ({name: {"value": ..., "metadata": ...}})
+
+    Raises:
+        ValueError: If a metric has no column
+    """
+    unknown = [name for name in metrics if name not in METRIC_NAMES]
+    if unknown:
+        raise ValueError(f"Unknown metric: {', '.join(unknown)} (stored metrics: {', '.join(METRIC_NAMES)})")
+    return {name: metric.get("value", 0.0) for name, metric in metrics.items()}
+
+
+def compact_metadata(metrics: Dict[str, dict], values: Dict[str, Optional[float]]) -> Optional[dict]:
+    """
+    metric_metadata document of calculated metrics (None if metadata is not stored)
+
+    Args:
+        metrics: Calculated metrics ({name: {"value": ..., "metadata": ...}})
+        values: Stored value of every metric of the response, by name
+    """
+    if not settings.STORE_METRIC_METADATA:
+        return None
+    document = {}
+    for name, metric in metrics.items():
+        metadata = metric.get("metadata")
+        if metadata is None:
+            continue
+        if name == "overall_score" and metadata.get("component_scores") == _component_scores(values):
+            metadata = {key: value for key, value in metadata.items() if key != "component_scores"}
+        document[name] = metadata
+    return document
+
+
+def expand_metadata(document: Optional[dict], values: Dict[str, Optional[float]]) -> Dict[str, Optional[dict]]:
+    """Metadata of each metric from a metric_metadata document (inverse of compact_metadata)"""
+    document = document or {}
+    metadata = {name: document.get(name) for name in METRIC_NAMES}
+    overall = metadata["overall_score"]
+    if overall is not None and "component_scores" not in overall:
+        metadata["overall_score"] = dict(overall, component_scores=_component_scores(values))
+    return metadata
+
+
+def metric_entries(row, with_metadata: bool = True) -> List[dict]:
+    """
+    {name, value[, metadata]} of a response row's stored metrics, in METRIC_NAMES order
+
+    Args:
+        row: Row with one attribute per metric (and metric_metadata if with_metadata)
+    """
+    values = {name: getattr(row, name) for name in METRIC_NAMES}
+    metadata = expand_metadata(row.metric_metadata, values) if with_metadata else {}
+    entries = []
+    for name, value in values.items():
+        if value is None:
+            continue
+        entry = {"name": name, "value": value}
+        if with_metadata:
+            entry["metadata"] = metadata[name]
+        entries.append(entry)
+    return entries
+
+
+def _component_scores(values: Dict[str, Optional[float]]) -> dict:
+    """overall_score's component_scores as rebuilt from stored values"""
+    return {name: values.get(name) for name in COMPONENT_METRICS}
@@ -0,0 +1,33 @@
+"""
+Keyset pagination cursors
+
+A cursor is the sort key of the last row of a page, encoded as opaque
+URL-safe text, so the next page is fetched with WHERE (key) > (cursor)
+instead of an OFFSET that rescans every skipped row.
+"""
+import base64
+import json
+from typing import Any, Tuple
+
+
+def encode_cursor(*values: Any) -> str:
+    """Encode the sort key of a row as a cursor"""
+    raw = json.dumps(list(values), separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, arity: int) -> Tuple:
+    """
+    Decode a cursor produced by encode_cursor
+    
+    Raises:
+        ValueError: If the cursor is malformed or has the wrong number of values
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    if not isinstance(values, list) or len(values) != arity:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return tuple(values)
@@ -0,0 +1,90 @@
+"""
+Cache of serialized API payloads, keyed by per-experiment write versions
+
+Entries are keyed by experiment ID and that experiment's data_version, which the
+database bumps in the same transaction as every write to its responses, metrics
+or rollups (see ExperimentRepository.bump_version). Writes from any worker or
+CLI process therefore change the key; stale entries are never read again and
+age out of the backend. The backend is in-process by default, or shared between
+workers when CACHE_BACKEND_URL points to Redis.
+"""
+from typing import Hashable, Optional
+
+from app.core.cache import LRUCache
+from app.core.config import settings
+from app.core.constants import PAYLOAD_CACHE_SIZE, PAYLOAD_CACHE_TTL_SECONDS
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+
+class MemoryCacheBackend:
+    """Bounded in-process backend (per worker)"""
+
+    def __init__(self, maxsize: int):
+        self._entries = LRUCache("payloads", maxsize)
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._entries.get(key)
+
+    def set(self, key: str, value: bytes) -> None:
+        self._entries.set(key, value)
+
+
+class RedisCacheBackend:
+    """Backend shared by every worker; failures degrade to cache misses"""
+
+    def __init__(self, url: str, ttl: int):
+        self._client = redis.Redis.from_url(url)
+        self._ttl = ttl
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            return self._client.get(f"payload:{key}")
+        except redis.RedisError as e:
+            print(f"[CACHE] Redis get failed: {e}")
+            return None
+
+    def set(self, key: str, value: bytes) -> None:
+        try:
+            self._client.set(f"payload:{key}", value, ex=self._ttl)
+        except redis.RedisError as e:
+            print(f"[CACHE] Redis set failed: {e}")
+
+
+class PayloadCache:
+    """Serialized payloads per experiment and write version"""
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def get(self, name: str, experiment_id: int, version: Optional[int], *variant: Hashable) -> Optional[bytes]:
+        """Get a payload stored for this version of the experiment (None if version is None)"""
+        if version is None:
+            return None
+        return self.backend.get(self._key(name, experiment_id, version, variant))
+
+    def set(self, name: str, experiment_id: int, version: Optional[int], payload: bytes, *variant: Hashable) -> None:
+        """Store a payload computed from this version of the experiment"""
+        if version is None:
+            return
+        self.backend.set(self._key(name, experiment_id, version, variant), payload)
+
+    @staticmethod
+    def _key(name: str, experiment_id: int, version: int, variant: tuple) -> str:
+        return ":".join([name, str(experiment_id), str(version)] + [str(part) for part in variant])
+
+
+def _create_backend():
+    """Create the backend configured by CACHE_BACKEND_URL"""
+    url = settings.CACHE_BACKEND_URL
+    if not url:
+        return MemoryCacheBackend(PAYLOAD_CACHE_SIZE)
+    if redis is None:
+        raise RuntimeError("CACHE_BACKEND_URL is set but the redis package is not installed")
+    return RedisCacheBackend(url, PAYLOAD_CACHE_TTL_SECONDS)
+
+
+payload_cache = PayloadCache(_create_backend())
@@ -0,0 +1,66 @@
+"""
+Sparse fieldsets - parsing of fields= / exclude= projection parameters
+"""
+from typing import FrozenSet, Optional, Tuple
+
+# Fields of a response payload; "metrics.metadata" is the metadata of each metric
+RESPONSE_FIELDS = (
+    "id", "experiment_id", "temperature", "top_p", "max_tokens", "text",
+    "finish_reason", "validation_metadata", "created_at", "metrics", "metrics.metadata",
+)
+
+# Fields of each response in CSV / JSON exports
+EXPORT_FIELDS = (
+    "id", "temperature", "top_p", "max_tokens", "text", "finish_reason",
+    "created_at", "metrics", "metrics.metadata",
+)
+
+# Statistics of each metric in the metrics summary
+SUMMARY_FIELDS = (
+    "mean", "median", "min", "max", "std_dev", "count", "percentiles", "responses", "cells",
+)
+
+
+def parse_fields(
+    fields: Optional[str],
+    exclude: Optional[str],
+    allowed: Tuple[str, ...],
+    required: Tuple[str, ...] = ()
+) -> Optional[FrozenSet[str]]:
+    """
+    Resolve comma-separated fields / exclude parameters into the selected field names
+    
+    A parent field selects its nested fields ("metrics" selects "metrics.metadata")
+    unless they are excluded. Required fields are always selected.
+    
+    Returns:
+        Selected field names, or None when neither parameter is given (all fields)
+        
+    Raises:
+        ValueError: If a name is not one of the allowed fields
+    """
+    if not fields and not exclude:
+        return None
+    
+    def split(value: Optional[str]) -> FrozenSet[str]:
+        names = frozenset(name.strip() for name in (value or "").split(",") if name.strip())
+        unknown = names - set(allowed)
+        if unknown:
+            raise ValueError(
+                f"Unknown field(s): {', '.join(sorted(unknown))}. Allowed: {', '.join(allowed)}"
+            )
+        return names
+    
+    included = split(fields) if fields else frozenset(allowed)
+    excluded = split(exclude)
+    selected = {
+        name for name in allowed
+        if (name in included or name.split(".")[0] in included) and name not in excluded
+        and name.split(".")[0] not in excluded
+    }
+    return frozenset(selected | set(required))
+
+
+def fields_key(selected: Optional[FrozenSet[str]]) -> str:
+    """Stable text form of a selection, for cache keys"""
+    return "*" if selected is None else ",".join(sorted(selected))
@@ -0,0 +1,159 @@
+"""
+Quantile sketch - Compact mergeable KLL sketch for metric percentiles
+"""
+import math
+from typing import Dict, Iterable, List, Optional
+
+from app.core.constants import QUANTILE_SKETCH_K
+
+# Capacity shrinks by this factor per level below the top
+_CAPACITY_DECAY = 2 / 3
+
+
+class KLLSketch:
+    """
+    KLL quantile sketch (Karnin, Lang and Liberty)
+
+    Values are kept in levels of compactors; an item at level h stands for 2^h
+    inserted values. When the sketch is full, a level is sorted and every other
+    item is promoted to the next level, so memory stays around 3k items whatever
+    the number of values. Until the first compaction the sketch holds every value
+    and its quantiles are exact. Sketches merge by concatenating levels, giving
+    quantiles over any union of experiments or parameter cells.
+
+    The promotion offset alternates deterministically so stored sketches are
+    reproducible (rebuilding from the same values gives the same sketch).
+    """
+
+    def __init__(self, k: int = QUANTILE_SKETCH_K):
+        self.k = k
+        self.n = 0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+        self.levels: List[List[float]] = [[]]
+        self._compactions = 0
+
+    def update(self, value: float) -> None:
+        """Add one value"""
+        self.levels[0].append(value)
+        self.n += 1
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        self._compress()
+
+    def merge(self, other: "KLLSketch") -> None:
+        """Add all values summarized by another sketch"""
+        if not other.n:
+            return
+        while len(self.levels) < len(other.levels):
+            self.levels.append([])
+        for level, items in enumerate(other.levels):
+            self.levels[level].extend(items)
+        self.n += other.n
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+        self._compress()
+
+    def _capacity(self, level: int) -> int:
+        """Number of items a level may hold before it is compacted"""
+        depth = len(self.levels) - level - 1
+        return max(2, int(math.ceil(self.k * _CAPACITY_DECAY ** depth)))
+
+    def _compress(self) -> None:
+        """Compact levels until the total size fits the total capacity"""
+        while sum(map(len, self.levels)) > sum(self._capacity(h) for h in range(len(self.levels))):
+            for level, items in enumerate(self.levels):
+                if len(items) < self._capacity(level):
+                    continue
+                if level + 1 == len(self.levels):
+                    self.levels.append([])
+                items.sort()
+                # An odd item out stays at this level, so total weight is preserved
+                kept = [items.pop()] if len(items) % 2 else []
+                offset = self._compactions % 2
+                self._compactions += 1
+                self.levels[level + 1].extend(items[offset::2])
+                self.levels[level] = kept
+                break
+
+    def quantiles(self, fractions: Iterable[float]) -> List[Optional[float]]:
+        """
+        Estimate quantiles (fractions between 0 and 1)
+
+        Interpolates linearly between neighbouring ranks, which matches
+        PostgreSQL's percentile_cont while the sketch is still exact.
+        """
+        if not self.n:
+            return [None for _ in fractions]
+
+        weighted = sorted(
+            (value, 1 << level)
+            for level, items in enumerate(self.levels)
+            for value in items
+        )
+        # Rank (0-based) of the last value each item stands for
+        last_ranks = []
+        rank = -1
+        for _, weight in weighted:
+            rank += weight
+            last_ranks.append(rank)
+
+        def value_at(target: int) -> float:
+            low, high = 0, len(last_ranks) - 1
+            while low < high:
+                mid = (low + high) // 2
+                if last_ranks[mid] < target:
+                    low = mid + 1
+                else:
+                    high = mid
+            return weighted[low][0]
+
+        results = []
+        for fraction in fractions:
+            position = min(max(fraction, 0.0), 1.0) * (self.n - 1)
+            below = int(math.floor(position))
+            lower = value_at(below)
+            upper = value_at(min(below + 1, self.n - 1))
+            value = lower + (upper - lower) * (position - below)
+            results.append(min(max(value, self.min), self.max))
+        return results
+
+    def percentiles(self, percents: Iterable[int]) -> Dict[str, Optional[float]]:
+        """Estimate percentiles, keyed "p5", "p50", ..."""
+        percents = list(percents)
+        return {
+            f"p{percent}": value
+            for percent, value in zip(percents, self.quantiles(p / 100 for p in percents))
+        }
+
+    def to_dict(self) -> dict:
+        """Serialize to a JSON-compatible dict (stored in metric_rollups.sketch)"""
+        return {
+            "k": self.k,
+            "n": self.n,
+            "min": self.min,
+            "max": self.max,
+            "compactions": self._compactions,
+            "levels": self.levels
+        }
+
+    @classmethod
+    def from_dict(cls, data: Optional[dict]) -> "KLLSketch":
+        """Deserialize a stored sketch (an empty sketch if missing)"""
+        sketch = cls()
+        if data:
+            sketch.k = data.get("k", QUANTILE_SKETCH_K)
+            sketch.n = data["n"]
+            sketch.min = data["min"]
+            sketch.max = data["max"]
+            sketch._compactions = data.get("compactions", 0)
+            sketch.levels = [list(items) for items in data["levels"]] or [[]]
+        return sketch
+
+    @classmethod
+    def from_values(cls, values: Iterable[float]) -> "KLLSketch":
+        """Build a sketch of the given values"""
+        sketch = cls()
+        for value in values:
+            sketch.update(value)
+        return sketch
@@ -0,0 +1,42 @@
+"""
+Fast JSON serialization for trusted payloads built by the services
+
+Payloads are plain dicts and lists of primitives assembled from database rows,
+so they are serialized straight to bytes without building or validating
+Pydantic models. orjson is used when installed, the json module otherwise.
+"""
+import json
+from datetime import date, datetime
+from typing import Any
+
+try:
+    import orjson
+    USE_ORJSON = True
+except ImportError:
+    USE_ORJSON = False
+
+
+def _default(value: Any) -> Any:
+    """Fallback encoder for the json module (orjson handles these natively)"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """Serialize a payload to compact UTF-8 JSON bytes"""
+    if USE_ORJSON:
+        return orjson.dumps(content)
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        separators=(",", ":"),
+        default=_default
+    ).encode("utf-8")
+
+
+def loads(data: bytes) -> Any:
+    """Parse JSON bytes (raises ValueError on malformed input)"""
+    if USE_ORJSON:
+        return orjson.loads(data)
+    return json.loads(data)
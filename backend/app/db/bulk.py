@@ -0,0 +1,66 @@
+"""
+Bulk loading of rows into a table (PostgreSQL COPY, multi-row INSERT otherwise)
+"""
+import io
+from datetime import datetime
+from typing import Any, List, Sequence
+
+from sqlalchemy import Table, insert
+from sqlalchemy.orm import Session
+
+from app.core.serialization import dumps
+
+# Characters with a meaning in COPY text format
+_COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def insert_rows(db: Session, table: Table, columns: Sequence[str], rows: List[tuple]) -> None:
+    """
+    Insert rows (tuples of values in column order) in the session's transaction
+    
+    With psycopg2 (copy_expert) and psycopg 3 (cursor.copy) the rows are sent
+    with one COPY ... FROM STDIN; other drivers get a multi-row INSERT. dict and
+    list values are written as JSON, bytes as bytea. Does not commit.
+    """
+    if not rows:
+        return
+    
+    cursor = db.connection().connection.cursor()
+    try:
+        copy_sql = f"COPY {table.name} ({', '.join(columns)}) FROM STDIN"
+        if hasattr(cursor, "copy_expert"):
+            # psycopg2
+            cursor.copy_expert(copy_sql, io.StringIO(_copy_data(rows)))
+            return
+        if hasattr(cursor, "copy"):
+            # psycopg 3
+            with cursor.copy(copy_sql) as copy:
+                copy.write(_copy_data(rows))
+            return
+    finally:
+        cursor.close()
+    
+    db.execute(insert(table), [dict(zip(columns, row)) for row in rows])
+
+
+def _copy_data(rows: List[tuple]) -> str:
+    """Rows in COPY text format"""
+    return "".join("\t".join(_copy_value(value) for value in row) + "\n" for row in rows)
+
+
+def _copy_value(value: Any) -> str:
+    """A value in COPY text format"""
+    if value is None:
+        return "\\N"
+    if isinstance(value, str):
+        return value.translate(_COPY_ESCAPES)
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, (dict, list)):
+        return dumps(value).decode("utf-8").translate(_COPY_ESCAPES)
+    if isinstance(value, bytes):
+        # bytea hex format; the backslash itself is escaped for COPY
+        return "\\\\x" + value.hex()
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
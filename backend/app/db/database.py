@@ -35,4 +35,6 @@ def get_db():
 def init_db():
     """Initialize database tables"""
     from app.db import models
-    Base.metadata.create_all(bind=engine)
+    # Views are created by DDL attached to the metadata, not as tables
+    tables = [table for table in Base.metadata.sorted_tables if not table.info.get("is_view")]
+    Base.metadata.create_all(bind=engine, tables=tables)
@@ -1,11 +1,15 @@
 """
 Database models for LLM Lab
 """
-from sqlalchemy import Column, Integer, String, Float, Text, DateTime, ForeignKey
-from sqlalchemy.dialects.postgresql import JSONB
-from sqlalchemy.orm import relationship
+from sqlalchemy import (
+    DDL, BigInteger, Column, Computed, Integer, String, Float, Text, DateTime, ForeignKey, LargeBinary, Index, event
+)
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
+from sqlalchemy.orm import deferred, relationship
 from sqlalchemy.sql import func
 from app.db.database import Base
+from app.core.constants import METRIC_NAMES, SEARCH_TEXT_CONFIG
+from app.core.metric_storage import COMPONENT_METRICS, METRIC_ID_STRIDE
 
 
 class Experiment(Base):
@@ -15,8 +19,13 @@ class Experiment(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(255), nullable=False)
     prompt = Column(Text, nullable=False)
+    model = Column(String(100), nullable=True, index=True)  # LLM that generated the responses
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # Set once generation has finished; no responses are added after that (metrics may still be written)
+    completed_at = Column(DateTime(timezone=True), nullable=True)
+    # Bumped in the same transaction as every write to the responses, metrics or rollups (cache keys)
+    data_version = Column(BigInteger, nullable=False, default=0, server_default="0")
     
     # Relationships
     responses = relationship("Response", back_populates="experiment", cascade="all, delete-orphan")
@@ -41,19 +50,49 @@ class Response(Base):
     # Validation metadata (stores validation results)
     validation_metadata = Column(JSONB, nullable=True)
     
+    # Packed MinHash signature of the text (for cross-response diversity)
+    minhash_signature = Column(LargeBinary, nullable=True)
+    
+    # Quality metrics, one column per metric (see app.core.metric_storage)
+    length_score = Column(Float, nullable=True)
+    coherence_score = Column(Float, nullable=True)
+    completeness_score = Column(Float, nullable=True)
+    structure_score = Column(Float, nullable=True)
+    readability_score = Column(Float, nullable=True)
+    overall_score = Column(Float, nullable=True)
+    
+    # Metadata of the metrics by metric name, without repeated values (None if not stored)
+    metric_metadata = deferred(Column(JSONB, nullable=True))
+    
+    # Full-text search document of the text, generated by the database (not loaded with the row)
+    search_vector = deferred(Column(TSVECTOR, Computed(f"to_tsvector('{SEARCH_TEXT_CONFIG}', text)", persisted=True)))
+    
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     # Relationships
     experiment = relationship("Experiment", back_populates="responses")
-    metrics = relationship("Metric", back_populates="response", cascade="all, delete-orphan")
+    
+    __table_args__ = (
+        # Keyset pages of an experiment's responses in ID order
+        Index("idx_responses_experiment_id_id", "experiment_id", "id"),
+        # Full-text search over response text
+        Index("idx_responses_search_vector", "search_vector", postgresql_using="gin"),
+        # Leaderboards: ordered scan of one metric's values, keyset on (value, id)
+        *(Index(f"idx_responses_{name}_id", name, "id") for name in METRIC_NAMES),
+    )
 
 
 class Metric(Base):
-    """Metric model - stores calculated quality metrics for responses"""
+    """
+    Metric model - one row per metric of a response (read only)
+    
+    Maps the `metrics` view, which unpivots the metric columns of responses into
+    the shape of the former metrics table. Write metrics with MetricRepository.
+    """
     __tablename__ = "metrics"
     
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(BigInteger, primary_key=True)
     response_id = Column(Integer, ForeignKey("responses.id"), nullable=False)
     
     # Metric name and value
@@ -62,8 +101,65 @@ class Metric(Base):
     
     metadata_json = Column(JSONB, nullable=True)
     
-    # Timestamp
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Timestamp (of the response)
+    created_at = Column(DateTime(timezone=True))
     
-    # Relationships
-    response = relationship("Response", back_populates="metrics")
+    __table_args__ = {"info": {"is_view": True}}
+
+
+def _metrics_view_sql() -> str:
+    """CREATE VIEW statement of the metrics view (also in migrations/010_wide_metric_columns.sql)"""
+    overall = "(r.metric_metadata -> 'overall_score')"
+    components = ", ".join(f"'{name}', r.{name}" for name in COMPONENT_METRICS)
+    rows = []
+    for ordinal, name in enumerate(METRIC_NAMES):
+        metadata = f"r.metric_metadata -> '{name}'"
+        if name == "overall_score":
+            # component_scores are dropped on write when they repeat the other columns
+            metadata = (
+                f"CASE WHEN {overall} -> 'component_scores' IS NULL "
+                f"THEN {overall} || jsonb_build_object('component_scores', jsonb_build_object({components})) "
+                f"ELSE {overall} END"
+            )
+        rows.append(f"({ordinal}, '{name}', r.{name}, {metadata})")
+    return (
+        "CREATE OR REPLACE VIEW metrics AS "
+        f"SELECT r.id::bigint * {METRIC_ID_STRIDE} + m.ordinal AS id, r.id AS response_id, "
+        "m.name::varchar(100) AS name, m.value, m.metadata AS metadata_json, r.created_at "
+        f"FROM responses r CROSS JOIN LATERAL (VALUES {', '.join(rows)}) "
+        "AS m(ordinal, name, value, metadata) WHERE m.value IS NOT NULL"
+    )
+
+
+# Databases created by init_db get the view too (unless metrics is still the pre-010 table)
+event.listen(Base.metadata, "after_create", DDL(
+    "DO $view$ BEGIN "
+    "IF NOT EXISTS (SELECT 1 FROM pg_class WHERE relname = 'metrics' AND relkind = 'r') THEN "
+    + _metrics_view_sql() +
+    "; END IF; END $view$"
+))
+
+
+class MetricRollup(Base):
+    """Metric rollup model - running statistics per experiment, metric and parameter cell"""
+    __tablename__ = "metric_rollups"
+    
+    experiment_id = Column(Integer, ForeignKey("experiments.id", ondelete="CASCADE"), primary_key=True)
+    metric_name = Column(String(100), primary_key=True, index=True)
+    temperature = Column(Float, primary_key=True)
+    top_p = Column(Float, primary_key=True)
+    
+    # Running statistics (mean and m2 are maintained with Welford's algorithm)
+    count = Column(Integer, nullable=False)
+    sum = Column(Float, nullable=False)
+    sum_sq = Column(Float, nullable=False)
+    mean = Column(Float, nullable=False)
+    m2 = Column(Float, nullable=False)
+    min = Column(Float, nullable=False)
+    max = Column(Float, nullable=False)
+    
+    # Mergeable KLL quantile sketch of the values (see app.core.quantile_sketch)
+    sketch = Column(JSONB, nullable=True)
+    
+    # Timestamp
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
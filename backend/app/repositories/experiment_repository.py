@@ -1,9 +1,11 @@
 """
 Experiment repository - Database operations for experiments
 """
+from datetime import datetime
+from sqlalchemy import Float, cast, func, select, tuple_, update
 from sqlalchemy.orm import Session
-from typing import List, Optional
-from app.db.models import Experiment, Response
+from typing import Any, List, Optional, Tuple
+from app.db.models import Experiment, MetricRollup, Response
 from app.core.constants import DEFAULT_PAGINATION_LIMIT
 
 
@@ -11,19 +13,126 @@ class ExperimentRepository:
     """Repository for experiment database operations"""
     
     @staticmethod
-    def create(db: Session, name: str, prompt: str) -> Experiment:
+    def create(db: Session, name: str, prompt: str, model: Optional[str] = None) -> Experiment:
         """Create a new experiment"""
-        experiment = Experiment(name=name, prompt=prompt)
+        experiment = Experiment(name=name, prompt=prompt, model=model)
         db.add(experiment)
         db.commit()
         db.refresh(experiment)
         return experiment
     
+    @staticmethod
+    def add(
+        db: Session,
+        name: str,
+        prompt: str,
+        model: Optional[str] = None,
+        completed: bool = False
+    ) -> Experiment:
+        """
+        Add an experiment in the current transaction without committing
+        
+        The row is flushed so its ID can be used, and becomes visible only when
+        the caller commits (a rollback leaves nothing behind).
+        
+        Args:
+            completed: Set completed_at too (for experiments loaded in one transaction)
+        """
+        experiment = Experiment(name=name, prompt=prompt, model=model)
+        if completed:
+            experiment.completed_at = func.now()
+        db.add(experiment)
+        db.flush()
+        return experiment
+    
+    @staticmethod
+    def mark_completed(db: Session, experiment_id: int) -> Optional[Experiment]:
+        """Record that an experiment's generation has finished (no responses are added from now on)"""
+        experiment = db.query(Experiment).filter(Experiment.id == experiment_id).first()
+        if not experiment:
+            return None
+        experiment.completed_at = func.now()
+        experiment.data_version = Experiment.data_version + 1
+        db.commit()
+        db.refresh(experiment)
+        return experiment
+    
+    @staticmethod
+    def bump_version(db: Session, experiment_id: Optional[int] = None) -> None:
+        """
+        Increment the data_version of an experiment (every experiment if None)
+        
+        Does not commit: call inside the transaction that writes the experiment's
+        responses, metrics or rollups, so the new version is visible exactly when
+        the data is.
+        """
+        stmt = update(Experiment).values(data_version=Experiment.data_version + 1)
+        if experiment_id is not None:
+            stmt = stmt.where(Experiment.id == experiment_id)
+        db.execute(stmt.execution_options(synchronize_session=False))
+    
+    @staticmethod
+    def get_version(db: Session, experiment_id: int) -> Optional[int]:
+        """Get the data_version of an experiment (None if it does not exist)"""
+        return db.query(Experiment.data_version).filter(Experiment.id == experiment_id).scalar()
+    
     @staticmethod
     def get_by_id(db: Session, experiment_id: int) -> Optional[Experiment]:
         """Get experiment by ID"""
         return db.query(Experiment).filter(Experiment.id == experiment_id).first()
     
+    @staticmethod
+    def get_by_ids(db: Session, experiment_ids: List[int]) -> List[Experiment]:
+        """Get experiments by ID, in ID order (unknown IDs are skipped)"""
+        return db.query(Experiment).filter(
+            Experiment.id.in_(experiment_ids)
+        ).order_by(Experiment.id).all()
+    
+    @staticmethod
+    def find(
+        db: Session,
+        experiment_ids: Optional[List[int]] = None,
+        name: Optional[str] = None,
+        prompt: Optional[str] = None,
+        model: Optional[str] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+        completed_only: bool = False,
+        limit: Optional[int] = None
+    ) -> List[Experiment]:
+        """
+        Get the experiments matching all given filters, in ID order
+        
+        Args:
+            experiment_ids: Only these experiments
+            name: Only experiments whose name contains this text (case-insensitive)
+            prompt: Only experiments whose prompt contains this text (case-insensitive)
+            model: Only experiments generated with this model
+            created_from: Only experiments created at or after this time
+            created_to: Only experiments created before this time
+            completed_only: Only experiments whose generation has finished
+            limit: Maximum number of experiments
+        """
+        query = db.query(Experiment)
+        if experiment_ids:
+            query = query.filter(Experiment.id.in_(experiment_ids))
+        if name:
+            query = query.filter(Experiment.name.ilike(f"%{name}%"))
+        if prompt:
+            query = query.filter(Experiment.prompt.ilike(f"%{prompt}%"))
+        if model is not None:
+            query = query.filter(Experiment.model == model)
+        if created_from is not None:
+            query = query.filter(Experiment.created_at >= created_from)
+        if created_to is not None:
+            query = query.filter(Experiment.created_at < created_to)
+        if completed_only:
+            query = query.filter(Experiment.completed_at.isnot(None))
+        query = query.order_by(Experiment.id)
+        if limit is not None:
+            query = query.limit(limit)
+        return query.all()
+    
     @staticmethod
     def get_all(
         db: Session, 
@@ -33,6 +142,93 @@ class ExperimentRepository:
         """Get all experiments with pagination"""
         return db.query(Experiment).offset(skip).limit(limit).all()
     
+    @staticmethod
+    def get_page_with_stats(
+        db: Session,
+        limit: int,
+        before: Optional[Tuple[datetime, int]] = None,
+        name: Optional[str] = None,
+        prompt: Optional[str] = None
+    ) -> List:
+        """
+        Get experiments newest first, with response statistics, in a single query
+        
+        The page is selected first (keyset on (created_at, id), which walks
+        idx_experiments_created_at backwards), then only its experiments are
+        aggregated.
+        
+        Args:
+            limit: Maximum number of experiments
+            before: (created_at, id) of the last experiment of the previous page
+            name: Only experiments whose name contains this text (case-insensitive)
+            prompt: Only experiments whose prompt contains this text (case-insensitive)
+        """
+        page = select(Experiment)
+        if before is not None:
+            page = page.where(tuple_(Experiment.created_at, Experiment.id) < tuple_(*before))
+        if name:
+            page = page.where(Experiment.name.ilike(f"%{name}%"))
+        if prompt:
+            page = page.where(Experiment.prompt.ilike(f"%{prompt}%"))
+        page = page.order_by(Experiment.created_at.desc(), Experiment.id.desc()).limit(limit)
+        return ExperimentRepository._with_stats(db, page.cte("experiment_page"))
+    
+    @staticmethod
+    def get_with_stats(db: Session, experiment_id: int) -> Optional[Any]:
+        """Get an experiment with its response statistics, in a single query"""
+        page = select(Experiment).where(Experiment.id == experiment_id).cte("experiment_page")
+        rows = ExperimentRepository._with_stats(db, page)
+        return rows[0] if rows else None
+    
+    @staticmethod
+    def _with_stats(db: Session, page) -> List:
+        """
+        Join response counts, valid/corrupted counts and the mean overall_score onto experiments
+        
+        The mean overall_score comes from metric_rollups, so metric rows are not read.
+        """
+        page_ids = select(page.c.id)
+        is_valid = Response.validation_metadata["is_valid"].as_boolean()
+        is_corrupted = Response.validation_metadata["is_corrupted"].as_boolean()
+        counts = select(
+            Response.experiment_id,
+            func.count(Response.id).label("response_count"),
+            func.count(Response.id).filter(is_valid.is_(True)).label("valid_count"),
+            func.count(Response.id).filter(is_corrupted.is_(True)).label("corrupted_count")
+        ).where(Response.experiment_id.in_(page_ids)).group_by(Response.experiment_id).subquery()
+        overall = select(
+            MetricRollup.experiment_id,
+            (func.sum(MetricRollup.sum) / cast(func.sum(MetricRollup.count), Float)).label("mean_overall_score")
+        ).where(
+            MetricRollup.metric_name == "overall_score",
+            MetricRollup.experiment_id.in_(page_ids)
+        ).group_by(MetricRollup.experiment_id).subquery()
+        
+        return db.execute(
+            select(
+                page.c.id,
+                page.c.name,
+                page.c.prompt,
+                page.c.model,
+                page.c.created_at,
+                page.c.completed_at,
+                page.c.data_version,
+                func.coalesce(counts.c.response_count, 0).label("response_count"),
+                func.coalesce(counts.c.valid_count, 0).label("valid_count"),
+                func.coalesce(counts.c.corrupted_count, 0).label("corrupted_count"),
+                overall.c.mean_overall_score
+            ).outerjoin(
+                counts, counts.c.experiment_id == page.c.id
+            ).outerjoin(
+                overall, overall.c.experiment_id == page.c.id
+            ).order_by(page.c.created_at.desc(), page.c.id.desc())
+        ).all()
+    
+    @staticmethod
+    def get_all_ids(db: Session) -> List[int]:
+        """Get the IDs of all experiments"""
+        return [row.id for row in db.query(Experiment.id).order_by(Experiment.id).all()]
+    
     @staticmethod
     def delete(db: Session, experiment_id: int) -> bool:
         """Delete an experiment"""
@@ -1,9 +1,33 @@
 """
 Metric repository - Database operations for metrics
+
+Metric values are columns of responses (see app.core.metric_storage); metric rows
+are read from the `metrics` view.
 """
-from sqlalchemy.orm import Session
-from typing import List, Optional
-from app.db.models import Metric
+from collections import namedtuple
+from sqlalchemy import BigInteger, cast, func, tuple_
+from sqlalchemy.orm import Session, undefer
+from typing import Dict, List, Optional, Tuple
+from app.db.models import Experiment, Metric, Response
+from app.repositories.experiment_repository import ExperimentRepository
+from app.repositories.rollup_repository import RollupRepository
+from app.core.constants import METRIC_NAMES
+from app.core.exceptions import ResponseNotFoundError
+from app.core.metric_storage import METRIC_ID_STRIDE, column_values, compact_metadata, expand_metadata
+
+# Statistics of one metric in an experiment
+MetricAggregate = namedtuple("MetricAggregate", ["name", "count", "mean", "median", "min", "max", "std_dev"])
+# Value of one metric of one response, with the response's parameters
+MetricPoint = namedtuple("MetricPoint", ["name", "response_id", "temperature", "top_p", "value"])
+
+_AGGREGATES = (
+    func.count,
+    func.avg,
+    lambda value: func.percentile_cont(0.5).within_group(value),
+    func.min,
+    func.max,
+    func.stddev_samp
+)
 
 
 class MetricRepository:
@@ -17,17 +41,10 @@ class MetricRepository:
         value: float,
         metadata: Optional[dict] = None
     ) -> Metric:
-        """Create a new metric"""
-        metric = Metric(
-            response_id=response_id,
-            name=name,
-            value=value,
-            metadata_json=metadata
-        )
-        db.add(metric)
-        db.commit()
-        db.refresh(metric)
-        return metric
+        """Store a metric of a response and add it to the experiment's rollups"""
+        return MetricRepository.create_batch(
+            db, response_id, {name: {"value": value, "metadata": metadata}}
+        )[0]
     
     @staticmethod
     def create_batch(
@@ -35,29 +52,190 @@ class MetricRepository:
         response_id: int,
         metrics: dict
     ) -> List[Metric]:
-        """Create multiple metrics for a response"""
-        metric_objects = []
-        for metric_name, metric_value in metrics.items():
-            metric = Metric(
-                response_id=response_id,
-                name=metric_name,
-                value=metric_value.get("value", 0.0),
-                metadata_json=metric_value.get("metadata")
+        """
+        Store metrics of a response and add them to the experiment's rollups
+        
+        Metrics the response did not have yet are added to the rollups of its
+        parameter cell; if any metric replaces a stored value, the cell's rollups
+        are rebuilt instead, so values are never counted twice.
+        
+        Args:
+            metrics: {name: {"value": ..., "metadata": ...}}; names must be METRIC_NAMES
+        
+        Returns:
+            The stored metrics as rows of the metrics view, built without reading it back
+        
+        Raises:
+            ResponseNotFoundError: If the response does not exist
+            ValueError: If a metric has no column
+        """
+        values = column_values(metrics)
+        response = db.get(Response, response_id, options=[undefer(Response.metric_metadata)])
+        if response is None:
+            raise ResponseNotFoundError(f"Response with id {response_id} not found")
+        
+        overwritten = any(getattr(response, metric_name) is not None for metric_name in values)
+        for metric_name, value in values.items():
+            setattr(response, metric_name, value)
+        document = compact_metadata(metrics, {name: getattr(response, name) for name in METRIC_NAMES})
+        if document is not None:
+            response.metric_metadata = {**(response.metric_metadata or {}), **document}
+        
+        # Same transaction as the metrics
+        if overwritten:
+            db.flush()
+            RollupRepository.rebuild(db, response.experiment_id, response.temperature, response.top_p)
+        else:
+            RollupRepository.apply_metrics(
+                db, response.experiment_id, response.temperature, response.top_p, values
             )
-            metric_objects.append(metric)
-            db.add(metric)
+        ExperimentRepository.bump_version(db, response.experiment_id)
+        
+        # Read before the commit expires the response
+        stored = {name: getattr(response, name) for name in METRIC_NAMES}
+        metadata = expand_metadata(response.metric_metadata, stored)
+        created_at = response.created_at
         db.commit()
-        return metric_objects
+        return [
+            Metric(
+                id=response_id * METRIC_ID_STRIDE + position,
+                response_id=response_id,
+                name=name,
+                value=stored[name],
+                metadata_json=metadata[name],
+                created_at=created_at
+            )
+            for position, name in enumerate(METRIC_NAMES)
+            if name in values
+        ]
     
     @staticmethod
     def get_by_response_id(db: Session, response_id: int) -> List[Metric]:
         """Get all metrics for a response"""
         return db.query(Metric).filter(Metric.response_id == response_id).all()
     
+    @staticmethod
+    def get_by_response_ids(db: Session, response_ids: List[int], with_metadata: bool = True) -> List:
+        """Get (response_id, name, value[, metadata_json]) of all metrics of the given responses"""
+        if not response_ids:
+            return []
+        columns = [Metric.response_id, Metric.name, Metric.value]
+        if with_metadata:
+            columns.append(Metric.metadata_json)
+        return db.query(*columns).filter(Metric.response_id.in_(response_ids)).order_by(Metric.response_id, Metric.id).all()
+    
     @staticmethod
     def get_by_experiment_id(db: Session, experiment_id: int) -> List[Metric]:
         """Get all metrics for all responses in an experiment"""
-        from app.db.models import Response
         return db.query(Metric).join(Response).filter(
             Response.experiment_id == experiment_id
         ).all()
+    
+    @staticmethod
+    def get_experiment_aggregates(db: Session, experiment_id: int) -> List[MetricAggregate]:
+        """
+        Get count, mean, median, min, max and sample std dev of each metric in an experiment
+        
+        One scan of the experiment's responses computes the statistics of every
+        metric column. Metrics without values are left out.
+        """
+        row = db.query(*[
+            aggregate(getattr(Response, name))
+            for name in METRIC_NAMES
+            for aggregate in _AGGREGATES
+        ]).filter(Response.experiment_id == experiment_id).one()
+        
+        width = len(_AGGREGATES)
+        aggregates = []
+        for position, name in enumerate(METRIC_NAMES):
+            stats = row[position * width:(position + 1) * width]
+            if stats[0]:
+                aggregates.append(MetricAggregate(name, *stats))
+        return aggregates
+    
+    @staticmethod
+    def get_experiment_points(db: Session, experiment_id: int) -> List[MetricPoint]:
+        """Get (name, response_id, temperature, top_p, value) of every metric in an experiment, in response order"""
+        rows = db.query(
+            Response.id,
+            Response.temperature,
+            Response.top_p,
+            *[getattr(Response, name) for name in METRIC_NAMES]
+        ).filter(
+            Response.experiment_id == experiment_id
+        ).order_by(Response.id).all()
+        return [
+            MetricPoint(name, row.id, row.temperature, row.top_p, getattr(row, name))
+            for row in rows
+            for name in METRIC_NAMES
+            if getattr(row, name) is not None
+        ]
+    
+    @staticmethod
+    def get_experiment_medians(db: Session, experiment_id: int) -> Dict[str, float]:
+        """Get the median of each metric in an experiment, by metric name"""
+        row = db.query(*[
+            func.percentile_cont(0.5).within_group(getattr(Response, name))
+            for name in METRIC_NAMES
+        ]).filter(Response.experiment_id == experiment_id).one()
+        return {name: median for name, median in zip(METRIC_NAMES, row) if median is not None}
+    
+    @staticmethod
+    def get_leaderboard(
+        db: Session,
+        name: str,
+        descending: bool,
+        limit: int,
+        after: Optional[Tuple[float, int]] = None,
+        min_temperature: Optional[float] = None,
+        max_temperature: Optional[float] = None,
+        min_top_p: Optional[float] = None,
+        max_top_p: Optional[float] = None
+    ) -> List:
+        """
+        Get the highest (or lowest) values of a metric across all experiments
+        
+        Ordered by (value, response id) to match the metric column's
+        idx_responses_<metric>_id index, so the database walks the index from one
+        end and stops after `limit` matching rows.
+        
+        Args:
+            after: (value, metric id) of the last row of the previous page
+            
+        Returns:
+            Rows of (metric_id, value, response_id, experiment_id, experiment_name, temperature, top_p)
+        """
+        if name not in METRIC_NAMES:
+            return []
+        value = getattr(Response, name)
+        sort_key = tuple_(value, Response.id)
+        query = db.query(
+            # ID of the metric in the metrics view
+            (cast(Response.id, BigInteger) * METRIC_ID_STRIDE + METRIC_NAMES.index(name)).label("metric_id"),
+            value.label("value"),
+            Response.id.label("response_id"),
+            Response.experiment_id,
+            Experiment.name.label("experiment_name"),
+            Response.temperature,
+            Response.top_p
+        ).join(
+            Experiment, Experiment.id == Response.experiment_id
+        ).filter(value.isnot(None))
+        
+        if after is not None:
+            after_key = tuple_(after[0], after[1] // METRIC_ID_STRIDE)
+            query = query.filter(sort_key < after_key if descending else sort_key > after_key)
+        if min_temperature is not None:
+            query = query.filter(Response.temperature >= min_temperature)
+        if max_temperature is not None:
+            query = query.filter(Response.temperature <= max_temperature)
+        if min_top_p is not None:
+            query = query.filter(Response.top_p >= min_top_p)
+        if max_top_p is not None:
+            query = query.filter(Response.top_p <= max_top_p)
+        
+        if descending:
+            query = query.order_by(value.desc(), Response.id.desc())
+        else:
+            query = query.order_by(value.asc(), Response.id.asc())
+        return query.limit(limit).all()
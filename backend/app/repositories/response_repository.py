@@ -1,9 +1,23 @@
 """
 Response repository - Database operations for responses
 """
+from sqlalchemy import Float, cast, func, select, tuple_, update
 from sqlalchemy.orm import Session
-from typing import List, Optional
-from app.db.models import Response
+from typing import Collection, Dict, Iterator, List, Optional, Sequence, Tuple
+from app.db.bulk import insert_rows
+from app.db.models import Experiment, Response
+from app.repositories.experiment_repository import ExperimentRepository
+from app.repositories.rollup_repository import RollupRepository
+from app.core.constants import EXPORT_BATCH_SIZE, METRIC_NAMES, SEARCH_HEADLINE_OPTIONS, SEARCH_TEXT_CONFIG
+from app.core.metric_storage import column_values, compact_metadata
+
+
+# Columns written by bulk_insert, in row tuple order
+BULK_COLUMNS = (
+    "experiment_id", "temperature", "top_p", "max_tokens", "text",
+    "finish_reason", "validation_metadata", "minhash_signature", "created_at",
+    *METRIC_NAMES, "metric_metadata",
+)
 
 
 class ResponseRepository:
@@ -18,9 +32,20 @@ class ResponseRepository:
         max_tokens: int,
         text: str,
         finish_reason: str,
-        validation_metadata: Optional[dict] = None
+        validation_metadata: Optional[dict] = None,
+        minhash_signature: Optional[bytes] = None,
+        metrics: Optional[Dict[str, dict]] = None
     ) -> Response:
-        """Create a new response"""
+        """
+        Create a new response, with its calculated metrics if given
+        
+        Metrics ({name: {"value": ..., "metadata": ...}}) are stored in the same
+        row and added to the experiment's rollups in the same transaction.
+        
+        Raises:
+            ValueError: If a metric has no column (see METRIC_NAMES)
+        """
+        values = column_values(metrics or {})
         response = Response(
             experiment_id=experiment_id,
             temperature=temperature,
@@ -28,24 +53,318 @@ class ResponseRepository:
             max_tokens=max_tokens,
             text=text,
             finish_reason=finish_reason,
-            validation_metadata=validation_metadata
+            validation_metadata=validation_metadata,
+            minhash_signature=minhash_signature,
+            metric_metadata=compact_metadata(metrics, values) if metrics else None,
+            **values
         )
         db.add(response)
+        RollupRepository.apply_metrics(db, experiment_id, temperature, top_p, values)
+        ExperimentRepository.bump_version(db, experiment_id)
         db.commit()
         db.refresh(response)
         return response
     
+    @staticmethod
+    def bulk_insert(db: Session, rows: List[tuple]) -> None:
+        """
+        Insert many responses with their metrics without building ORM objects (COPY on PostgreSQL)
+        
+        Args:
+            rows: Tuples of BULK_COLUMNS values (IDs come from the sequence)
+        
+        Does not commit, update rollups or invalidate caches: meant for loading
+        experiments that are not completed yet.
+        """
+        insert_rows(db, Response.__table__, BULK_COLUMNS, rows)
+    
     @staticmethod
     def get_by_id(db: Session, response_id: int) -> Optional[Response]:
         """Get response by ID"""
         return db.query(Response).filter(Response.id == response_id).first()
     
+    @staticmethod
+    def get_experiment_version(db: Session, response_id: int) -> Optional[int]:
+        """Get the data_version of a response's experiment (None if the response does not exist)"""
+        return db.query(Experiment.data_version).join(
+            Response, Response.experiment_id == Experiment.id
+        ).filter(Response.id == response_id).scalar()
+    
     @staticmethod
     def get_by_experiment_id(db: Session, experiment_id: int) -> List[Response]:
         """Get all responses for an experiment"""
         return db.query(Response).filter(Response.experiment_id == experiment_id).all()
     
     @staticmethod
-    def get_all_for_metrics_summary(db: Session, experiment_id: int) -> List[Response]:
-        """Get all responses for an experiment (optimized for metrics summary)"""
-        return db.query(Response).filter(Response.experiment_id == experiment_id).all()
+    def get_page(
+        db: Session,
+        experiment_id: int,
+        after_id: Optional[int] = None,
+        limit: Optional[int] = None,
+        temperature: Optional[float] = None,
+        top_p: Optional[float] = None,
+        is_valid: Optional[bool] = None,
+        fields: Optional[Collection[str]] = None,
+        text_preview: Optional[int] = None
+    ) -> List:
+        """
+        Get an experiment's responses in ID order, one keyset page at a time
+        
+        Args:
+            after_id: Only responses with a greater ID (the last ID of the previous page)
+            limit: Maximum number of responses (all if None)
+            temperature: Only responses generated with this temperature
+            top_p: Only responses generated with this top_p
+            is_valid: Only responses whose validation result matches
+            fields: Columns to select (all if None); id is always selected
+            text_preview: Truncate text to this many characters in the database
+        """
+        query = db.query(
+            *ResponseRepository._columns(fields, text_preview)
+        ).filter(Response.experiment_id == experiment_id)
+        
+        if after_id is not None:
+            query = query.filter(Response.id > after_id)
+        if temperature is not None:
+            query = query.filter(Response.temperature == temperature)
+        if top_p is not None:
+            query = query.filter(Response.top_p == top_p)
+        if is_valid is not None:
+            query = query.filter(Response.validation_metadata["is_valid"].as_boolean() == is_valid)
+        
+        query = query.order_by(Response.id)
+        if limit is not None:
+            query = query.limit(limit)
+        return query.all()
+    
+    @staticmethod
+    def stream_with_metric_values(
+        db: Session,
+        experiment_ids: Sequence[int],
+        metric_names: Sequence[str],
+        fields: Optional[Collection[str]] = None,
+        text_preview: Optional[int] = None,
+        batch_size: int = EXPORT_BATCH_SIZE
+    ) -> Iterator:
+        """
+        Stream experiments' responses in (experiment ID, ID) order with one value column per metric
+        
+        Metric values are columns of the response rows, so nothing is joined or
+        grouped, and rows are fetched through a server-side cursor batch_size at a
+        time, so memory stays flat whatever the size of the experiments. The session must not
+        be used for anything else until the iterator is exhausted.
+        
+        Args:
+            experiment_ids: Experiments to read, in one query
+            metric_names: Metric columns to select (see METRIC_NAMES)
+            fields: Columns to select (all if None); id is always selected
+            text_preview: Truncate text to this many characters in the database
+        """
+        metric_columns = [getattr(Response, name) for name in metric_names]
+        return ResponseRepository._stream(
+            db, experiment_ids, fields, text_preview, metric_columns, batch_size
+        )
+    
+    @staticmethod
+    def stream_with_metrics(
+        db: Session,
+        experiment_ids: Sequence[int],
+        fields: Optional[Collection[str]] = None,
+        text_preview: Optional[int] = None,
+        with_metadata: bool = True,
+        batch_size: int = EXPORT_BATCH_SIZE
+    ) -> Iterator:
+        """
+        Stream experiments' responses in (experiment ID, ID) order with all their metrics
+        
+        Rows have every metric column, and metric_metadata if with_metadata
+        (see app.core.metric_storage.metric_entries); they are fetched through a
+        server-side cursor as in stream_with_metric_values.
+        """
+        metric_columns = [getattr(Response, name) for name in METRIC_NAMES]
+        if with_metadata:
+            metric_columns.append(Response.metric_metadata)
+        return ResponseRepository._stream(
+            db, experiment_ids, fields, text_preview, metric_columns, batch_size
+        )
+    
+    @staticmethod
+    def _stream(
+        db: Session,
+        experiment_ids: Sequence[int],
+        fields: Optional[Collection[str]],
+        text_preview: Optional[int],
+        metric_columns: List,
+        batch_size: int
+    ) -> Iterator:
+        """Server-side cursor over experiments' projected responses and metric columns"""
+        return db.query(
+            *ResponseRepository._columns(fields, text_preview),
+            *metric_columns
+        ).filter(
+            Response.experiment_id.in_(experiment_ids)
+        ).order_by(Response.experiment_id, Response.id).yield_per(batch_size)
+    
+    @staticmethod
+    def get_by_ids(
+        db: Session,
+        response_ids: Collection[int],
+        fields: Optional[Collection[str]] = None,
+        text_preview: Optional[int] = None
+    ) -> List:
+        """
+        Get the selected columns of many responses in one query (in no particular order)
+        
+        Args:
+            fields: Columns to select (all if None); id is always selected
+            text_preview: Truncate text to this many characters in the database
+        """
+        if not response_ids:
+            return []
+        return db.query(
+            *ResponseRepository._columns(fields, text_preview)
+        ).filter(Response.id.in_(response_ids)).all()
+    
+    @staticmethod
+    def _columns(fields: Optional[Collection[str]], text_preview: Optional[int]) -> List:
+        """Columns of a projected response query: id, then the selected fields"""
+        text = Response.text
+        if text_preview is not None:
+            text = func.substr(Response.text, 1, text_preview).label("text")
+        columns = {
+            "experiment_id": Response.experiment_id,
+            "temperature": Response.temperature,
+            "top_p": Response.top_p,
+            "max_tokens": Response.max_tokens,
+            "text": text,
+            "finish_reason": Response.finish_reason,
+            "validation_metadata": Response.validation_metadata,
+            "created_at": Response.created_at
+        }
+        return [Response.id] + [
+            column for name, column in columns.items() if fields is None or name in fields
+        ]
+    
+    @staticmethod
+    def search(
+        db: Session,
+        query_text: str,
+        limit: int,
+        after: Optional[Tuple[float, int]] = None,
+        experiment_ids: Optional[List[int]] = None,
+        min_temperature: Optional[float] = None,
+        max_temperature: Optional[float] = None,
+        min_top_p: Optional[float] = None,
+        max_top_p: Optional[float] = None
+    ) -> List:
+        """
+        Full-text search over response text, best matches first
+        
+        Matching rows are found through idx_responses_search_vector and ranked with
+        ts_rank_cd; headlines, the costly part, are only built for the returned page.
+        
+        Args:
+            query_text: Web-search style query ("quoted phrases", or, -excluded words)
+            limit: Page size
+            after: (rank, response id) of the last row of the previous page
+            
+        Returns:
+            Rows of (id, experiment_id, experiment_name, temperature, top_p, rank, snippet)
+        """
+        tsquery = func.websearch_to_tsquery(SEARCH_TEXT_CONFIG, query_text)
+        # Ranks are real; as double they round-trip exactly through the cursor
+        rank = cast(func.ts_rank_cd(Response.search_vector, tsquery), Float)
+        
+        hits = select(Response.id, rank.label("rank")).where(
+            Response.search_vector.bool_op("@@")(tsquery)
+        )
+        if after is not None:
+            hits = hits.where(tuple_(rank, Response.id) < tuple_(*after))
+        if experiment_ids:
+            hits = hits.where(Response.experiment_id.in_(experiment_ids))
+        if min_temperature is not None:
+            hits = hits.where(Response.temperature >= min_temperature)
+        if max_temperature is not None:
+            hits = hits.where(Response.temperature <= max_temperature)
+        if min_top_p is not None:
+            hits = hits.where(Response.top_p >= min_top_p)
+        if max_top_p is not None:
+            hits = hits.where(Response.top_p <= max_top_p)
+        hits = hits.order_by(rank.desc(), Response.id.desc()).limit(limit).cte("search_hits")
+        
+        return db.execute(
+            select(
+                Response.id,
+                Response.experiment_id,
+                Experiment.name.label("experiment_name"),
+                Response.temperature,
+                Response.top_p,
+                hits.c.rank,
+                func.ts_headline(
+                    SEARCH_TEXT_CONFIG, Response.text, tsquery, SEARCH_HEADLINE_OPTIONS
+                ).label("snippet")
+            ).join(
+                Response, Response.id == hits.c.id
+            ).join(
+                Experiment, Experiment.id == Response.experiment_id
+            ).order_by(hits.c.rank.desc(), Response.id.desc())
+        ).all()
+    
+    @staticmethod
+    def get_all_for_metrics_summary(db: Session, experiment_id: int) -> List:
+        """Get id and parameters of all responses for an experiment (optimized for metrics summary)"""
+        return db.query(
+            Response.id,
+            Response.temperature,
+            Response.top_p
+        ).filter(Response.experiment_id == experiment_id).order_by(Response.id).all()
+    
+    @staticmethod
+    def get_signatures(db: Session, experiment_id: int) -> List:
+        """Get id, parameters and MinHash signature of every response in an experiment"""
+        return db.query(
+            Response.id,
+            Response.temperature,
+            Response.top_p,
+            Response.minhash_signature
+        ).filter(Response.experiment_id == experiment_id).order_by(Response.id).all()
+    
+    @staticmethod
+    def set_signatures(db: Session, signatures: Dict[int, bytes]) -> None:
+        """Store packed MinHash signatures by response ID (one bulk UPDATE by primary key)"""
+        if not signatures:
+            return
+        db.execute(update(Response), [
+            {"id": response_id, "minhash_signature": signature}
+            for response_id, signature in signatures.items()
+        ])
+        db.commit()
+    
+    @staticmethod
+    def get_texts_by_ids(db: Session, response_ids: List[int]) -> Dict[int, str]:
+        """Get response texts by ID"""
+        rows = db.query(Response.id, Response.text).filter(Response.id.in_(response_ids)).all()
+        return {row.id: row.text for row in rows}
+    
+    @staticmethod
+    def get_ids(db: Session, experiment_id: int) -> List[int]:
+        """Get the IDs of an experiment's responses (read from the (experiment_id, id) index)"""
+        rows = db.query(Response.id).filter(Response.experiment_id == experiment_id).all()
+        return [row.id for row in rows]
+    
+    @staticmethod
+    def get_texts_with_parameters(
+        db: Session,
+        experiment_id: int,
+        response_ids: Optional[List[int]] = None
+    ) -> List:
+        """Get id, parameters and text of an experiment's responses (only the given IDs if set), in ID order"""
+        query = db.query(
+            Response.id,
+            Response.temperature,
+            Response.top_p,
+            Response.text
+        ).filter(Response.experiment_id == experiment_id)
+        if response_ids is not None:
+            query = query.filter(Response.id.in_(response_ids))
+        return query.order_by(Response.id).all()
@@ -0,0 +1,270 @@
+"""
+Rollup repository - Database operations for per-experiment metric rollups
+"""
+from datetime import datetime
+from sqlalchemy import Float, cast, distinct, func, literal, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from typing import Dict, List, Optional
+from app.core.quantile_sketch import KLLSketch
+from app.db.models import Experiment, Metric, MetricRollup, Response
+
+_ROLLUP_KEY = ["experiment_id", "metric_name", "temperature", "top_p"]
+
+
+class RollupRepository:
+    """Repository for metric rollup database operations"""
+    
+    @staticmethod
+    def apply_metrics(
+        db: Session,
+        experiment_id: int,
+        temperature: float,
+        top_p: float,
+        values: Dict[str, float]
+    ) -> None:
+        """
+        Add one response's metric values to the rollups of its parameter cell
+        
+        One multi-row upsert applies a Welford update to every metric's row and
+        locks it; the quantile sketches returned by the upsert are then updated and
+        written back in one batch. Rows are upserted in metric name order so
+        concurrent writers lock them in the same order.
+        Does not commit: call inside the transaction that inserts the metrics.
+        """
+        if not values:
+            return
+        
+        stmt = insert(MetricRollup).values([
+            {
+                "experiment_id": experiment_id,
+                "metric_name": metric_name,
+                "temperature": temperature,
+                "top_p": top_p,
+                "count": 1,
+                "sum": value,
+                "sum_sq": value * value,
+                "mean": value,
+                "m2": 0.0,
+                "min": value,
+                "max": value
+            }
+            for metric_name, value in sorted(values.items())
+        ])
+        # SET expressions see the row's old values
+        new_count = cast(MetricRollup.count + 1, Float)
+        delta = stmt.excluded.mean - MetricRollup.mean
+        new_mean = MetricRollup.mean + delta / new_count
+        stmt = stmt.on_conflict_do_update(
+            index_elements=_ROLLUP_KEY,
+            set_={
+                "count": MetricRollup.count + 1,
+                "sum": MetricRollup.sum + stmt.excluded.sum,
+                "sum_sq": MetricRollup.sum_sq + stmt.excluded.sum_sq,
+                "mean": new_mean,
+                "m2": MetricRollup.m2 + delta * (stmt.excluded.mean - new_mean),
+                "min": func.least(MetricRollup.min, stmt.excluded.min),
+                "max": func.greatest(MetricRollup.max, stmt.excluded.max),
+                "updated_at": func.now()
+            }
+        ).returning(MetricRollup.metric_name, MetricRollup.sketch)
+        
+        sketch_updates = []
+        for metric_name, stored_sketch in db.execute(stmt).all():
+            sketch = KLLSketch.from_dict(stored_sketch)
+            sketch.update(values[metric_name])
+            sketch_updates.append({
+                "experiment_id": experiment_id,
+                "metric_name": metric_name,
+                "temperature": temperature,
+                "top_p": top_p,
+                "sketch": sketch.to_dict()
+            })
+        # Bulk UPDATE by primary key
+        db.execute(update(MetricRollup), sketch_updates)
+    
+    @staticmethod
+    def get_by_experiment_id(db: Session, experiment_id: int) -> List[MetricRollup]:
+        """Get all rollup rows (one per metric and parameter cell) for an experiment"""
+        return db.query(MetricRollup).filter(
+            MetricRollup.experiment_id == experiment_id
+        ).order_by(MetricRollup.metric_name).all()
+    
+    @staticmethod
+    def get_for_metric(
+        db: Session,
+        metric_name: str,
+        experiment_ids: Optional[List[int]] = None,
+        temperature: Optional[float] = None,
+        top_p: Optional[float] = None
+    ) -> List[MetricRollup]:
+        """Get the rollup rows of one metric, optionally limited to experiments and a parameter cell"""
+        query = db.query(MetricRollup).filter(MetricRollup.metric_name == metric_name)
+        if experiment_ids:
+            query = query.filter(MetricRollup.experiment_id.in_(experiment_ids))
+        if temperature is not None:
+            query = query.filter(MetricRollup.temperature == temperature)
+        if top_p is not None:
+            query = query.filter(MetricRollup.top_p == top_p)
+        return query.all()
+    
+    @staticmethod
+    def get_heatmap_bins(
+        db: Session,
+        metric_name: str,
+        temperature_bin: float,
+        top_p_bin: float,
+        model: Optional[str] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+        experiment_ids: Optional[List[int]] = None
+    ) -> List:
+        """
+        Merge the rollups of one metric into temperature x top_p bins
+        
+        Within each bin, M2 is combined as sum(m2 + count * (mean - bin_mean)^2),
+        which avoids the cancellation of sum_sq - sum^2 / count.
+        
+        Returns:
+            Rows of (temperature, top_p, count, mean, m2, min, max, experiment_count),
+            where temperature and top_p are the lower edges of the bin
+        """
+        # The epsilon keeps values on a bin edge (0.3 / 0.1 = 2.999...) in their own bin
+        temperature = func.floor(MetricRollup.temperature / temperature_bin + 1e-9) * temperature_bin
+        top_p = func.floor(MetricRollup.top_p / top_p_bin + 1e-9) * top_p_bin
+        in_bin = {"partition_by": [temperature, top_p]}
+        
+        cells = select(
+            temperature.label("temperature"),
+            top_p.label("top_p"),
+            MetricRollup.experiment_id,
+            MetricRollup.count,
+            MetricRollup.mean,
+            MetricRollup.m2,
+            MetricRollup.min,
+            MetricRollup.max,
+            (
+                func.sum(MetricRollup.sum).over(**in_bin)
+                / cast(func.sum(MetricRollup.count).over(**in_bin), Float)
+            ).label("bin_mean")
+        ).join(Experiment, Experiment.id == MetricRollup.experiment_id).where(
+            MetricRollup.metric_name == metric_name
+        )
+        if model is not None:
+            cells = cells.where(Experiment.model == model)
+        if created_from is not None:
+            cells = cells.where(Experiment.created_at >= created_from)
+        if created_to is not None:
+            cells = cells.where(Experiment.created_at < created_to)
+        if experiment_ids:
+            cells = cells.where(MetricRollup.experiment_id.in_(experiment_ids))
+        cells = cells.subquery()
+        
+        total = cast(func.sum(cells.c.count), Float)
+        return db.execute(
+            select(
+                cells.c.temperature,
+                cells.c.top_p,
+                func.sum(cells.c.count).label("count"),
+                (func.sum(cells.c.count * cells.c.mean) / total).label("mean"),
+                func.sum(
+                    cells.c.m2 + cells.c.count * (cells.c.mean - cells.c.bin_mean) * (cells.c.mean - cells.c.bin_mean)
+                ).label("m2"),
+                func.min(cells.c.min).label("min"),
+                func.max(cells.c.max).label("max"),
+                func.count(distinct(cells.c.experiment_id)).label("experiment_count")
+            ).group_by(
+                cells.c.temperature, cells.c.top_p
+            ).order_by(
+                cells.c.temperature, cells.c.top_p
+            )
+        ).all()
+    
+    @staticmethod
+    def rebuild(
+        db: Session,
+        experiment_id: Optional[int] = None,
+        temperature: Optional[float] = None,
+        top_p: Optional[float] = None
+    ) -> int:
+        """
+        Recompute rollups from the metrics table (all experiments if experiment_id is None)
+        
+        Running statistics are aggregated by the database; quantile sketches are
+        rebuilt from the metric values, streamed one parameter cell at a time.
+        Does not commit or bump data_version: the caller owns the transaction.
+        
+        Args:
+            db: Database session
+            experiment_id: Only this experiment's rollups
+            temperature: With top_p, only the rollups of this parameter cell
+            top_p: With temperature, only the rollups of this parameter cell
+        
+        Returns:
+            Number of rollup rows written
+        """
+        delete_query = db.query(MetricRollup)
+        if experiment_id is not None:
+            delete_query = delete_query.filter(MetricRollup.experiment_id == experiment_id)
+        if temperature is not None and top_p is not None:
+            delete_query = delete_query.filter(
+                MetricRollup.temperature == temperature,
+                MetricRollup.top_p == top_p
+            )
+        delete_query.delete(synchronize_session=False)
+        
+        aggregates = db.query(
+            Response.experiment_id,
+            Metric.name,
+            Response.temperature,
+            Response.top_p,
+            func.count(Metric.value),
+            func.sum(Metric.value),
+            func.sum(Metric.value * Metric.value),
+            func.avg(Metric.value),
+            func.coalesce(func.var_pop(Metric.value) * func.count(Metric.value), literal(0.0)),
+            func.min(Metric.value),
+            func.max(Metric.value)
+        ).join(Response).group_by(
+            Response.experiment_id, Metric.name, Response.temperature, Response.top_p
+        )
+        if experiment_id is not None:
+            aggregates = aggregates.filter(Response.experiment_id == experiment_id)
+        if temperature is not None and top_p is not None:
+            aggregates = aggregates.filter(Response.temperature == temperature, Response.top_p == top_p)
+        
+        result = db.execute(
+            insert(MetricRollup).from_select(
+                _ROLLUP_KEY + ["count", "sum", "sum_sq", "mean", "m2", "min", "max"],
+                aggregates
+            )
+        )
+        
+        values = db.query(
+            Response.experiment_id,
+            Metric.name,
+            Response.temperature,
+            Response.top_p,
+            Metric.value
+        ).join(Response).order_by(
+            Response.experiment_id, Metric.name, Response.temperature, Response.top_p, Metric.id
+        )
+        if experiment_id is not None:
+            values = values.filter(Response.experiment_id == experiment_id)
+        if temperature is not None and top_p is not None:
+            values = values.filter(Response.temperature == temperature, Response.top_p == top_p)
+        
+        sketch_updates = []
+        key, sketch = None, None
+        for row in values.yield_per(10000):
+            row_key = tuple(row[:4])
+            if row_key != key:
+                if sketch is not None:
+                    sketch_updates.append(dict(zip(_ROLLUP_KEY, key), sketch=sketch.to_dict()))
+                key, sketch = row_key, KLLSketch()
+            sketch.update(row.value)
+        if sketch is not None:
+            sketch_updates.append(dict(zip(_ROLLUP_KEY, key), sketch=sketch.to_dict()))
+        if sketch_updates:
+            db.execute(update(MetricRollup), sketch_updates)
+        return result.rowcount
@@ -9,10 +9,18 @@ from app.schemas.experiment import (
 from app.schemas.response import (
     ResponseWithMetrics,
     MetricData,
+    SimilarResponse,
+    ResponseSearchResults,
+    ResponseBatchRequest,
 )
+from app.schemas.export import BulkExportRequest, ImportResult
 from app.schemas.metrics import (
     MetricsSummary,
     MetricSummaryItem,
+    DiversitySummary,
+    MetricQuantiles,
+    ParameterHeatmap,
+    Leaderboard,
 )
 
 __all__ = [
@@ -21,6 +29,15 @@ __all__ = [
     "ExperimentDetail",
     "ResponseWithMetrics",
     "MetricData",
+    "SimilarResponse",
+    "ResponseSearchResults",
+    "ResponseBatchRequest",
     "MetricsSummary",
     "MetricSummaryItem",
+    "DiversitySummary",
+    "MetricQuantiles",
+    "ParameterHeatmap",
+    "Leaderboard",
+    "BulkExportRequest",
+    "ImportResult",
 ]
@@ -2,7 +2,7 @@
 Experiment schemas
 """
 from pydantic import BaseModel, Field
-from typing import List
+from typing import List, Optional
 
 
 class ExperimentCreate(BaseModel):
@@ -27,12 +27,18 @@ class ExperimentResponse(BaseModel):
     id: int
     name: str
     prompt: str
+    model: Optional[str] = None
     created_at: str
+    completed_at: Optional[str] = Field(default=None, description="When generation finished (None while running)")
     
     class Config:
         from_attributes = True
 
 
 class ExperimentDetail(ExperimentResponse):
-    """Schema for detailed experiment view"""
+    """Schema for detailed experiment view (also used for experiment list entries)"""
+    data_version: int = Field(default=0, description="Data version; pass as ?v= for immutable response and export URLs")
     response_count: int = Field(default=0, description="Number of responses generated")
+    valid_count: int = Field(default=0, description="Number of responses that passed validation")
+    corrupted_count: int = Field(default=0, description="Number of responses flagged as corrupted")
+    mean_overall_score: Optional[float] = Field(default=None, description="Mean overall_score of the responses")
@@ -0,0 +1,37 @@
+"""
+Export and import schemas
+"""
+from datetime import datetime
+from pydantic import BaseModel, Field
+from typing import List, Optional
+
+from app.core.constants import MAX_EXPORT_EXPERIMENTS
+from app.schemas.experiment import ExperimentResponse
+
+
+class BulkExportRequest(BaseModel):
+    """Schema for exporting many experiments as one zip archive"""
+    experiment_ids: Optional[List[int]] = Field(
+        None,
+        min_length=1,
+        max_length=MAX_EXPORT_EXPERIMENTS,
+        description="Experiments to export (combined with the filters below)"
+    )
+    name: Optional[str] = Field(None, description="Only experiments whose name contains this text")
+    prompt: Optional[str] = Field(None, description="Only experiments whose prompt contains this text")
+    model: Optional[str] = Field(None, description="Only experiments generated with this model")
+    created_from: Optional[datetime] = Field(None, description="Only experiments created at or after this time")
+    created_to: Optional[datetime] = Field(None, description="Only experiments created before this time")
+    completed_only: bool = Field(default=False, description="Skip experiments that are still generating")
+    format: str = Field(default="csv", pattern="^(csv|ndjson|parquet)$", description="File format per experiment")
+    fields: Optional[str] = Field(None, description="Comma-separated response fields to include (CSV / NDJSON)")
+    exclude: Optional[str] = Field(None, description="Comma-separated response fields to leave out (CSV / NDJSON)")
+    text_preview: Optional[int] = Field(None, ge=0, description="Truncate text to this many characters (CSV / NDJSON)")
+    include_text: bool = Field(default=True, description="Include the text column (Parquet)")
+
+
+class ImportResult(BaseModel):
+    """Schema for the result of importing an experiment"""
+    experiment: ExperimentResponse
+    response_count: int = Field(..., description="Number of responses loaded")
+    metric_count: int = Field(..., description="Number of metrics loaded")
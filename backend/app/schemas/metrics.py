@@ -2,7 +2,7 @@
 Metrics summary schemas
 """
 from pydantic import BaseModel, Field
-from typing import List
+from typing import Dict, List, Optional
 
 
 class MetricResponseData(BaseModel):
@@ -29,3 +29,73 @@ class MetricsSummary(BaseModel):
     # This will be a dict mapping metric names to MetricSummaryItem
     # We use dict[str, MetricSummaryItem] for flexibility
     pass
+
+
+class ResponseNovelty(BaseModel):
+    """Schema for a response's novelty relative to the rest of its experiment"""
+    response_id: int
+    temperature: float
+    top_p: float
+    novelty: float
+
+
+class DiversitySummary(BaseModel):
+    """Schema for cross-response diversity of an experiment"""
+    response_count: int
+    diversity: float = Field(..., description="1 - mean pairwise similarity of responses")
+    mean_similarity: float
+    near_duplicate_threshold: float
+    clusters: List[List[int]] = Field(..., description="Response IDs of near-duplicate groups")
+    responses: List[ResponseNovelty]
+
+
+class MetricQuantiles(BaseModel):
+    """Schema for a metric's statistics merged across experiments and parameter cells"""
+    metric: str
+    experiment_ids: List[int]
+    count: int
+    mean: float
+    std_dev: float
+    min: float
+    max: float
+    percentiles: Dict[str, Optional[float]] = Field(..., description="p5, p25, p50, p75 and p95 from merged quantile sketches")
+
+
+class HeatmapCell(BaseModel):
+    """Schema for one temperature x top_p bin of a parameter heatmap"""
+    temperature: float = Field(..., description="Lower edge of the temperature bin")
+    top_p: float = Field(..., description="Lower edge of the top_p bin")
+    count: int
+    mean: float
+    std_dev: float
+    min: float
+    max: float
+    experiment_count: int
+
+
+class ParameterHeatmap(BaseModel):
+    """Schema for a metric binned over temperature and top_p across experiments"""
+    metric: str
+    temperature_bin: float
+    top_p_bin: float
+    temperatures: List[float]
+    top_ps: List[float]
+    cells: List[HeatmapCell]
+
+
+class LeaderboardEntry(BaseModel):
+    """Schema for one ranked response in a metric leaderboard"""
+    response_id: int
+    experiment_id: int
+    experiment_name: str
+    temperature: float
+    top_p: float
+    value: float
+
+
+class Leaderboard(BaseModel):
+    """Schema for a page of responses ranked by a metric across experiments"""
+    metric: str
+    order: str
+    entries: List[LeaderboardEntry]
+    next_cursor: Optional[str] = Field(None, description="Pass as cursor to get the next page")
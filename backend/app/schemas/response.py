@@ -4,6 +4,8 @@ Response schemas
 from pydantic import BaseModel, Field
 from typing import List, Optional
 
+from app.core.constants import MAX_BATCH_FETCH_IDS
+
 
 class ValidationMetadata(BaseModel):
     """Schema for response validation metadata"""
@@ -36,3 +38,37 @@ class ResponseWithMetrics(BaseModel):
     
     class Config:
         from_attributes = True
+
+
+class ResponseBatchRequest(BaseModel):
+    """Schema for fetching many responses by ID"""
+    ids: List[int] = Field(..., min_length=1, max_length=MAX_BATCH_FETCH_IDS, description="Response IDs, in the order to return them")
+    fields: Optional[str] = Field(None, description="Comma-separated fields to include, e.g. id,text,metrics")
+    exclude: Optional[str] = Field(None, description="Comma-separated fields to leave out, e.g. metrics.metadata")
+    text_preview: Optional[int] = Field(None, ge=0, description="Truncate text to this many characters")
+
+
+class SimilarResponse(BaseModel):
+    """Schema for a response similar to another response"""
+    response_id: int
+    temperature: float
+    top_p: float
+    similarity: float = Field(..., description="TF-IDF cosine similarity (0-1)")
+
+
+class SearchHit(BaseModel):
+    """Schema for one full-text search match"""
+    response_id: int
+    experiment_id: int
+    experiment_name: str
+    temperature: float
+    top_p: float
+    rank: float = Field(..., description="ts_rank_cd relevance (higher is better)")
+    snippet: str = Field(..., description="Matching fragments, terms wrapped in <mark>")
+
+
+class ResponseSearchResults(BaseModel):
+    """Schema for a page of full-text search results"""
+    query: str
+    hits: List[SearchHit]
+    next_cursor: Optional[str] = Field(None, description="Pass as cursor to get the next page")
@@ -0,0 +1,160 @@
+"""
+Diversity Service - Cross-response similarity analysis from MinHash signatures
+"""
+from collections import Counter
+from sqlalchemy.orm import Session
+from typing import Dict, List
+
+from app.repositories.response_repository import ResponseRepository
+from app.services.minhash import MinHasher
+from app.core.constants import LSH_BANDS, NEAR_DUPLICATE_THRESHOLD
+
+
+class DiversityService:
+    """Service for measuring how different an experiment's responses are from one another"""
+
+    @staticmethod
+    def get_experiment_diversity(db: Session, experiment_id: int) -> dict:
+        """
+        Get diversity, near-duplicate clusters and per-response novelty for an experiment
+
+        Args:
+            db: Database session
+            experiment_id: ID of the experiment
+
+        Returns:
+            Dictionary with experiment-level diversity and per-response novelty
+        """
+        rows, signatures = DiversityService._load_signatures(db, experiment_id)
+        analysis = DiversityService.analyze(signatures)
+
+        return {
+            "response_count": len(rows),
+            "diversity": analysis["diversity"],
+            "mean_similarity": analysis["mean_similarity"],
+            "near_duplicate_threshold": NEAR_DUPLICATE_THRESHOLD,
+            "clusters": [
+                [rows[idx].id for idx in cluster]
+                for cluster in analysis["clusters"]
+            ],
+            "responses": [
+                {
+                    "response_id": row.id,
+                    "temperature": row.temperature,
+                    "top_p": row.top_p,
+                    "novelty": novelty
+                }
+                for row, novelty in zip(rows, analysis["novelty"])
+            ]
+        }
+
+    @staticmethod
+    def get_novelty_scores(db: Session, experiment_id: int) -> Dict[int, float]:
+        """Get the novelty score of each response in an experiment, by response ID"""
+        rows, signatures = DiversityService._load_signatures(db, experiment_id)
+        novelty = DiversityService.analyze(signatures, with_clusters=False)["novelty"]
+        return {row.id: score for row, score in zip(rows, novelty)}
+
+    @staticmethod
+    def _load_signatures(db: Session, experiment_id: int) -> tuple:
+        """
+        Load stored signatures, computing and storing any that are missing
+
+        Responses scored before MinHash have no signature; theirs are computed
+        once and written back, so later reads find them.
+        """
+        rows = ResponseRepository.get_signatures(db, experiment_id)
+        signatures = [MinHasher.unpack(row.minhash_signature) for row in rows]
+
+        missing_ids = [row.id for row, sig in zip(rows, signatures) if sig is None]
+        if missing_ids:
+            hasher = MinHasher()
+            texts = ResponseRepository.get_texts_by_ids(db, missing_ids)
+            computed = {response_id: hasher.signature(texts.get(response_id, "")) for response_id in missing_ids}
+            ResponseRepository.set_signatures(db, {
+                response_id: MinHasher.pack(signature) for response_id, signature in computed.items()
+            })
+            print(f"[DIVERSITY {experiment_id}] Stored {len(computed)} missing MinHash signatures")
+            signatures = [
+                sig if sig is not None else computed[row.id]
+                for row, sig in zip(rows, signatures)
+            ]
+
+        return rows, signatures
+
+    @staticmethod
+    def analyze(signatures: List[List[int]], with_clusters: bool = True) -> dict:
+        """
+        Analyze a set of MinHash signatures in O(n * num_perm)
+
+        The mean of all pairwise similarity estimates equals the number of colliding
+        pairs per signature slot averaged over slots, so it is computed from value
+        counts instead of comparing pairs. Near-duplicates are found with LSH banding.
+
+        Returns:
+            Dictionary with diversity, mean_similarity, novelty (per signature)
+            and clusters (lists of signature indices, largest first)
+        """
+        n = len(signatures)
+        if n < 2:
+            return {
+                "diversity": 0.0,
+                "mean_similarity": 0.0,
+                "novelty": [0.0] * n,
+                "clusters": []
+            }
+
+        num_perm = len(signatures[0])
+        slot_counts = [Counter(sig[i] for sig in signatures) for i in range(num_perm)]
+
+        colliding_pairs = sum(
+            c * (c - 1) // 2
+            for counts in slot_counts
+            for c in counts.values()
+        )
+        mean_similarity = colliding_pairs / (num_perm * n * (n - 1) / 2)
+
+        novelty = [
+            round(1.0 - sum(slot_counts[i][value] - 1 for i, value in enumerate(sig)) / (num_perm * (n - 1)), 3)
+            for sig in signatures
+        ]
+
+        return {
+            "diversity": round(1.0 - mean_similarity, 3),
+            "mean_similarity": round(mean_similarity, 3),
+            "novelty": novelty,
+            "clusters": DiversityService._find_clusters(signatures) if with_clusters else []
+        }
+
+    @staticmethod
+    def _find_clusters(signatures: List[List[int]]) -> List[List[int]]:
+        """Group near-duplicate signatures using LSH banding and union-find"""
+        rows_per_band = len(signatures[0]) // LSH_BANDS
+        parent = list(range(len(signatures)))
+
+        def find(idx: int) -> int:
+            while parent[idx] != idx:
+                parent[idx] = parent[parent[idx]]
+                idx = parent[idx]
+            return idx
+
+        buckets: Dict[tuple, int] = {}
+        for idx, sig in enumerate(signatures):
+            for band in range(LSH_BANDS):
+                start = band * rows_per_band
+                key = (band, tuple(sig[start:start + rows_per_band]))
+                # Compare against the bucket's first member only, keeping each bucket linear
+                rep = buckets.setdefault(key, idx)
+                if rep == idx:
+                    continue
+                root_rep, root_idx = find(rep), find(idx)
+                if root_rep != root_idx and MinHasher.similarity(signatures[rep], sig) >= NEAR_DUPLICATE_THRESHOLD:
+                    parent[root_idx] = root_rep
+
+        groups: Dict[int, List[int]] = {}
+        for idx in range(len(signatures)):
+            groups.setdefault(find(idx), []).append(idx)
+
+        clusters = [members for members in groups.values() if len(members) > 1]
+        clusters.sort(key=len, reverse=True)
+        return clusters
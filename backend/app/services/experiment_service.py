@@ -8,10 +8,10 @@ from sqlalchemy.orm import Session
 
 from app.repositories.experiment_repository import ExperimentRepository
 from app.repositories.response_repository import ResponseRepository
-from app.repositories.metric_repository import MetricRepository
 from app.services.llm_service import LLMService
 from app.services.metric_calculator import MetricCalculator
 from app.services.response_validator import ResponseValidator
+from app.services.minhash import MinHasher
 from app.schemas.experiment import ExperimentCreate
 from app.core.constants import DEFAULT_BATCH_SIZE
 from app.core.exceptions import LLMServiceError
@@ -25,6 +25,7 @@ class ExperimentService:
         self.llm_service = LLMService()
         self.metric_calculator = MetricCalculator()
         self.validator = ResponseValidator()
+        self.minhasher = MinHasher()
     
     async def create_experiment(
         self,
@@ -45,7 +46,8 @@ class ExperimentService:
         experiment = ExperimentRepository.create(
             db=db,
             name=experiment_data.name,
-            prompt=experiment_data.prompt
+            prompt=experiment_data.prompt,
+            model=self.llm_service.model_name
         )
         
         # Generate parameter combinations
@@ -66,11 +68,15 @@ class ExperimentService:
         
         print(f"[EXPERIMENT {experiment.id}] Generation complete: {success_count}/{len(param_combinations)} successful")
         
+        experiment = ExperimentRepository.mark_completed(db, experiment.id) or experiment
+        
         return {
             "id": experiment.id,
             "name": experiment.name,
             "prompt": experiment.prompt,
-            "created_at": experiment.created_at.isoformat() if experiment.created_at else ""
+            "model": experiment.model,
+            "created_at": experiment.created_at.isoformat() if experiment.created_at else "",
+            "completed_at": experiment.completed_at.isoformat() if experiment.completed_at else None
         }
     
     async def _generate_responses_batch(
@@ -171,6 +177,9 @@ class ExperimentService:
             metrics = self.metric_calculator.calculate_all_metrics(response_text)
             print(f"[EXPERIMENT {experiment_id}] Metrics calculated for response {idx}: {list(metrics.keys())}")
             
+            # Signature for cross-response diversity
+            minhash_signature = MinHasher.pack(self.minhasher.signature(response_text))
+            
             # Save to database with new session (thread-safe)
             local_db = SessionLocal()
             try:
@@ -183,7 +192,7 @@ class ExperimentService:
                     "warnings": validation["warnings"]
                 }
                 
-                # Create response
+                # Create response with its metrics (one row, one transaction)
                 response = ResponseRepository.create(
                     db=local_db,
                     experiment_id=experiment_id,
@@ -192,13 +201,8 @@ class ExperimentService:
                     max_tokens=max_tokens,
                     text=response_text,
                     finish_reason=llm_response.get("finish_reason", "stop"),
-                    validation_metadata=validation_metadata
-                )
-                
-                # Create metrics
-                MetricRepository.create_batch(
-                    db=local_db,
-                    response_id=response.id,
+                    validation_metadata=validation_metadata,
+                    minhash_signature=minhash_signature,
                     metrics=metrics
                 )
                 
@@ -0,0 +1,635 @@
+"""
+Export service - Streams experiment exports from a server-side cursor
+"""
+import csv
+import hashlib
+import io
+import json
+import zipfile
+from datetime import datetime, timezone
+from typing import Collection, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from app.db.database import SessionLocal
+from app.repositories.experiment_repository import ExperimentRepository
+from app.repositories.response_repository import ResponseRepository
+from app.core.artifact_store import artifact_store
+from app.core.constants import (
+    BULK_EXPORT_QUERY_EXPERIMENTS, EXPORT_BATCH_SIZE, EXPORT_PREGENERATE_FORMATS, METRIC_NAMES,
+    PARQUET_COMPRESSION, PARQUET_ROW_GROUP_SIZE
+)
+from app.core.metric_storage import metric_entries
+from app.core.projection import EXPORT_FIELDS, fields_key
+from app.core.serialization import dumps
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+# CSV columns per export field
+CSV_COLUMNS = {
+    "id": ["Response ID"],
+    "temperature": ["Temperature"],
+    "top_p": ["Top P"],
+    "max_tokens": ["Max Tokens"],
+    "text": ["Text"],
+    "finish_reason": ["Finish Reason"],
+    "created_at": ["Created At"],
+    "metrics": [
+        "Length Score", "Coherence Score", "Completeness Score",
+        "Structure Score", "Readability Score", "Overall Score"
+    ],
+}
+CSV_METRICS = list(METRIC_NAMES)
+# Columns exported when no projection is requested
+CSV_DEFAULT_FIELDS = ("id", "temperature", "top_p", "max_tokens", "text", "finish_reason", "metrics")
+
+# Response columns read for Parquet exports (validation flags come from validation_metadata)
+_PARQUET_FIELDS = (
+    "experiment_id", "temperature", "top_p", "max_tokens", "finish_reason",
+    "validation_metadata", "created_at",
+)
+_PARQUET_FLAGS = ("is_valid", "is_corrupted", "is_truncated")
+
+
+# Media type per export format (the format name is also the file extension)
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv",
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+# Part of export ETags and artifact keys: bump whenever the bytes of an export change for the same data
+EXPORT_FORMAT_VERSION = 1
+
+
+def parquet_available() -> bool:
+    """Whether pyarrow is installed (required for Parquet exports)"""
+    return pa is not None
+
+
+class _ChunkSink:
+    """Write-only file object whose contents are handed out as they are written"""
+    
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+        self.closed = False
+    
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+    
+    def tell(self) -> int:
+        return self._position
+    
+    def flush(self) -> None:
+        pass
+    
+    def close(self) -> None:
+        self.closed = True
+    
+    def take(self) -> bytes:
+        """Bytes written since the last call"""
+        chunk = b"".join(self._chunks)
+        self._chunks.clear()
+        return chunk
+
+
+class _Counter:
+    """Iterator wrapper that counts the items passed through"""
+    
+    def __init__(self, items: Iterable):
+        self._items = iter(items)
+        self.count = 0
+    
+    def __iter__(self):
+        return self
+    
+    def __next__(self):
+        item = next(self._items)
+        self.count += 1
+        return item
+
+
+class ExportService:
+    """Service for streaming experiment exports"""
+    
+    @staticmethod
+    def csv_fields(fields: Optional[Collection[str]]) -> list:
+        """Export fields written as CSV columns, in column order"""
+        return [
+            field for field in (CSV_DEFAULT_FIELDS if fields is None else EXPORT_FIELDS)
+            if field in CSV_COLUMNS and (fields is None or field in fields)
+        ]
+    
+    @staticmethod
+    def stream_csv(
+        experiment_id: int,
+        fields: Optional[Collection[str]] = None,
+        text_preview: Optional[int] = None
+    ) -> Iterator[bytes]:
+        """
+        Generate an experiment's CSV export chunk by chunk
+        
+        Rows come from one query (responses with their metrics pivoted into
+        columns) read through a server-side cursor, and each batch of rows is
+        yielded as soon as it is written, so memory use does not grow with the
+        experiment and the first bytes go out after the first batch.
+        
+        Uses its own session: the request's session may be closed before a
+        streamed body has been sent.
+        
+        Args:
+            experiment_id: ID of the experiment
+            fields: Export fields to include (see EXPORT_FIELDS; default columns if None)
+            text_preview: Truncate text to this many characters
+            
+        Yields:
+            UTF-8 encoded CSV chunks, header first
+        """
+        db = SessionLocal()
+        try:
+            rows = ExportService._query_rows(db, [experiment_id], "csv", fields, text_preview)
+            yield from ExportService._encode_csv(rows, ExportService.csv_fields(fields))
+        finally:
+            db.close()
+    
+    @staticmethod
+    def stream_json(
+        experiment: dict,
+        fields: Optional[Collection[str]] = None,
+        text_preview: Optional[int] = None
+    ) -> Iterator[bytes]:
+        """
+        Generate an experiment's JSON export ({"experiment": ..., "responses": [...]}) incrementally
+        
+        The output is byte-for-byte what json.dumps(..., indent=2) gives for the
+        whole document, but only one response is held in memory at a time.
+        
+        Args:
+            experiment: The "experiment" object of the document (must contain "id")
+            fields: Export fields to include (see EXPORT_FIELDS; all if None)
+            text_preview: Truncate text to this many characters
+            
+        Yields:
+            UTF-8 encoded JSON chunks
+        """
+        db = SessionLocal()
+        try:
+            rows = ExportService._query_rows(db, [experiment["id"]], "json", fields, text_preview)
+            yield from ExportService._encode_json(rows, experiment, fields)
+        finally:
+            db.close()
+    
+    @staticmethod
+    def stream_ndjson(
+        experiment_id: int,
+        fields: Optional[Collection[str]] = None,
+        text_preview: Optional[int] = None
+    ) -> Iterator[bytes]:
+        """
+        Generate an experiment's newline-delimited JSON export
+        
+        One line per response, in ID order: experiment_id followed by the same
+        fields as a JSON export entry, metrics inlined.
+        
+        Yields:
+            UTF-8 encoded chunks of EXPORT_BATCH_SIZE lines
+        """
+        db = SessionLocal()
+        try:
+            rows = ExportService._query_rows(db, [experiment_id], "ndjson", fields, text_preview)
+            yield from ExportService._encode_ndjson(rows, experiment_id, fields)
+        finally:
+            db.close()
+    
+    @staticmethod
+    def stream_parquet(experiment_ids: Sequence[int], include_text: bool = True) -> Iterator[bytes]:
+        """
+        Generate a Parquet file of experiments' responses, one row group at a time
+        
+        Columns are typed: experiment and response IDs, parameters, finish reason,
+        validation flags and corruption score, creation time, one float column per
+        metric and optionally the text. Rows come from one query through a
+        server-side cursor; every PARQUET_ROW_GROUP_SIZE rows are written as a
+        compressed row group and yielded, then the footer. Requires pyarrow.
+        
+        Args:
+            experiment_ids: Experiments to include, in one file
+            include_text: Whether to include the response text column
+            
+        Yields:
+            Parquet file chunks
+        """
+        db = SessionLocal()
+        try:
+            rows = ExportService._query_rows(db, experiment_ids, "parquet", include_text=include_text)
+            yield from ExportService._encode_parquet(rows, include_text)
+        finally:
+            db.close()
+    
+    @staticmethod
+    def export_chunks(
+        experiment,
+        export_format: str,
+        fields: Optional[Collection[str]] = None,
+        text_preview: Optional[int] = None,
+        include_text: bool = True
+    ) -> Iterator[bytes]:
+        """Streamed export of one experiment in any format (see EXPORT_MEDIA_TYPES)"""
+        if export_format == "csv":
+            return ExportService.stream_csv(experiment.id, fields, text_preview)
+        if export_format == "ndjson":
+            return ExportService.stream_ndjson(experiment.id, fields, text_preview)
+        if export_format == "parquet":
+            return ExportService.stream_parquet([experiment.id], include_text)
+        document = {
+            "id": experiment.id,
+            "name": experiment.name,
+            "prompt": experiment.prompt,
+            "created_at": experiment.created_at.isoformat() if experiment.created_at else None
+        }
+        return ExportService.stream_json(document, fields, text_preview)
+    
+    @staticmethod
+    def get_artifact(experiment, export_format: str, *variant) -> Optional[str]:
+        """
+        Path of the stored export of a completed experiment, if it has been generated
+        
+        Args:
+            experiment: Experiment row
+            export_format: Export format
+            variant: Export options (projection, text preview, ...)
+        """
+        if experiment.completed_at is None:
+            return None
+        return artifact_store.get(experiment.id, ExportService._artifact_key(experiment, export_format, variant))
+    
+    @staticmethod
+    def forget_artifacts(experiment_id: int) -> None:
+        """Drop the stored exports of a deleted experiment (only completed experiments have any)"""
+        artifact_store.invalidate(experiment_id)
+    
+    @staticmethod
+    def store_while_streaming(experiment, export_format: str, chunks: Iterator[bytes], *variant) -> Iterator[bytes]:
+        """
+        Pass an export through, storing it as an artifact if the experiment has completed
+        
+        The artifact is published only when the whole export has been produced;
+        a failed or abandoned download leaves nothing behind, and a failing disk
+        never interrupts the download.
+        """
+        writer = None
+        if experiment.completed_at is not None:
+            try:
+                writer = artifact_store.writer(
+                    experiment.id, ExportService._artifact_key(experiment, export_format, variant), export_format
+                )
+            except OSError as e:
+                print(f"[ARTIFACTS] Could not store export of experiment {experiment.id}: {e}")
+        
+        try:
+            for chunk in chunks:
+                if writer is not None:
+                    try:
+                        writer.write(chunk)
+                    except OSError as e:
+                        print(f"[ARTIFACTS] Could not store export of experiment {experiment.id}: {e}")
+                        writer.abort()
+                        writer = None
+                yield chunk
+        except BaseException:
+            if writer is not None:
+                writer.abort()
+            raise
+        
+        if writer is not None:
+            try:
+                writer.commit()
+            except OSError as e:
+                print(f"[ARTIFACTS] Could not store export of experiment {experiment.id}: {e}")
+                writer.abort()
+    
+    @staticmethod
+    def pregenerate(experiment_id: int) -> None:
+        """Generate and store the default exports of a completed experiment (run in the background)"""
+        db = SessionLocal()
+        try:
+            experiment = ExperimentRepository.get_by_id(db, experiment_id)
+        finally:
+            db.close()
+        if experiment is None or experiment.completed_at is None:
+            return
+        
+        for export_format in EXPORT_PREGENERATE_FORMATS:
+            if export_format == "parquet" and not parquet_available():
+                continue
+            # Same options as a request without query parameters
+            variant = (True,) if export_format == "parquet" else (fields_key(None), None)
+            if ExportService.get_artifact(experiment, export_format, *variant):
+                continue
+            chunks = ExportService.export_chunks(experiment, export_format)
+            for _ in ExportService.store_while_streaming(experiment, export_format, chunks, *variant):
+                pass
+            print(f"[ARTIFACTS] Stored {export_format} export of experiment {experiment_id}")
+    
+    @staticmethod
+    def _artifact_key(experiment, export_format: str, variant: tuple) -> str:
+        """Artifact store key of an export: format plus a digest of the data version and options"""
+        options = repr(
+            (EXPORT_FORMAT_VERSION, experiment.completed_at.isoformat(), experiment.data_version) + tuple(variant)
+        )
+        return f"{export_format}-{hashlib.blake2b(options.encode('utf-8'), digest_size=12).hexdigest()}"
+    
+    @staticmethod
+    def stream_bulk_zip(
+        experiments: List,
+        export_format: str,
+        fields: Optional[Collection[str]] = None,
+        text_preview: Optional[int] = None,
+        include_text: bool = True
+    ) -> Iterator[bytes]:
+        """
+        Generate a zip archive with one export file per experiment and a manifest
+        
+        Experiments are read BULK_EXPORT_QUERY_EXPERIMENTS at a time, each group
+        with a single server-side cursor ordered by experiment, and the rows are
+        split into archive entries as they arrive. Entries are compressed and
+        yielded while they are written, so memory stays bounded whatever the
+        number and size of the experiments. manifest.json comes last.
+        
+        Args:
+            experiments: Experiment rows (id, name, prompt, model, created_at, completed_at), in ID order
+            export_format: "csv", "ndjson" or "parquet"
+            fields: Export fields for CSV / NDJSON (see EXPORT_FIELDS; all if None)
+            text_preview: Truncate text to this many characters (CSV / NDJSON)
+            include_text: Whether Parquet files include the text column
+            
+        Yields:
+            Zip archive chunks
+        """
+        sink = _ChunkSink()
+        # Parquet pages are compressed already
+        compression = zipfile.ZIP_STORED if export_format == "parquet" else zipfile.ZIP_DEFLATED
+        archive = zipfile.ZipFile(sink, mode="w", compression=compression, allowZip64=True)
+        manifest = {
+            "format": export_format,
+            "generated_at": datetime.now(timezone.utc).isoformat(),
+            "experiments": []
+        }
+        
+        db = SessionLocal()
+        try:
+            for start in range(0, len(experiments), BULK_EXPORT_QUERY_EXPERIMENTS):
+                group = experiments[start:start + BULK_EXPORT_QUERY_EXPERIMENTS]
+                rows = ExportService._query_rows(
+                    db, [experiment.id for experiment in group], export_format,
+                    fields, text_preview, include_text, with_experiment_id=True
+                )
+                for experiment, experiment_rows in ExportService._split_by_experiment(rows, group):
+                    counted = _Counter(experiment_rows)
+                    if export_format == "csv":
+                        chunks = ExportService._encode_csv(counted, ExportService.csv_fields(fields))
+                    elif export_format == "ndjson":
+                        chunks = ExportService._encode_ndjson(counted, experiment.id, fields)
+                    else:
+                        chunks = ExportService._encode_parquet(counted, include_text)
+                    
+                    filename = f"experiment_{experiment.id}.{export_format}"
+                    info = zipfile.ZipInfo(filename, datetime.now().timetuple()[:6])
+                    info.compress_type = compression
+                    with archive.open(info, mode="w", force_zip64=True) as entry:
+                        for chunk in chunks:
+                            entry.write(chunk)
+                            yield sink.take()
+                    
+                    manifest["experiments"].append({
+                        "id": experiment.id,
+                        "name": experiment.name,
+                        "prompt": experiment.prompt,
+                        "model": experiment.model,
+                        "created_at": experiment.created_at.isoformat() if experiment.created_at else None,
+                        "completed_at": experiment.completed_at.isoformat() if experiment.completed_at else None,
+                        "file": filename,
+                        "response_count": counted.count
+                    })
+        finally:
+            db.close()
+        
+        archive.writestr("manifest.json", json.dumps(manifest, indent=2, ensure_ascii=False))
+        archive.close()
+        yield sink.take()
+    
+    @staticmethod
+    def _query_rows(
+        db,
+        experiment_ids: Sequence[int],
+        export_format: str,
+        fields: Optional[Collection[str]] = None,
+        text_preview: Optional[int] = None,
+        include_text: bool = True,
+        with_experiment_id: bool = False
+    ) -> Iterator:
+        """Server-side cursor over the responses (and metrics) an export format needs"""
+        if export_format == "parquet":
+            return ResponseRepository.stream_with_metric_values(
+                db, experiment_ids, CSV_METRICS,
+                _PARQUET_FIELDS + (("text",) if include_text else ())
+            )
+        
+        if export_format == "csv":
+            columns = ExportService.csv_fields(fields)
+            selected = [field for field in columns if field != "metrics"]
+        else:
+            selected = fields
+        if with_experiment_id and selected is not None:
+            selected = list(selected) + ["experiment_id"]
+        
+        if export_format == "csv":
+            return ResponseRepository.stream_with_metric_values(
+                db, experiment_ids, CSV_METRICS if "metrics" in columns else (), selected, text_preview
+            )
+        if fields is None or "metrics" in fields:
+            return ResponseRepository.stream_with_metrics(
+                db, experiment_ids, selected, text_preview,
+                with_metadata=fields is None or "metrics.metadata" in fields
+            )
+        return ResponseRepository.stream_with_metric_values(db, experiment_ids, (), selected, text_preview)
+    
+    @staticmethod
+    def _split_by_experiment(rows: Iterable, experiments: List) -> Iterator[Tuple]:
+        """
+        Split rows ordered by experiment into (experiment, rows) for every experiment, in order
+        
+        Experiments without rows get an empty group. Each group must be consumed
+        before the next one is taken.
+        """
+        rows = iter(rows)
+        pending = [next(rows, None)]
+        
+        def group(experiment_id: int) -> Iterator:
+            while pending[0] is not None and pending[0].experiment_id == experiment_id:
+                yield pending[0]
+                pending[0] = next(rows, None)
+        
+        for experiment in experiments:
+            yield experiment, group(experiment.id)
+    
+    @staticmethod
+    def _encode_csv(rows: Iterable, columns: list) -> Iterator[bytes]:
+        """CSV chunks of streamed rows: the header, then every EXPORT_BATCH_SIZE rows"""
+        output = io.StringIO()
+        writer = csv.writer(output)
+        
+        # Write header
+        writer.writerow([header for field in columns for header in CSV_COLUMNS[field]])
+        yield ExportService._drain(output)
+        
+        for count, response in enumerate(rows, 1):
+            writer.writerow(ExportService._csv_row(response, columns))
+            if count % EXPORT_BATCH_SIZE == 0:
+                yield ExportService._drain(output)
+        
+        yield ExportService._drain(output)
+    
+    @staticmethod
+    def _encode_json(rows: Iterable, experiment: dict, fields: Optional[Collection[str]]) -> Iterator[bytes]:
+        """Chunks of the JSON export document of streamed rows"""
+        header = json.dumps({"experiment": experiment}, indent=2, ensure_ascii=False)
+        # Reopen the document after the experiment object
+        yield (header[:-2] + ',\n  "responses": [').encode("utf-8")
+        
+        parts = []
+        count = 0
+        for count, response in enumerate(rows, 1):
+            entry = ExportService._export_entry(response, fields)
+            # Entries sit two levels deep; JSON strings never contain raw newlines
+            text = json.dumps(entry, indent=2, ensure_ascii=False).replace("\n", "\n    ")
+            parts.append(("\n    " if count == 1 else ",\n    ") + text)
+            if count % EXPORT_BATCH_SIZE == 0:
+                yield "".join(parts).encode("utf-8")
+                parts.clear()
+        
+        parts.append("\n  ]\n}" if count else "]\n}")
+        yield "".join(parts).encode("utf-8")
+    
+    @staticmethod
+    def _encode_ndjson(rows: Iterable, experiment_id: int, fields: Optional[Collection[str]]) -> Iterator[bytes]:
+        """NDJSON chunks of streamed rows, EXPORT_BATCH_SIZE lines each"""
+        lines = []
+        for response in rows:
+            entry = ExportService._export_entry(response, fields)
+            lines.append(dumps({"experiment_id": experiment_id, **entry}))
+            if len(lines) == EXPORT_BATCH_SIZE:
+                yield b"\n".join(lines) + b"\n"
+                lines.clear()
+        if lines:
+            yield b"\n".join(lines) + b"\n"
+    
+    @staticmethod
+    def _encode_parquet(rows: Iterable, include_text: bool) -> Iterator[bytes]:
+        """Parquet file chunks of streamed rows: one per row group, then the footer"""
+        schema = ExportService._parquet_schema(include_text)
+        sink = _ChunkSink()
+        writer = pq.ParquetWriter(sink, schema, compression=PARQUET_COMPRESSION)
+        columns = {name: [] for name in schema.names}
+        
+        for count, response in enumerate(rows, 1):
+            validation = response.validation_metadata or {}
+            columns["experiment_id"].append(response.experiment_id)
+            columns["response_id"].append(response.id)
+            columns["temperature"].append(response.temperature)
+            columns["top_p"].append(response.top_p)
+            columns["max_tokens"].append(response.max_tokens)
+            columns["finish_reason"].append(response.finish_reason)
+            for flag in _PARQUET_FLAGS:
+                columns[flag].append(validation.get(flag))
+            columns["corruption_score"].append(validation.get("corruption_score"))
+            columns["created_at"].append(response.created_at)
+            for name in CSV_METRICS:
+                columns[name].append(getattr(response, name))
+            if include_text:
+                columns["text"].append(response.text)
+            
+            if count % PARQUET_ROW_GROUP_SIZE == 0:
+                writer.write_table(pa.Table.from_pydict(columns, schema=schema))
+                for values in columns.values():
+                    values.clear()
+                yield sink.take()
+        
+        if columns["response_id"]:
+            writer.write_table(pa.Table.from_pydict(columns, schema=schema))
+        writer.close()
+        yield sink.take()
+    
+    @staticmethod
+    def _parquet_schema(include_text: bool):
+        """Arrow schema of Parquet exports"""
+        fields = [
+            pa.field("experiment_id", pa.int32(), nullable=False),
+            pa.field("response_id", pa.int32(), nullable=False),
+            pa.field("temperature", pa.float64(), nullable=False),
+            pa.field("top_p", pa.float64(), nullable=False),
+            pa.field("max_tokens", pa.int32()),
+            pa.field("finish_reason", pa.string()),
+            *(pa.field(flag, pa.bool_()) for flag in _PARQUET_FLAGS),
+            pa.field("corruption_score", pa.float64()),
+            pa.field("created_at", pa.timestamp("us", tz="UTC")),
+            *(pa.field(name, pa.float64()) for name in CSV_METRICS),
+        ]
+        if include_text:
+            fields.append(pa.field("text", pa.large_string()))
+        return pa.schema(fields)
+    
+    @staticmethod
+    def _export_entry(response, fields: Optional[Collection[str]]) -> dict:
+        """JSON export entry of one streamed response row"""
+        entry = {}
+        for field in EXPORT_FIELDS:
+            if fields is not None and field not in fields:
+                continue
+            if field == "metrics":
+                with_metadata = fields is None or "metrics.metadata" in fields
+                entry["metrics"] = {
+                    metric["name"]: {
+                        key: value for key, value in metric.items() if key != "name"
+                    }
+                    for metric in metric_entries(response, with_metadata)
+                }
+            elif field == "created_at":
+                entry["created_at"] = response.created_at.isoformat() if response.created_at else None
+            elif field != "metrics.metadata":
+                entry[field] = getattr(response, field)
+        return entry
+    
+    @staticmethod
+    def _csv_row(response, columns: list) -> list:
+        """CSV values of one streamed response row"""
+        row = []
+        for field in columns:
+            if field == "metrics":
+                row.extend(
+                    "" if getattr(response, name) is None else getattr(response, name)
+                    for name in CSV_METRICS
+                )
+            elif field == "text":
+                row.append(response.text.replace('\n', ' ').replace('\r', ' '))  # Clean newlines
+            elif field == "finish_reason":
+                row.append(response.finish_reason or "")
+            elif field == "created_at":
+                row.append(response.created_at.isoformat() if response.created_at else "")
+            else:
+                row.append(getattr(response, field))
+        return row
+    
+    @staticmethod
+    def _drain(output: io.StringIO) -> bytes:
+        """Take everything written to the buffer so far, encoded, and empty it"""
+        chunk = output.getvalue().encode("utf-8")
+        output.seek(0)
+        output.truncate(0)
+        return chunk
@@ -0,0 +1,305 @@
+"""
+Import service - Loads experiments from NDJSON and CSV exports
+"""
+import csv
+import io
+import itertools
+import math
+from datetime import datetime, timezone
+from typing import BinaryIO, Iterator, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.repositories.experiment_repository import ExperimentRepository
+from app.repositories.response_repository import ResponseRepository
+from app.repositories.rollup_repository import RollupRepository
+from app.services.export_service import CSV_COLUMNS, CSV_METRICS
+from app.services.metric_calculator import MetricCalculator
+from app.services.minhash import MinHasher
+from app.services.response_validator import ResponseValidator
+from app.core.constants import (
+    DEFAULT_MAX_TOKENS, IMPORT_BATCH_SIZE, MAX_MAX_TOKENS, MAX_TEMPERATURE, MAX_TOP_P,
+    METRIC_NAMES, MIN_MAX_TOKENS, MIN_TEMPERATURE, MIN_TOP_P
+)
+from app.core.exceptions import ValidationError
+from app.core.metric_storage import compact_metadata
+from app.core.serialization import loads
+
+# Formats that can be imported, by file extension
+IMPORT_FORMATS = {
+    ".csv": "csv",
+    ".ndjson": "ndjson",
+    ".jsonl": "ndjson",
+}
+
+# Record key (metric name for score columns) per CSV export header
+_CSV_HEADERS = {
+    header: field
+    for field, headers in CSV_COLUMNS.items() if field != "metrics"
+    for header in headers
+}
+_CSV_HEADERS.update(zip(CSV_COLUMNS["metrics"], CSV_METRICS))
+_CSV_REQUIRED = ("Temperature", "Top P", "Text")
+
+
+class ImportService:
+    """Service for importing experiments from exports"""
+    
+    def __init__(self):
+        self.metric_calculator = MetricCalculator()
+        self.validator = ResponseValidator()
+        self.minhasher = MinHasher()
+    
+    @staticmethod
+    def detect_format(filename: Optional[str]) -> Optional[str]:
+        """Import format of a file name ("csv" or "ndjson"), None if unknown"""
+        for extension, import_format in IMPORT_FORMATS.items():
+            if filename and filename.lower().endswith(extension):
+                return import_format
+        return None
+    
+    def import_experiment(
+        self,
+        db: Session,
+        stream: BinaryIO,
+        import_format: str,
+        name: str,
+        prompt: str,
+        model: Optional[str] = None,
+        rescore: bool = False
+    ) -> dict:
+        """
+        Create a completed experiment from an NDJSON or CSV export
+        
+        The file is read row by row; every IMPORT_BATCH_SIZE validated rows are
+        written with one COPY (metrics are columns of the response rows), without
+        ORM objects. The experiment, its responses and its rollups are written in
+        one transaction, so a bad row or a crash leaves nothing behind.
+        
+        Args:
+            db: Database session
+            stream: Binary file object with the export
+            import_format: "ndjson" (lines of GET /api/export/.../ndjson) or "csv"
+            name: Name of the new experiment
+            prompt: Prompt of the new experiment
+            model: Model that generated the responses
+            rescore: Recompute metrics instead of taking the metrics in the file;
+                like a generated response, the cleaned text is stored and scored
+                (validation is computed only for rows without validation_metadata,
+                MinHash signatures for every row)
+        
+        Returns:
+            Dictionary with the experiment data and the number of responses and metrics loaded
+        
+        Raises:
+            ValidationError: The file is malformed or a row is invalid (message names the line)
+        """
+        if import_format == "csv":
+            records = ImportService._read_csv(stream)
+        else:
+            records = ImportService._read_ndjson(stream)
+        
+        experiment = ExperimentRepository.add(db=db, name=name, prompt=prompt, model=model, completed=True)
+        print(f"[IMPORT {experiment.id}] Loading {import_format} export...")
+        
+        loaded_at = datetime.now(timezone.utc)
+        rows = (self._parse_record(line, record, loaded_at, rescore) for line, record in records)
+        response_count = 0
+        metric_count = 0
+        try:
+            while True:
+                batch = list(itertools.islice(rows, IMPORT_BATCH_SIZE))
+                if not batch:
+                    break
+                
+                ResponseRepository.bulk_insert(db, [(experiment.id,) + response for response, _ in batch])
+                response_count += len(batch)
+                metric_count += sum(count for _, count in batch)
+                print(f"[IMPORT {experiment.id}] {response_count} responses loaded")
+            
+            if not response_count:
+                raise ValidationError("The file contains no responses")
+            
+            RollupRepository.rebuild(db, experiment.id)
+            # The experiment, the load and the rollups in one transaction
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        
+        db.refresh(experiment)
+        print(f"[IMPORT {experiment.id}] Import complete: {response_count} responses, {metric_count} metrics")
+        
+        return {
+            "experiment": {
+                "id": experiment.id,
+                "name": experiment.name,
+                "prompt": experiment.prompt,
+                "model": experiment.model,
+                "created_at": experiment.created_at.isoformat() if experiment.created_at else "",
+                "completed_at": experiment.completed_at.isoformat() if experiment.completed_at else None
+            },
+            "response_count": response_count,
+            "metric_count": metric_count
+        }
+    
+    @staticmethod
+    def _read_ndjson(stream: BinaryIO) -> Iterator[Tuple[int, dict]]:
+        """(line number, record) of every non-empty line"""
+        for line_number, line in enumerate(stream, 1):
+            if not line.strip():
+                continue
+            try:
+                record = loads(line)
+            except ValueError as e:
+                raise ValidationError(f"Line {line_number}: invalid JSON ({e})")
+            if not isinstance(record, dict):
+                raise ValidationError(f"Line {line_number}: expected a JSON object")
+            yield line_number, record
+    
+    @staticmethod
+    def _read_csv(stream: BinaryIO) -> Iterator[Tuple[int, dict]]:
+        """(line number, record) of every CSV row, keyed like NDJSON lines"""
+        reader = csv.reader(io.TextIOWrapper(stream, encoding="utf-8-sig", newline=""))
+        try:
+            header = next(reader, None)
+            if header is None:
+                return
+            missing = [column for column in _CSV_REQUIRED if column not in header]
+            if missing:
+                raise ValidationError(f"Line 1: missing CSV columns: {', '.join(missing)}")
+            # Unknown columns are ignored
+            keys = [_CSV_HEADERS.get(column) for column in header]
+            
+            for row in reader:
+                if not any(row):
+                    continue
+                record = {"metrics": {}}
+                for key, value in zip(keys, row):
+                    if key in CSV_METRICS:
+                        if value != "":
+                            record["metrics"][key] = {"value": value}
+                    elif key is not None:
+                        record[key] = value
+                yield reader.line_num, record
+        except (csv.Error, UnicodeDecodeError) as e:
+            raise ValidationError(f"Line {reader.line_num + 1}: {e}")
+    
+    def _parse_record(self, line: int, record: dict, loaded_at: datetime, rescore: bool) -> Tuple[tuple, int]:
+        """
+        Validate one record
+        
+        Returns:
+            (response values in BULK_COLUMNS order after experiment_id, number of metrics)
+        """
+        temperature = _number(record, "temperature", line, MIN_TEMPERATURE, MAX_TEMPERATURE)
+        top_p = _number(record, "top_p", line, MIN_TOP_P, MAX_TOP_P)
+        
+        max_tokens = record.get("max_tokens")
+        if max_tokens in (None, ""):
+            max_tokens = DEFAULT_MAX_TOKENS
+        else:
+            try:
+                max_tokens = int(max_tokens)
+            except (TypeError, ValueError):
+                raise ValidationError(f"Line {line}: max_tokens must be an integer")
+            if not MIN_MAX_TOKENS <= max_tokens <= MAX_MAX_TOKENS:
+                raise ValidationError(f"Line {line}: max_tokens must be between {MIN_MAX_TOKENS} and {MAX_MAX_TOKENS}")
+        
+        text = record.get("text")
+        if not isinstance(text, str) or not text:
+            raise ValidationError(f"Line {line}: text is required")
+        if "\x00" in text:
+            raise ValidationError(f"Line {line}: text contains a NUL character")
+        
+        finish_reason = record.get("finish_reason") or None
+        if finish_reason is not None and (not isinstance(finish_reason, str) or len(finish_reason) > 50):
+            raise ValidationError(f"Line {line}: finish_reason must be a string of at most 50 characters")
+        
+        validation_metadata = record.get("validation_metadata")
+        if validation_metadata is not None and not isinstance(validation_metadata, dict):
+            raise ValidationError(f"Line {line}: validation_metadata must be an object")
+        
+        created_at = record.get("created_at") or None
+        if created_at is None:
+            created_at = loaded_at
+        else:
+            try:
+                created_at = datetime.fromisoformat(created_at)
+            except (TypeError, ValueError):
+                raise ValidationError(f"Line {line}: created_at must be an ISO 8601 timestamp")
+            if created_at.tzinfo is None:
+                created_at = created_at.replace(tzinfo=timezone.utc)
+        
+        if validation_metadata is None:
+            # Same analysis as a generated response (exports do not carry validation results)
+            validation = self.validator.validate_response(text, finish_reason or "stop")
+            validation_metadata = {
+                "is_valid": validation["is_valid"],
+                "is_corrupted": validation["is_corrupted"],
+                "is_truncated": validation["is_truncated"],
+                "corruption_score": validation["corruption_score"],
+                "warnings": validation["warnings"]
+            }
+            cleaned_text = validation["cleaned_text"]
+        else:
+            cleaned_text = None
+        if rescore:
+            # Stored and scored like a generated response: the cleaned text
+            if cleaned_text is None:
+                cleaned_text = self.validator.clean_text(text)
+            text = cleaned_text or text
+            metrics = self.metric_calculator.calculate_all_metrics(text)
+        else:
+            metrics = _metrics(record, line)
+        minhash_signature = MinHasher.pack(self.minhasher.signature(text))
+        
+        values = {name: metrics[name]["value"] if name in metrics else None for name in METRIC_NAMES}
+        response = (
+            temperature, top_p, max_tokens, text, finish_reason,
+            validation_metadata, minhash_signature, created_at,
+            *values.values(), compact_metadata(metrics, values) if metrics else None
+        )
+        return response, len(metrics)
+
+
+def _number(record: dict, key: str, line: int, low: float, high: float) -> float:
+    """A required finite number between low and high"""
+    value = record.get(key)
+    try:
+        if isinstance(value, bool):
+            raise TypeError
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ValidationError(f"Line {line}: {key} must be a number")
+    if not low <= number <= high:
+        raise ValidationError(f"Line {line}: {key} must be between {low} and {high}")
+    return number
+
+
+def _metrics(record: dict, line: int) -> dict:
+    """{metric name: {"value": ..., "metadata": ...}} of a record's metrics object"""
+    metrics = record.get("metrics") or {}
+    if not isinstance(metrics, dict):
+        raise ValidationError(f"Line {line}: metrics must be an object")
+    
+    result = {}
+    for metric_name, metric in metrics.items():
+        if metric_name not in METRIC_NAMES:
+            raise ValidationError(f"Line {line}: unknown metric {metric_name}")
+        if not isinstance(metric, dict):
+            raise ValidationError(f"Line {line}: metric {metric_name} must be an object")
+        value = metric.get("value")
+        try:
+            if isinstance(value, bool):
+                raise TypeError
+            value = float(value)
+        except (TypeError, ValueError):
+            raise ValidationError(f"Line {line}: value of metric {metric_name} must be a number")
+        if not math.isfinite(value):
+            raise ValidationError(f"Line {line}: value of metric {metric_name} must be finite")
+        metadata = metric.get("metadata")
+        if metadata is not None and not isinstance(metadata, dict):
+            raise ValidationError(f"Line {line}: metadata of metric {metric_name} must be an object")
+        result[metric_name] = {"value": value, "metadata": metadata}
+    return result
@@ -5,17 +5,37 @@ import re
 import math
 from typing import Dict
 
+from app.core.cache import LRUCache, text_cache_key
+from app.core.constants import METRIC_CACHE_SIZE
+
+# Shared across the process: identical texts are only scored once
+_metrics_cache = LRUCache("metrics", METRIC_CACHE_SIZE)
+
 
 class MetricCalculator:
     """Service for calculating response quality metrics from text"""
     
+    # Bump whenever a metric calculation changes so memoized results are not reused
+    VERSION = "1"
+    
     def calculate_all_metrics(self, text: str) -> Dict[str, Dict]:
         """
         Calculate all quality metrics for a response
         
+        Results are memoized by text hash; treat the returned dict as read-only.
+        
         Returns:
             Dictionary mapping metric names to their values and metadata
         """
+        key = text_cache_key(text, self.VERSION)
+        metrics = _metrics_cache.get(key)
+        if metrics is None:
+            metrics = self._calculate_all_metrics(text)
+            _metrics_cache.set(key, metrics)
+        return metrics
+    
+    def _calculate_all_metrics(self, text: str) -> Dict[str, Dict]:
+        """Calculate all quality metrics without memoization"""
         return {
             "length_score": self.calculate_length_score(text),
             "coherence_score": self.calculate_coherence_score(text),
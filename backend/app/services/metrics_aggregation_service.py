@@ -1,24 +1,38 @@
 """
 Metrics Aggregation Service - Aggregates stored metrics from database
 """
+import math
 import statistics
+from datetime import datetime
 from sqlalchemy.orm import Session
-from typing import Dict, List
+from typing import Collection, Dict, Iterable, List, Optional, Tuple
 from app.repositories.response_repository import ResponseRepository
 from app.repositories.metric_repository import MetricRepository
+from app.repositories.rollup_repository import RollupRepository
+from app.core.quantile_sketch import KLLSketch
+from app.core.constants import SUMMARY_PERCENTILES
+from app.core.pagination import encode_cursor
+from app.services.diversity_service import DiversityService
+from app.services.relevance_service import RelevanceService
 
 
 class MetricsAggregationService:
     """Service for aggregating stored metrics and calculating summary statistics"""
     
     @staticmethod
-    def get_experiment_metrics_summary(db: Session, experiment_id: int) -> Dict[str, dict]:
+    def get_experiment_metrics_summary(
+        db: Session,
+        experiment_id: int,
+        fields: Optional[Collection[str]] = None
+    ) -> Dict[str, dict]:
         """
         Get aggregated metrics summary for an experiment
         
         Args:
             db: Database session
             experiment_id: ID of the experiment
+            fields: Statistics to include per metric (see SUMMARY_FIELDS; all if None).
+                Per-response values and percentiles are only queried when selected.
             
         Returns:
             Dictionary mapping metric names to summary statistics
@@ -28,39 +42,344 @@ class MetricsAggregationService:
         if not responses:
             return {}
         
-        # Aggregate metrics by name
+        # Statistics per metric, computed by the database
+        aggregates = {
+            row.name: row
+            for row in MetricRepository.get_experiment_aggregates(db, experiment_id)
+        }
+        
+        # Percentiles from the rollup sketches
+        cells_by_metric: Dict[str, List] = {}
+        if fields is None or "percentiles" in fields:
+            for row in RollupRepository.get_by_experiment_id(db, experiment_id):
+                cells_by_metric.setdefault(row.metric_name, []).append(row)
+        
+        def new_entry(name: str) -> dict:
+            stats = aggregates[name]
+            return {
+                "mean": stats.mean,
+                "median": stats.median,
+                "min": stats.min,
+                "max": stats.max,
+                "std_dev": stats.std_dev if stats.std_dev is not None else 0,
+                "count": stats.count,
+                "percentiles": MetricsAggregationService.merge_rollups(
+                    cells_by_metric.get(name, [])
+                )["percentiles"],
+                "responses": []
+            }
+        
+        summary: Dict[str, dict] = {}
+        if fields is not None and "responses" not in fields:
+            for name in aggregates:
+                summary[name] = new_entry(name)
+            points = []
+        else:
+            # Per-response values, in response order
+            points = MetricRepository.get_experiment_points(db, experiment_id)
+        
+        for point in points:
+            entry = summary.get(point.name)
+            if entry is None:
+                entry = summary[point.name] = new_entry(point.name)
+            entry["responses"].append({
+                "response_id": point.response_id,
+                "temperature": point.temperature,
+                "top_p": point.top_p,
+                "value": point.value
+            })
+        
+        # Scores computed across responses (not stored as metrics)
         metrics_summary: Dict[str, Dict[str, List]] = {}
         
-        for response in responses:
-            metrics = MetricRepository.get_by_response_id(db, response.id)
+        # Cross-response novelty (1 - mean MinHash similarity to the other responses)
+        MetricsAggregationService._add_response_scores(
+            metrics_summary, "novelty_score", responses,
+            DiversityService.get_novelty_scores(db, experiment_id)
+        )
+        
+        # TF-IDF cosine similarity of each response to the prompt
+        MetricsAggregationService._add_response_scores(
+            metrics_summary, "prompt_relevance", responses,
+            RelevanceService.get_prompt_relevance(db, experiment_id)
+        )
+        
+        for metric_name, data in metrics_summary.items():
+            summary[metric_name] = MetricsAggregationService._summarize(
+                data["values"], data["responses"]
+            )
+        
+        return MetricsAggregationService._project(summary, fields)
+    
+    @staticmethod
+    def get_experiment_rollup_summary(
+        db: Session,
+        experiment_id: int,
+        fields: Optional[Collection[str]] = None
+    ) -> Dict[str, dict]:
+        """
+        Get the metrics summary from the rollup table, without per-response values
+        
+        Statistics are merged from one rollup row per (metric, temperature, top_p)
+        cell, so the cost does not grow with the number of responses. Scores computed
+        across responses (novelty_score, prompt_relevance) are not included.
+        
+        Args:
+            db: Database session
+            experiment_id: ID of the experiment
             
-            for metric in metrics:
-                if metric.name not in metrics_summary:
-                    metrics_summary[metric.name] = {
-                        "values": [],
-                        "responses": []
-                    }
-                
-                metrics_summary[metric.name]["values"].append(metric.value)
-                metrics_summary[metric.name]["responses"].append({
-                    "response_id": response.id,
-                    "temperature": response.temperature,
-                    "top_p": response.top_p,
-                    "value": metric.value
-                })
-        
-        # Calculate statistics
+        Returns:
+            Dictionary mapping metric names to summary statistics and per-cell statistics
+            (only the selected statistics if fields is given)
+        """
+        cells_by_metric: Dict[str, List] = {}
+        for row in RollupRepository.get_by_experiment_id(db, experiment_id):
+            cells_by_metric.setdefault(row.metric_name, []).append(row)
+        
+        if not cells_by_metric:
+            return {}
+        
         summary = {}
-        for metric_name, data in metrics_summary.items():
-            values = data["values"]
-            summary[metric_name] = {
-                "mean": statistics.mean(values) if values else 0,
-                "median": statistics.median(values) if values else 0,
-                "min": min(values) if values else 0,
-                "max": max(values) if values else 0,
-                "std_dev": statistics.stdev(values) if len(values) > 1 else 0,
-                "count": len(values),
-                "responses": data["responses"]
+        medians = None
+        for metric_name, cells in cells_by_metric.items():
+            entry = MetricsAggregationService.merge_rollups(cells)
+            if entry["percentiles"]["p50"] is not None:
+                entry["median"] = entry["percentiles"]["p50"]
+            else:
+                # Rows written before sketches existed (until rollups are rebuilt)
+                if medians is None:
+                    medians = MetricRepository.get_experiment_medians(db, experiment_id)
+                entry["median"] = medians.get(metric_name, entry["mean"])
+            if fields is None or "cells" in fields:
+                entry["cells"] = [
+                    dict(
+                        MetricsAggregationService.merge_rollups([cell]),
+                        temperature=cell.temperature,
+                        top_p=cell.top_p
+                    )
+                    for cell in sorted(cells, key=lambda cell: (cell.temperature, cell.top_p))
+                ]
+            summary[metric_name] = entry
+        return MetricsAggregationService._project(summary, fields)
+    
+    @staticmethod
+    def get_metric_quantiles(
+        db: Session,
+        metric_name: str,
+        experiment_ids: Optional[List[int]] = None,
+        temperature: Optional[float] = None,
+        top_p: Optional[float] = None
+    ) -> Optional[dict]:
+        """
+        Get statistics and percentiles of a metric across experiments and parameter cells
+        
+        Merges rollup rows and their sketches only; raw metric rows are not read.
+        
+        Args:
+            db: Database session
+            metric_name: Name of the metric
+            experiment_ids: Experiments to include (all if None)
+            temperature: Only include this temperature
+            top_p: Only include this top_p
+            
+        Returns:
+            Dictionary with merged statistics, or None if nothing matches
+        """
+        rollups = RollupRepository.get_for_metric(db, metric_name, experiment_ids, temperature, top_p)
+        if not rollups:
+            return None
+        
+        return dict(
+            MetricsAggregationService.merge_rollups(rollups),
+            metric=metric_name,
+            experiment_ids=sorted({rollup.experiment_id for rollup in rollups})
+        )
+    
+    @staticmethod
+    def get_parameter_heatmap(
+        db: Session,
+        metric_name: str,
+        temperature_bin: float,
+        top_p_bin: float,
+        model: Optional[str] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+        experiment_ids: Optional[List[int]] = None
+    ) -> dict:
+        """
+        Get a metric's statistics on a binned temperature x top_p grid across experiments
+        
+        Served from the rollup table, which is maintained as metrics are inserted,
+        so the cost depends on the number of parameter cells, not responses.
+        
+        Args:
+            db: Database session
+            metric_name: Name of the metric
+            temperature_bin: Width of the temperature bins
+            top_p_bin: Width of the top_p bins
+            model: Only include experiments run with this model
+            created_from: Only include experiments created at or after this time
+            created_to: Only include experiments created before this time
+            experiment_ids: Only include these experiments
+            
+        Returns:
+            Dictionary with the bin axes and one entry per non-empty bin
+        """
+        bins = RollupRepository.get_heatmap_bins(
+            db, metric_name, temperature_bin, top_p_bin,
+            model, created_from, created_to, experiment_ids
+        )
+        
+        cells = [
+            {
+                # Lower bin edges, rounded to undo floating point drift (0.30000000000000004)
+                "temperature": round(row.temperature, 6),
+                "top_p": round(row.top_p, 6),
+                "count": row.count,
+                "mean": row.mean,
+                "std_dev": math.sqrt(max(row.m2, 0.0) / (row.count - 1)) if row.count > 1 else 0,
+                "min": row.min,
+                "max": row.max,
+                "experiment_count": row.experiment_count
             }
+            for row in bins
+        ]
         
-        return summary
\ No newline at end of file
+        return {
+            "metric": metric_name,
+            "temperature_bin": temperature_bin,
+            "top_p_bin": top_p_bin,
+            "temperatures": sorted({cell["temperature"] for cell in cells}),
+            "top_ps": sorted({cell["top_p"] for cell in cells}),
+            "cells": cells
+        }
+    
+    @staticmethod
+    def get_leaderboard(
+        db: Session,
+        metric_name: str,
+        descending: bool,
+        limit: int,
+        after: Optional[Tuple[float, int]] = None,
+        min_temperature: Optional[float] = None,
+        max_temperature: Optional[float] = None,
+        min_top_p: Optional[float] = None,
+        max_top_p: Optional[float] = None
+    ) -> dict:
+        """
+        Get one page of the best (or worst) responses by a metric across experiments
+        
+        Args:
+            db: Database session
+            metric_name: Name of the metric to rank by
+            descending: True for the highest values first
+            limit: Page size
+            after: (value, metric id) decoded from next_cursor of the previous page
+            
+        Returns:
+            Dictionary with the ranked entries and the cursor of the next page (None at the end)
+        """
+        # One extra row tells whether another page exists
+        rows = MetricRepository.get_leaderboard(
+            db, metric_name, descending, limit + 1, after,
+            min_temperature, max_temperature, min_top_p, max_top_p
+        )
+        page = rows[:limit]
+        
+        return {
+            "metric": metric_name,
+            "order": "desc" if descending else "asc",
+            "entries": [
+                {
+                    "response_id": row.response_id,
+                    "experiment_id": row.experiment_id,
+                    "experiment_name": row.experiment_name,
+                    "temperature": row.temperature,
+                    "top_p": row.top_p,
+                    "value": row.value
+                }
+                for row in page
+            ],
+            "next_cursor": encode_cursor(page[-1].value, page[-1].metric_id) if len(rows) > limit else None
+        }
+    
+    @staticmethod
+    def merge_rollups(rollups: Iterable) -> dict:
+        """
+        Combine rollup rows into count, mean, sample std dev, min, max and percentiles
+        
+        Means and sums of squared deviations are merged pairwise (Chan et al.),
+        which stays numerically stable where sum / sum_sq would cancel. Percentiles
+        come from the merged quantile sketches; they are None if any row has no
+        sketch yet, rather than silently covering only part of the values.
+        """
+        count, mean, m2 = 0, 0.0, 0.0
+        minimum, maximum = math.inf, -math.inf
+        sketch = KLLSketch()
+        for rollup in rollups:
+            sketch.merge(KLLSketch.from_dict(rollup.sketch))
+            total = count + rollup.count
+            delta = rollup.mean - mean
+            mean += delta * rollup.count / total
+            m2 += rollup.m2 + delta * delta * count * rollup.count / total
+            count = total
+            minimum = min(minimum, rollup.min)
+            maximum = max(maximum, rollup.max)
+        
+        return {
+            "mean": mean,
+            "min": minimum if count else 0,
+            "max": maximum if count else 0,
+            "std_dev": math.sqrt(max(m2, 0.0) / (count - 1)) if count > 1 else 0,
+            "count": count,
+            "percentiles": (
+                sketch.percentiles(SUMMARY_PERCENTILES) if sketch.n == count
+                else {f"p{percent}": None for percent in SUMMARY_PERCENTILES}
+            )
+        }
+    
+    @staticmethod
+    def _project(summary: Dict[str, dict], fields: Optional[Collection[str]]) -> Dict[str, dict]:
+        """Keep only the selected statistics of each metric"""
+        if fields is None:
+            return summary
+        return {
+            name: {key: value for key, value in entry.items() if key in fields}
+            for name, entry in summary.items()
+        }
+    
+    @staticmethod
+    def _add_response_scores(
+        metrics_summary: Dict[str, Dict[str, List]],
+        metric_name: str,
+        responses: List,
+        scores: Dict[int, float]
+    ) -> None:
+        """Add a score computed across responses (not stored as a metric) to the summary"""
+        data = {"values": [], "responses": []}
+        for response in responses:
+            if response.id not in scores:
+                continue
+            value = scores[response.id]
+            data["values"].append(value)
+            data["responses"].append({
+                "response_id": response.id,
+                "temperature": response.temperature,
+                "top_p": response.top_p,
+                "value": value
+            })
+        metrics_summary[metric_name] = data
+    
+    @staticmethod
+    def _summarize(values: List[float], responses: List[dict]) -> dict:
+        """Calculate summary statistics for one metric"""
+        return {
+            "mean": statistics.mean(values) if values else 0,
+            "median": statistics.median(values) if values else 0,
+            "min": min(values) if values else 0,
+            "max": max(values) if values else 0,
+            "std_dev": statistics.stdev(values) if len(values) > 1 else 0,
+            "count": len(values),
+            "percentiles": KLLSketch.from_values(values).percentiles(SUMMARY_PERCENTILES),
+            "responses": responses
+        }
\ No newline at end of file
@@ -0,0 +1,116 @@
+"""
+MinHash - Compact similarity signatures for response texts
+"""
+import hashlib
+import random
+import re
+import struct
+from typing import List, Optional
+
+import numpy as np
+
+from app.core.constants import MINHASH_NUM_PERM, MINHASH_SHINGLE_SIZE
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = 0xFFFFFFFF
+
+# Fixed seed: signatures are stored, so permutations must be stable across processes
+_rng = random.Random(1)
+_PERMUTATIONS = [
+    (_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME))
+    for _ in range(MINHASH_NUM_PERM)
+]
+
+# Permutations as column vectors for _mod_mul_add; a is split so partial products fit in 64 bits
+_A_HIGH = np.array([a >> 31 for a, _ in _PERMUTATIONS], dtype=np.uint64)[:, None]
+_A_LOW = np.array([a & 0x7FFFFFFF for a, _ in _PERMUTATIONS], dtype=np.uint64)[:, None]
+_B = np.array([b for _, b in _PERMUTATIONS], dtype=np.uint64)[:, None]
+
+_WORD_PATTERN = re.compile(r'\w+')
+_SIGNATURE_FORMAT = struct.Struct(f"<{MINHASH_NUM_PERM}I")
+
+
+class MinHasher:
+    """Computes MinHash signatures over word shingles of a text"""
+
+    num_perm = MINHASH_NUM_PERM
+
+    def signature(self, text: str) -> List[int]:
+        """
+        Calculate the MinHash signature of a text
+
+        Returns:
+            List of num_perm 32-bit minimum hash values
+        """
+        shingles = self._shingle_hashes(text)
+        if not len(shingles):
+            return [_MAX_HASH] * self.num_perm
+
+        # min over shingles of (a * x + b) mod p, for all permutations at once
+        hashes = _mod_mul_add(_mersenne_mod(shingles)[None, :])
+        return (hashes.min(axis=1) & np.uint64(_MAX_HASH)).tolist()
+
+    @staticmethod
+    def _shingle_hashes(text: str) -> np.ndarray:
+        """Hash the distinct lowercased word n-grams of a text to 64-bit integers"""
+        words = _WORD_PATTERN.findall(text.lower())
+        size = MINHASH_SHINGLE_SIZE
+        if len(words) < size:
+            shingles = {' '.join(words)} if words else set()
+        else:
+            shingles = {' '.join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+        digests = b"".join(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest() for s in shingles)
+        return np.frombuffer(digests, dtype="<u8").astype(np.uint64)
+
+    @staticmethod
+    def pack(signature: List[int]) -> bytes:
+        """Pack a signature into its compact stored form (4 bytes per value)"""
+        return _SIGNATURE_FORMAT.pack(*signature)
+
+    @staticmethod
+    def unpack(data: Optional[bytes]) -> Optional[List[int]]:
+        """Unpack a stored signature; returns None if missing or from another configuration"""
+        if not data or len(data) != _SIGNATURE_FORMAT.size:
+            return None
+        return list(_SIGNATURE_FORMAT.unpack(bytes(data)))
+
+    @staticmethod
+    def similarity(sig_a: List[int], sig_b: List[int]) -> float:
+        """Estimate the Jaccard similarity of two texts from their signatures"""
+        matches = sum(1 for a, b in zip(sig_a, sig_b) if a == b)
+        return matches / len(sig_a)
+
+
+def _mersenne_mod(x: np.ndarray) -> np.ndarray:
+    """x mod (2^61 - 1) of uint64 values"""
+    p = np.uint64(_MERSENNE_PRIME)
+    x = (x & p) + (x >> np.uint64(61))
+    x = (x & p) + (x >> np.uint64(61))
+    return np.where(x >= p, x - p, x)
+
+
+def _mod_mul_add(x: np.ndarray) -> np.ndarray:
+    """
+    (a * x + b) mod (2^61 - 1) of every permutation (rows) and value x < 2^61 - 1 (columns)
+
+    The same values as Python integer arithmetic, in uint64: a and x are split
+    into 31/30-bit halves, and a partial product shifted past bit 61 wraps
+    around because 2^61 = 1 (mod 2^61 - 1). Every term is below 2^61 + 2^31, so
+    their sum with b stays below 2^64.
+    """
+    low30 = np.uint64((1 << 30) - 1)
+    low31 = np.uint64((1 << 31) - 1)
+    x_high = x >> np.uint64(30)
+    x_low = x & low30
+    # a * x = a_high * x_high * 2^61 + a_high * x_low * 2^31 + a_low * x_high * 2^30 + a_low * x_low
+    t2 = _A_HIGH * x_low
+    t3 = _A_LOW * x_high
+    total = (
+        _A_HIGH * x_high
+        + (t2 >> np.uint64(30)) + ((t2 & low30) << np.uint64(31))
+        + (t3 >> np.uint64(31)) + ((t3 & low31) << np.uint64(30))
+        + _A_LOW * x_low
+        + _B
+    )
+    return _mersenne_mod(total)
@@ -0,0 +1,82 @@
+"""
+Relevance Service - Prompt relevance and response similarity from TF-IDF indexes
+"""
+from sqlalchemy.orm import Session
+from typing import Dict, List, Optional
+
+from app.repositories.experiment_repository import ExperimentRepository
+from app.repositories.response_repository import ResponseRepository
+from app.services.tfidf_index import TfidfIndex
+from app.core.cache import LRUCache
+from app.core.constants import TFIDF_INDEX_CACHE_SIZE
+
+# Indexes are built once per experiment and extended when its data_version changes
+_index_cache = LRUCache("tfidf_index", TFIDF_INDEX_CACHE_SIZE)
+
+
+class RelevanceService:
+    """Service for text-similarity scores over an experiment's prompt and responses"""
+    
+    @staticmethod
+    def get_index(db: Session, experiment_id: int) -> Optional[TfidfIndex]:
+        """
+        Get the TF-IDF index for an experiment, adding any responses stored since it was built
+        
+        The experiment's data_version is checked on every call, so writes from other
+        workers or the CLI are picked up and indexes of deleted experiments are
+        dropped. When it changed, the experiment's response IDs are compared with
+        the indexed ones: concurrent generation can commit a lower ID after a
+        higher one. Response texts are never rewritten, so missing responses only
+        need to be appended.
+        
+        Returns:
+            The index, or None if the experiment does not exist
+        """
+        version = ExperimentRepository.get_version(db, experiment_id)
+        if version is None:
+            _index_cache.delete(experiment_id)
+            return None
+        
+        index = _index_cache.get(experiment_id)
+        if index is None:
+            experiment = ExperimentRepository.get_by_id(db, experiment_id)
+            if not experiment:
+                return None
+            index = TfidfIndex(experiment.prompt)
+            _index_cache.set(experiment_id, index)
+        
+        if index.version != version:
+            if index.row_by_id:
+                missing_ids = [
+                    response_id for response_id in ResponseRepository.get_ids(db, experiment_id)
+                    if response_id not in index.row_by_id
+                ]
+                new_responses = (
+                    ResponseRepository.get_texts_with_parameters(db, experiment_id, missing_ids)
+                    if missing_ids else []
+                )
+            else:
+                new_responses = ResponseRepository.get_texts_with_parameters(db, experiment_id)
+            index.add_responses(new_responses, version)
+        return index
+    
+    @staticmethod
+    def get_prompt_relevance(db: Session, experiment_id: int) -> Dict[int, float]:
+        """Get the TF-IDF cosine similarity of each response to the prompt, by response ID"""
+        index = RelevanceService.get_index(db, experiment_id)
+        return index.prompt_relevance() if index else {}
+    
+    @staticmethod
+    def get_similar_responses(db: Session, response_id: int, limit: int) -> Optional[List[dict]]:
+        """
+        Get the responses of the same experiment most similar to a response
+        
+        Returns:
+            List of similar responses (most similar first), or None if the response does not exist
+        """
+        response = ResponseRepository.get_by_id(db, response_id)
+        if not response:
+            return None
+        
+        index = RelevanceService.get_index(db, response.experiment_id)
+        return index.most_similar(response_id, limit) if index else None
@@ -2,82 +2,233 @@
 Response service - Business logic for responses
 """
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Collection, Dict, List, Optional, Tuple
 from app.repositories.response_repository import ResponseRepository
 from app.repositories.metric_repository import MetricRepository
-from app.schemas.response import ResponseWithMetrics, MetricData, ValidationMetadata
+from app.core.cache import LRUCache
+from app.core.constants import RESPONSE_PAYLOAD_CACHE_SIZE
+from app.core.pagination import encode_cursor
+from app.core.projection import RESPONSE_FIELDS
+from app.core.serialization import dumps
+
+# Fields of ValidationMetadata exposed in API payloads
+_VALIDATION_FIELDS = ("is_valid", "is_corrupted", "is_truncated", "corruption_score", "warnings")
+
+# Serialized payloads of responses by (response ID, data_version of the experiment)
+_payload_cache = LRUCache("response_payloads", RESPONSE_PAYLOAD_CACHE_SIZE)
 
 
 class ResponseService:
     """Service for response business logic"""
     
-    
     @staticmethod
-    def get_response_with_metrics(db: Session, response_id: int) -> Optional[dict]:
-        """Get a single response with its metrics"""
+    def get_response_body(db: Session, response_id: int, version: Optional[int] = None) -> Optional[Tuple[bytes, int]]:
+        """
+        Get a single response with its metrics, serialized as JSON
+        
+        Payloads are kept in an in-process LRU keyed by the experiment's
+        data_version. A body cached for the requested version is returned without
+        touching the database (the body at a given version never changes);
+        otherwise the current version is looked up, so any write to the
+        experiment (from any process) makes older entries unreachable.
+        
+        Args:
+            db: Database session
+            response_id: ID of the response
+            version: data_version named by the request URL (None for the current one)
+        
+        Returns:
+            (body, data_version it was built at), or None if the response does not exist
+        """
+        if version is not None:
+            body = _payload_cache.get((response_id, version))
+            if body is not None:
+                return body, version
+        
+        current = ResponseRepository.get_experiment_version(db, response_id)
+        if current is None:
+            return None
+        body = _payload_cache.get((response_id, current))
+        if body is not None:
+            return body, current
+        
         response = ResponseRepository.get_by_id(db, response_id)
-        if not response:
+        if response is None:
             return None
+        metrics = MetricRepository.get_by_response_ids(db, [response_id])
+        body = dumps(ResponseService._to_payload(response, metrics))
+        # A write committed while the body was read would file it under the wrong version
+        if ResponseRepository.get_experiment_version(db, response_id) == current:
+            _payload_cache.set((response_id, current), body)
+        return body, current
+    
+    @staticmethod
+    def get_experiment_responses_with_metrics(
+        db: Session,
+        experiment_id: int,
+        after_id: Optional[int] = None,
+        limit: Optional[int] = None,
+        temperature: Optional[float] = None,
+        top_p: Optional[float] = None,
+        is_valid: Optional[bool] = None,
+        fields: Optional[Collection[str]] = None,
+        text_preview: Optional[int] = None
+    ) -> List[dict]:
+        """
+        Get responses for an experiment with their metrics
         
-        metrics = MetricRepository.get_by_response_id(db, response_id)
-        metrics_data = [
-            MetricData(
-                name=m.name,
-                value=m.value,
-                metadata=m.metadata_json
-            ).dict()
-            for m in metrics
-        ]
+        Uses two queries (responses, then the metrics of those responses) whatever
+        the page size, and builds the payload dicts directly. Only the selected
+        fields are read from the database; metrics are not queried at all unless
+        selected.
         
-        validation_metadata = None
-        if response.validation_metadata:
-            validation_metadata = ValidationMetadata(**response.validation_metadata).dict()
+        Args:
+            db: Database session
+            experiment_id: ID of the experiment
+            after_id: Return responses after this ID (keyset pagination)
+            limit: Maximum number of responses (all if None)
+            temperature: Only responses generated with this temperature
+            top_p: Only responses generated with this top_p
+            is_valid: Only valid (True) or invalid (False) responses
+            fields: Payload fields to include (see RESPONSE_FIELDS; all if None)
+            text_preview: Truncate text to this many characters
+            
+        Returns:
+            List of response payloads in ID order
+        """
+        responses = ResponseRepository.get_page(
+            db, experiment_id, after_id, limit, temperature, top_p, is_valid,
+            fields, text_preview
+        )
+        return ResponseService._with_metrics(db, responses, fields)
+    
+    @staticmethod
+    def get_responses_by_ids(
+        db: Session,
+        response_ids: List[int],
+        fields: Optional[Collection[str]] = None,
+        text_preview: Optional[int] = None
+    ) -> List[dict]:
+        """
+        Get many responses with their metrics in two queries, in the requested order
         
-        return {
-            "id": response.id,
-            "experiment_id": response.experiment_id,
-            "temperature": response.temperature,
-            "top_p": response.top_p,
-            "max_tokens": response.max_tokens,
-            "text": response.text,
-            "finish_reason": response.finish_reason,
-            "validation_metadata": validation_metadata,
-            "created_at": response.created_at.isoformat() if response.created_at else "",
-            "metrics": metrics_data
+        Args:
+            db: Database session
+            response_ids: IDs of the responses; unknown IDs are skipped, repeated IDs repeated
+            fields: Payload fields to include (see RESPONSE_FIELDS; all if None)
+            text_preview: Truncate text to this many characters
+            
+        Returns:
+            List of response payloads in the order of response_ids
+        """
+        rows = ResponseRepository.get_by_ids(db, list(dict.fromkeys(response_ids)), fields, text_preview)
+        payloads = {
+            payload["id"]: payload
+            for payload in ResponseService._with_metrics(db, rows, fields)
         }
+        return [payloads[response_id] for response_id in response_ids if response_id in payloads]
     
     @staticmethod
-    def get_experiment_responses_with_metrics(db: Session, experiment_id: int) -> List[dict]:
-        """Get all responses for an experiment with their metrics"""
-        responses = ResponseRepository.get_by_experiment_id(db, experiment_id)
+    def _with_metrics(db: Session, responses: List, fields: Optional[Collection[str]]) -> List[dict]:
+        """Build the payloads of response rows, loading all their metrics in one query if selected"""
+        metrics_by_response: Dict[int, List] = {}
+        if fields is None or "metrics" in fields:
+            metrics = MetricRepository.get_by_response_ids(
+                db,
+                [response.id for response in responses],
+                with_metadata=fields is None or "metrics.metadata" in fields
+            )
+            for metric in metrics:
+                metrics_by_response.setdefault(metric.response_id, []).append(metric)
         
-        result = []
-        for response in responses:
-            metrics = MetricRepository.get_by_response_id(db, response.id)
-            metrics_data = [
-                MetricData(
-                    name=m.name,
-                    value=m.value,
-                    metadata=m.metadata_json
-                ).dict()
-                for m in metrics
-            ]
-            
-            validation_metadata = None
-            if response.validation_metadata:
-                validation_metadata = ValidationMetadata(**response.validation_metadata).dict()
+        return [
+            ResponseService._to_payload(response, metrics_by_response.get(response.id, []), fields)
+            for response in responses
+        ]
+    
+    @staticmethod
+    def search_responses(
+        db: Session,
+        query_text: str,
+        limit: int,
+        after: Optional[Tuple[float, int]] = None,
+        experiment_ids: Optional[List[int]] = None,
+        min_temperature: Optional[float] = None,
+        max_temperature: Optional[float] = None,
+        min_top_p: Optional[float] = None,
+        max_top_p: Optional[float] = None
+    ) -> dict:
+        """
+        Get one page of responses matching a full-text query, best matches first
+        
+        Args:
+            db: Database session
+            query_text: Web-search style query
+            limit: Page size
+            after: (rank, response id) decoded from next_cursor of the previous page
+            experiment_ids: Only responses of these experiments (all if None)
             
-            result.append({
-                "id": response.id,
-                "experiment_id": response.experiment_id,
-                "temperature": response.temperature,
-                "top_p": response.top_p,
-                "max_tokens": response.max_tokens,
-                "text": response.text,
-                "finish_reason": response.finish_reason,
-                "validation_metadata": validation_metadata,
-                "created_at": response.created_at.isoformat() if response.created_at else "",
-                "metrics": metrics_data
-            })
+        Returns:
+            Dictionary with the hits (ranked, with snippets) and the cursor of the next page
+        """
+        # One extra row tells whether another page exists
+        rows = ResponseRepository.search(
+            db, query_text, limit + 1, after, experiment_ids,
+            min_temperature, max_temperature, min_top_p, max_top_p
+        )
+        page = rows[:limit]
+        
+        return {
+            "query": query_text,
+            "hits": [
+                {
+                    "response_id": row.id,
+                    "experiment_id": row.experiment_id,
+                    "experiment_name": row.experiment_name,
+                    "temperature": row.temperature,
+                    "top_p": row.top_p,
+                    "rank": row.rank,
+                    "snippet": row.snippet
+                }
+                for row in page
+            ],
+            "next_cursor": encode_cursor(page[-1].rank, page[-1].id) if len(rows) > limit else None
+        }
+    
+    @staticmethod
+    def _to_payload(response, metrics: List, fields: Optional[Collection[str]] = None) -> dict:
+        """Build the ResponseWithMetrics payload (or the selected fields of it) of a response row"""
+        payload = {}
+        # Iterate in declaration order so payloads serialize identically every time
+        for field in RESPONSE_FIELDS:
+            if fields is not None and field not in fields:
+                continue
+            if field == "validation_metadata":
+                validation_metadata = None
+                if response.validation_metadata:
+                    validation_metadata = {
+                        name: response.validation_metadata.get(name)
+                        for name in _VALIDATION_FIELDS
+                    }
+                    if validation_metadata["warnings"] is None:
+                        validation_metadata["warnings"] = []
+                payload[field] = validation_metadata
+            elif field == "created_at":
+                payload[field] = response.created_at.isoformat() if response.created_at else ""
+            elif field == "metrics":
+                with_metadata = fields is None or "metrics.metadata" in fields
+                payload[field] = [
+                    {
+                        "name": metric.name,
+                        "value": metric.value,
+                        "metadata": metric.metadata_json
+                    } if with_metadata else {
+                        "name": metric.name,
+                        "value": metric.value
+                    }
+                    for metric in metrics
+                ]
+            elif field != "metrics.metadata":
+                payload[field] = getattr(response, field)
         
-        return result
+        return payload
@@ -2,12 +2,22 @@
 Response Validator - Validates and sanitizes LLM responses
 """
 import re
-from typing import Dict, Tuple
+from itertools import accumulate
+from typing import Dict, List, Optional, Tuple
+
+from app.core.cache import LRUCache, text_cache_key
+from app.core.constants import VALIDATION_CACHE_SIZE
+
+# Shared across the process: identical texts are only validated once
+_validation_cache = LRUCache("validation", VALIDATION_CACHE_SIZE)
 
 
 class ResponseValidator:
     """Service for validating and cleaning LLM responses"""
     
+    # Bump whenever validation or cleaning changes so memoized results are not reused
+    VERSION = "4"
+    
     # Patterns that indicate corrupted or low-quality responses
     CORRUPTION_PATTERNS = [
         r'[a-zA-Z]{20,}',  # Very long words (likely gibberish)
@@ -17,18 +27,31 @@ class ResponseValidator:
         r'\d{10,}',  # Very long number sequences
     ]
     
-    # Common code/script patterns that shouldn't be in normal text
-    CODE_PATTERNS = [
-        r'<script[^>]*>.*?</script>',
-        r'function\s+\w+\s*\([^)]*\)\s*\{',
-        r'import\s+\w+',
-        r'from\s+\w+\s+import',
-        r'class\s+\w+',
-        r'def\s+\w+\s*\(',
-        r'const\s+\w+\s*=',
-        r'var\s+\w+\s*=',
-        r'\.(js|py|html|css|json|xml)\b',
+    # Common code/script patterns that shouldn't be in normal text, each with lowercase
+    # text every match contains: the pattern is only searched if that text occurs
+    CODE_PATTERN_LITERALS = [
+        (r'<script[^>]*>.*?</script>', '</script>'),
+        (r'function\s+\w+\s*\([^)]*\)\s*\{', 'function'),
+        (r'import\s+\w+', 'import'),
+        (r'from\s+\w+\s+import', 'import'),
+        (r'class\s+\w+', 'class'),
+        (r'def\s+\w+\s*\(', 'def'),
+        (r'const\s+\w+\s*=', 'const'),
+        (r'var\s+\w+\s*=', 'var'),
+        (r'\.(js|py|html|css|json|xml)\b', '.'),
     ]
+    CODE_PATTERNS = [pattern for pattern, _ in CODE_PATTERN_LITERALS]
+    
+    # Precompiled once (see _scan_indicators)
+    _CORRUPTION_REGEXES = [re.compile(pattern) for pattern in CORRUPTION_PATTERNS]
+    _CODE_REGEXES = [
+        (literal, re.compile(pattern, re.IGNORECASE | re.DOTALL))
+        for pattern, literal in CODE_PATTERN_LITERALS
+    ]
+    # Prefilter: the three letter-run CORRUPTION_PATTERNS only match inside these runs
+    _LETTER_RUN = re.compile(r'[a-zA-Z]{15,}')
+    _LETTER_RUN_PATTERNS = frozenset((r'[a-zA-Z]{20,}', r'[A-Z]{15,}', r'[a-z]{20,}'))
+    _SPECIAL_CHAR = re.compile(r'[^\w\s]')
     
     def validate_response(self, text: str, finish_reason: str = "stop") -> Dict[str, any]:
         """
@@ -42,7 +65,18 @@ class ResponseValidator:
             - corruption_score: float (0-1, higher = more corrupted)
             - cleaned_text: str (sanitized version)
             - warnings: list of warning messages
+            
+        Results are memoized by text hash; treat the returned dict as read-only.
         """
+        key = text_cache_key(text, self.VERSION, finish_reason)
+        validation = _validation_cache.get(key)
+        if validation is None:
+            validation = self._validate_response(text, finish_reason)
+            _validation_cache.set(key, validation)
+        return validation
+    
+    def _validate_response(self, text: str, finish_reason: str) -> Dict[str, any]:
+        """Validate and analyze a response without memoization"""
         warnings = []
         is_truncated = finish_reason == "length"
         corruption_score = 0.0
@@ -53,24 +87,14 @@ class ResponseValidator:
             warnings.append("Response was truncated due to max_tokens limit")
         
         # Calculate corruption score
-        corruption_indicators = 0
-        total_checks = 0
-        
-        # Check for corruption patterns
-        for pattern in self.CORRUPTION_PATTERNS:
-            matches = re.findall(pattern, text)
-            if matches:
-                corruption_indicators += len(matches)
-            total_checks += 1
-        
-        # Check for code patterns (unusual in normal text responses)
-        code_matches = 0
-        for pattern in self.CODE_PATTERNS:
-            if re.search(pattern, text, re.IGNORECASE | re.DOTALL):
-                code_matches += 1
+        total_checks = len(self.CORRUPTION_PATTERNS)
+        
+        # Corruption patterns, code patterns (unusual in normal text responses)
+        # and special characters
+        corruption_indicators, code_matches, special_chars = self._scan_indicators(text)
         
         # Check for excessive special characters
-        special_char_ratio = len(re.findall(r'[^\w\s]', text)) / max(len(text), 1)
+        special_char_ratio = special_chars / max(len(text), 1)
         if special_char_ratio > 0.3:  # More than 30% special chars
             corruption_indicators += 1
         
@@ -116,6 +140,38 @@ class ResponseValidator:
             "cleaned_length": len(cleaned_text)
         }
     
+    def _scan_indicators(self, text: str) -> Tuple[int, int, int]:
+        """
+        Count corruption indicators with the precompiled patterns
+        
+        The letter-run corruption patterns are matched only inside the runs of 15+
+        letters found by one prefilter scan (a match never crosses a non-letter, so
+        the counts are unchanged), and a code pattern is only searched when its
+        literal (CODE_PATTERN_LITERALS) occurs in the lowercased text.
+        
+        Returns:
+            (CORRUPTION_PATTERNS match count, number of CODE_PATTERNS found,
+            number of special characters)
+        """
+        corruption_matches = 0
+        letter_runs = self._LETTER_RUN.findall(text)
+        for pattern, regex in zip(self.CORRUPTION_PATTERNS, self._CORRUPTION_REGEXES):
+            if pattern in self._LETTER_RUN_PATTERNS:
+                corruption_matches += sum(len(regex.findall(run)) for run in letter_runs)
+            else:
+                corruption_matches += len(regex.findall(text))
+        
+        # Case-insensitive matching also folds a few non-ASCII letters (e.g. U+017F
+        # matches "s"), so the literal check is only exact for ASCII text
+        lowered = text.lower() if text.isascii() else None
+        code_found = sum(
+            1 for literal, regex in self._CODE_REGEXES
+            if (lowered is None or literal in lowered) and regex.search(text)
+        )
+        
+        special_chars = len(self._SPECIAL_CHAR.findall(text))
+        return corruption_matches, code_found, special_chars
+    
     def clean_text(self, text: str) -> str:
         """
         Basic text cleaning - remove excessive whitespace and normalize
@@ -128,23 +184,13 @@ class ResponseValidator:
         # Look for sudden appearance of code-like patterns or excessive special chars
         words = text.split()
         if len(words) > 50:
-            # Check for sudden degradation in text quality
-            corruption_point = None
-            for i in range(len(words) - 100, len(words)):
-                if i < 0:
-                    continue
-                # Check if this section has corruption indicators
-                section = ' '.join(words[max(0, i-10):i+10])
-                special_char_ratio = len(re.findall(r'[^\w\s]', section)) / max(len(section), 1)
-                avg_word_len = sum(len(w) for w in words[max(0, i-10):i+10]) / max(len(words[max(0, i-10):i+10]), 1)
-                
-                # If we detect corruption indicators, mark this as potential break point
-                if special_char_ratio > 0.4 or avg_word_len > 20:
-                    corruption_point = i
-                    break
+            # Check for sudden degradation in text quality, past the first 30% of the
+            # text (always kept: an early code block or table must not stop a
+            # corrupted tail from being cut, nor cut most of a response)
+            corruption_point = self._find_corruption_point(words, int(len(words) * 0.3) + 1)
             
-            # If we found a corruption point and it's not too early, truncate there
-            if corruption_point and corruption_point > len(words) * 0.3:  # At least 30% of text is good
+            # If we found a corruption point, truncate there
+            if corruption_point is not None:
                 # Find the last complete sentence before corruption
                 truncated_text = ' '.join(words[:corruption_point])
                 # Find last sentence ending
@@ -169,6 +215,38 @@ class ResponseValidator:
         
         return text
     
+    def _find_corruption_point(self, words: List[str], start: int = 0) -> Optional[int]:
+        """
+        Find the first word from `start` on where a 20-word window around it looks corrupted
+        
+        Prefix sums of special-character counts and word lengths give each window's
+        ratios in O(1), so the whole text is scanned in O(n). Windows at the edges
+        are clamped to the text.
+        
+        Returns:
+            Index of the word where corruption starts, or None
+        """
+        special_prefix = list(accumulate(
+            (0 if word.isalnum() else len(self._SPECIAL_CHAR.findall(word)) for word in words),
+            initial=0
+        ))
+        length_prefix = list(accumulate(map(len, words), initial=0))
+        
+        word_count = len(words)
+        for i in range(start, word_count):
+            low = i - 10 if i > 10 else 0
+            high = i + 10 if i + 10 < word_count else word_count
+            window_words = high - low
+            window_chars = length_prefix[high] - length_prefix[low]
+            # Ratio over the window joined with single spaces
+            special_char_ratio = (special_prefix[high] - special_prefix[low]) / (window_chars + window_words - 1)
+            
+            # If we detect corruption indicators, mark this as the break point
+            if special_char_ratio > 0.4 or window_chars / window_words > 20:
+                return i
+        
+        return None
+    
     def should_reject_response(self, text: str, finish_reason: str = "stop") -> Tuple[bool, str]:
         """
         Determine if a response should be rejected
@@ -0,0 +1,145 @@
+"""
+TF-IDF Index - Sparse (CSR) term index over an experiment's prompt and responses
+"""
+import math
+import re
+import threading
+from array import array
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+_TOKEN_PATTERN = re.compile(r'\w+')
+
+_STOP_WORDS = frozenset("""
+a an and are as at be been but by can do does for from had has have how i if in into
+is it its me my no not of on or our so such than that the their them then there these
+they this to too was we were what when where which who why will with you your
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens, without stop words and single characters"""
+    return [
+        token for token in _TOKEN_PATTERN.findall(text.lower())
+        if len(token) > 1 and token not in _STOP_WORDS
+    ]
+
+
+class TfidfIndex:
+    """
+    Append-only TF-IDF index stored as a CSR matrix
+
+    Rows hold sublinear term frequencies (1 + log tf); IDF weights are applied at
+    query time from document frequencies, so adding a document never rewrites
+    existing rows. Row 0 is the experiment prompt.
+
+    Rows are appended to growable array buffers; queries run on a NumPy snapshot
+    of the matrix (IDF-weighted data, row of every entry, row norms) that is
+    rebuilt only after rows were added.
+    """
+
+    def __init__(self, prompt: str):
+        self.vocabulary: Dict[str, int] = {}
+        # CSR storage
+        self.indptr = array('i', [0])
+        self.indices = array('i')
+        self.data = array('d')
+        # Per-row metadata: (response_id, temperature, top_p), None for the prompt row
+        self.rows: List[Optional[Tuple[int, float, float]]] = []
+        # Row of every indexed response
+        self.row_by_id: Dict[int, int] = {}
+        # data_version of the experiment when responses were last added
+        self.version: Optional[int] = None
+        self._lock = threading.Lock()
+        self._snapshot: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]] = None
+        self._add_row(prompt, None)
+
+    def add_responses(self, responses: List, version: Optional[int] = None) -> None:
+        """Append responses (objects with id, temperature, top_p, text); already indexed ones are skipped"""
+        with self._lock:
+            for response in responses:
+                if response.id in self.row_by_id:
+                    continue
+                self._add_row(response.text, (response.id, response.temperature, response.top_p))
+            if version is not None:
+                self.version = version
+
+    def _add_row(self, text: str, meta: Optional[Tuple[int, float, float]]) -> None:
+        """Append one document row (caller holds the lock)"""
+        counts = Counter(tokenize(text))
+        for term, tf in sorted(counts.items()):
+            column = self.vocabulary.get(term)
+            if column is None:
+                column = len(self.vocabulary)
+                self.vocabulary[term] = column
+            self.indices.append(column)
+            self.data.append(1.0 + math.log(tf))
+        self.indptr.append(len(self.indices))
+        if meta is not None:
+            self.row_by_id[meta[0]] = len(self.rows)
+        self.rows.append(meta)
+        # IDF and norms depend on every row; recompute lazily on next query
+        self._snapshot = None
+
+    def _matrix(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Get (indptr, indices, weighted data, row of each entry, row L2 norms) of the IDF-weighted matrix
+
+        A term occurs at most once per row, so document frequencies are the
+        column counts of the indices. Caller holds the lock.
+        """
+        if self._snapshot is None:
+            # Copies: a NumPy view would keep the array buffers from growing
+            indptr = np.array(self.indptr, dtype=np.intc)
+            indices = np.array(self.indices, dtype=np.intc)
+            data = np.array(self.data, dtype=np.float64)
+            n_docs = len(self.rows)
+            doc_freq = np.bincount(indices, minlength=len(self.vocabulary))
+            idf = np.log((1 + n_docs) / (1 + doc_freq)) + 1.0
+            weighted = data * idf[indices]
+            entry_rows = np.repeat(np.arange(n_docs), np.diff(indptr))
+            norms = np.sqrt(np.bincount(entry_rows, weights=weighted * weighted, minlength=n_docs))
+            self._snapshot = (indptr, indices, weighted, entry_rows, norms)
+        return self._snapshot
+
+    def _row_similarities(self, query_row: int) -> np.ndarray:
+        """Cosine similarity of one row against every row (one sparse matrix-vector product)"""
+        with self._lock:
+            indptr, indices, weighted, entry_rows, norms = self._matrix()
+
+            start, end = indptr[query_row], indptr[query_row + 1]
+            query = np.zeros(len(self.vocabulary))
+            query[indices[start:end]] = weighted[start:end]
+
+            dots = np.bincount(entry_rows, weights=weighted * query[indices], minlength=len(norms))
+            denominators = norms * norms[query_row]
+            return np.divide(dots, denominators, out=np.zeros(len(norms)), where=denominators > 0)
+
+    def prompt_relevance(self) -> Dict[int, float]:
+        """Get the cosine similarity of each response to the prompt, by response ID"""
+        similarities = self._row_similarities(0).tolist()
+        return {meta[0]: round(similarity, 3) for meta, similarity in zip(self.rows[1:], similarities[1:])}
+
+    def most_similar(self, response_id: int, limit: int) -> Optional[List[dict]]:
+        """Get the responses most similar to a response (None if it is not indexed)"""
+        query_row = self.row_by_id.get(response_id)
+        if query_row is None:
+            return None
+
+        similarities = self._row_similarities(query_row)
+        # Neither the prompt row nor the response itself is a candidate
+        similarities[0] = similarities[query_row] = -np.inf
+        rows = np.arange(len(similarities))
+        # Highest similarity first, ties by higher row
+        top = np.lexsort((-rows, -similarities))[:max(0, min(limit, len(similarities) - 2))]
+        return [
+            {
+                "response_id": self.rows[row][0],
+                "temperature": self.rows[row][1],
+                "top_p": self.rows[row][2],
+                "similarity": round(float(similarities[row]), 3)
+            }
+            for row in top.tolist()
+        ]
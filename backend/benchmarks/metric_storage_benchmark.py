@@ -0,0 +1,269 @@
+"""
+Benchmark - Metric storage (six metric rows per response vs. metric columns on responses)
+
+Builds both layouts side by side in a scratch schema of the database at
+DATABASE_URL: the former one (responses plus a metrics table with its indexes)
+and the current one (metric columns and a metric_metadata document on
+responses, one (value, id) index per metric). Metrics are calculated by
+MetricCalculator from synthetic texts. Reports:
+
+- insert rate, one transaction per response as during generation (the former
+  layout wrote the response and its metrics in two transactions)
+- table plus index size of each layout
+- latency of the metrics summary queries (aggregates, per-response values) and
+  of the metric columns read by CSV exports, per experiment
+
+The schema is dropped afterwards.
+
+Usage (from backend/, PostgreSQL required):
+    python -m benchmarks.metric_storage_benchmark
+"""
+import random
+import statistics
+import time
+
+from sqlalchemy import text
+
+from app.core.constants import METRIC_NAMES
+from app.core.metric_storage import column_values, compact_metadata
+from app.core.serialization import dumps
+from app.db.database import engine
+from app.services.metric_calculator import MetricCalculator
+
+SCHEMA = "metric_storage_benchmark"
+EXPERIMENT_COUNT = 20
+RESPONSES_PER_EXPERIMENT = 1000
+TIMED_INSERTS = 2000
+ROUNDS = 20
+WORDS = (
+    "the model response explains how temperature and top p change sampling "
+    "diversity while keeping answers coherent readable and complete however "
+    "in summary finally"
+).split()
+
+SCHEMA_SQL = f"""
+CREATE SCHEMA {SCHEMA};
+SET search_path TO {SCHEMA};
+
+CREATE TABLE narrow_responses (
+    id SERIAL PRIMARY KEY,
+    experiment_id INTEGER NOT NULL,
+    temperature DOUBLE PRECISION NOT NULL,
+    top_p DOUBLE PRECISION NOT NULL,
+    text TEXT NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX ON narrow_responses(experiment_id, id);
+CREATE TABLE narrow_metrics (
+    id SERIAL PRIMARY KEY,
+    response_id INTEGER NOT NULL REFERENCES narrow_responses(id) ON DELETE CASCADE,
+    name VARCHAR(100) NOT NULL,
+    value DOUBLE PRECISION NOT NULL,
+    metadata_json JSONB,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX ON narrow_metrics(response_id);
+CREATE INDEX ON narrow_metrics(value);
+CREATE INDEX ON narrow_metrics(response_id, name);
+CREATE INDEX ON narrow_metrics(name, value, id) INCLUDE (response_id);
+
+CREATE TABLE wide_responses (
+    id SERIAL PRIMARY KEY,
+    experiment_id INTEGER NOT NULL,
+    temperature DOUBLE PRECISION NOT NULL,
+    top_p DOUBLE PRECISION NOT NULL,
+    text TEXT NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    {", ".join(f"{name} DOUBLE PRECISION" for name in METRIC_NAMES)},
+    metric_metadata JSONB
+);
+CREATE INDEX ON wide_responses(experiment_id, id);
+{" ".join(f"CREATE INDEX ON wide_responses({name}, id);" for name in METRIC_NAMES)}
+"""
+
+# Metrics summary (get_experiment_aggregates / get_experiment_points) and CSV export reads
+NARROW_QUERIES = {
+    "summary aggregates": """
+        SELECT m.name, count(m.value), avg(m.value),
+               percentile_cont(0.5) WITHIN GROUP (ORDER BY m.value),
+               min(m.value), max(m.value), stddev_samp(m.value)
+        FROM narrow_metrics m JOIN narrow_responses r ON r.id = m.response_id
+        WHERE r.experiment_id = :experiment_id
+        GROUP BY m.name
+    """,
+    "summary points": """
+        SELECT m.name, m.response_id, r.temperature, r.top_p, m.value
+        FROM narrow_metrics m JOIN narrow_responses r ON r.id = m.response_id
+        WHERE r.experiment_id = :experiment_id
+        ORDER BY r.id, m.id
+    """,
+    "export metric columns": f"""
+        SELECT r.id, r.temperature, r.top_p,
+               {", ".join(f"max(m.value) FILTER (WHERE m.name = '{name}') AS {name}" for name in METRIC_NAMES)}
+        FROM narrow_responses r LEFT JOIN narrow_metrics m ON m.response_id = r.id
+        WHERE r.experiment_id = :experiment_id
+        GROUP BY r.id
+        ORDER BY r.id
+    """,
+}
+WIDE_QUERIES = {
+    "summary aggregates": f"""
+        SELECT {", ".join(
+            f"count({name}), avg({name}), percentile_cont(0.5) WITHIN GROUP (ORDER BY {name}), "
+            f"min({name}), max({name}), stddev_samp({name})"
+            for name in METRIC_NAMES
+        )}
+        FROM wide_responses
+        WHERE experiment_id = :experiment_id
+    """,
+    "summary points": f"""
+        SELECT id, temperature, top_p, {", ".join(METRIC_NAMES)}
+        FROM wide_responses
+        WHERE experiment_id = :experiment_id
+        ORDER BY id
+    """,
+    "export metric columns": f"""
+        SELECT id, temperature, top_p, {", ".join(METRIC_NAMES)}
+        FROM wide_responses
+        WHERE experiment_id = :experiment_id
+        ORDER BY id
+    """,
+}
+
+
+def make_responses():
+    """(experiment_id, temperature, top_p, text, metrics) of every response"""
+    rng = random.Random(7)
+    calculator = MetricCalculator()
+    responses = []
+    for experiment_id in range(1, EXPERIMENT_COUNT + 1):
+        for _ in range(RESPONSES_PER_EXPERIMENT):
+            sentences = [
+                " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 20))).capitalize() + "."
+                for _ in range(rng.randint(2, 12))
+            ]
+            response_text = " ".join(sentences)
+            responses.append((
+                experiment_id,
+                rng.choice([0.0, 0.3, 0.7, 1.0, 1.5]),
+                rng.choice([0.5, 0.9, 1.0]),
+                response_text,
+                calculator.calculate_all_metrics(response_text)
+            ))
+    return responses
+
+
+def insert_narrow(cursor, connection, response, commit: bool) -> None:
+    """Former write path: the response, then its metric rows"""
+    experiment_id, temperature, top_p, response_text, metrics = response
+    cursor.execute(
+        "INSERT INTO narrow_responses (experiment_id, temperature, top_p, text) VALUES (%s, %s, %s, %s) RETURNING id",
+        (experiment_id, temperature, top_p, response_text)
+    )
+    response_id = cursor.fetchone()[0]
+    if commit:
+        connection.commit()
+    cursor.executemany(
+        "INSERT INTO narrow_metrics (response_id, name, value, metadata_json) VALUES (%s, %s, %s, %s)",
+        [
+            (response_id, name, metric["value"], dumps(metric["metadata"]).decode("utf-8"))
+            for name, metric in metrics.items()
+        ]
+    )
+    if commit:
+        connection.commit()
+
+
+def insert_wide(cursor, connection, response, commit: bool) -> None:
+    """Current write path: one row with the metric columns"""
+    experiment_id, temperature, top_p, response_text, metrics = response
+    values = column_values(metrics)
+    cursor.execute(
+        f"INSERT INTO wide_responses (experiment_id, temperature, top_p, text, {', '.join(METRIC_NAMES)}, metric_metadata) "
+        f"VALUES (%s, %s, %s, %s, {', '.join(['%s'] * len(METRIC_NAMES))}, %s)",
+        (experiment_id, temperature, top_p, response_text)
+        + tuple(values[name] for name in METRIC_NAMES)
+        + (dumps(compact_metadata(metrics, values)).decode("utf-8"),)
+    )
+    if commit:
+        connection.commit()
+
+
+def load(name: str, insert, connection, responses) -> None:
+    """Insert all responses; the first TIMED_INSERTS one transaction per response, timed"""
+    cursor = connection.cursor()
+    start = time.perf_counter()
+    for response in responses[:TIMED_INSERTS]:
+        insert(cursor, connection, response, commit=True)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<8} insert  {TIMED_INSERTS / elapsed:8.0f} responses/s   ({elapsed:.1f} s for {TIMED_INSERTS})")
+
+    for response in responses[TIMED_INSERTS:]:
+        insert(cursor, connection, response, commit=False)
+    connection.commit()
+    cursor.execute("ANALYZE")
+    connection.commit()
+
+
+def table_size(connection, tables) -> int:
+    """Bytes of the tables with their indexes and TOAST data"""
+    cursor = connection.cursor()
+    cursor.execute(
+        f"SELECT sum(pg_total_relation_size('{SCHEMA}.' || name)) FROM unnest(%s) AS name",
+        (list(tables),)
+    )
+    return int(cursor.fetchone()[0])
+
+
+def bench_query(sql: str) -> tuple:
+    """p50 and p95 latency of a query over every experiment, ROUNDS times"""
+    timings = []
+    with engine.connect() as connection:
+        connection.execute(text(f"SET search_path TO {SCHEMA}"))
+        statement = text(sql)
+        for _ in range(ROUNDS):
+            for experiment_id in range(1, EXPERIMENT_COUNT + 1):
+                start = time.perf_counter()
+                connection.execute(statement, {"experiment_id": experiment_id}).all()
+                timings.append(time.perf_counter() - start)
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.95) - 1]
+
+
+def main():
+    responses = make_responses()
+    print(f"{len(responses)} responses in {EXPERIMENT_COUNT} experiments, {len(METRIC_NAMES)} metrics each")
+
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        cursor.execute(SCHEMA_SQL)
+        connection.commit()
+
+        load("narrow", insert_narrow, connection, responses)
+        load("wide", insert_wide, connection, responses)
+
+        narrow_size = table_size(connection, ["narrow_responses", "narrow_metrics"])
+        wide_size = table_size(connection, ["wide_responses"])
+        metrics_size = table_size(connection, ["narrow_metrics"])
+        print(f"narrow   size    {narrow_size / 2 ** 20:8.1f} MB (metrics table and indexes: {metrics_size / 2 ** 20:.1f} MB)")
+        print(f"wide     size    {wide_size / 2 ** 20:8.1f} MB")
+
+        for name in NARROW_QUERIES:
+            narrow_p50, narrow_p95 = bench_query(NARROW_QUERIES[name])
+            wide_p50, wide_p95 = bench_query(WIDE_QUERIES[name])
+            print(
+                f"{name:<22} narrow p50 {narrow_p50 * 1000:6.2f} ms  p95 {narrow_p95 * 1000:6.2f} ms   "
+                f"wide p50 {wide_p50 * 1000:6.2f} ms  p95 {wide_p95 * 1000:6.2f} ms   "
+                f"{narrow_p50 / wide_p50:4.1f}x"
+            )
+    finally:
+        cursor = connection.cursor()
+        cursor.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        connection.commit()
+        connection.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Benchmark - Response list serialization (Pydantic round trips vs. direct JSON bytes)
+
+Builds the payload of a 1,000-response experiment from in-memory rows the way
+GET /api/responses/experiment/{id} did before (MetricData / ValidationMetadata
+models per row, then FastAPI validating and serializing against
+List[ResponseWithMetrics]) and the way it does now (plain dicts serialized
+straight to bytes), checks both produce the same JSON, and reports throughput
+and latency of each.
+
+Usage (from backend/):
+    python -m benchmarks.serialization_benchmark
+"""
+import json
+import random
+import statistics
+import time
+import warnings
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import List
+
+from pydantic import TypeAdapter
+
+from app.core import serialization
+from app.schemas.response import MetricData, ResponseWithMetrics, ValidationMetadata
+from app.services.response_service import ResponseService
+
+RESPONSE_COUNT = 1000
+ROUNDS = 30
+METRIC_NAMES = [
+    "length_score", "coherence_score", "completeness_score",
+    "structure_score", "readability_score", "overall_score",
+]
+WORDS = (
+    "the model response explains how temperature and top p change sampling "
+    "diversity while keeping answers coherent readable and complete"
+).split()
+
+_response_list = TypeAdapter(List[ResponseWithMetrics])
+
+
+def make_rows(count: int):
+    """Response rows and metric rows shaped like the repository results"""
+    rng = random.Random(7)
+    created = datetime(2026, 1, 1, 12, 0, 0)
+    responses, metrics = [], {}
+    for i in range(1, count + 1):
+        responses.append(SimpleNamespace(
+            id=i,
+            experiment_id=1,
+            temperature=round(rng.choice([0.0, 0.3, 0.7, 1.0, 1.5]), 1),
+            top_p=round(rng.choice([0.5, 0.9, 1.0]), 1),
+            max_tokens=1000,
+            text=" ".join(rng.choice(WORDS) for _ in range(300)),
+            finish_reason="stop",
+            validation_metadata={
+                "is_valid": True,
+                "is_corrupted": False,
+                "is_truncated": False,
+                "corruption_score": round(rng.random() * 0.3, 3),
+                "warnings": [],
+            },
+            created_at=created + timedelta(seconds=i),
+        ))
+        metrics[i] = [
+            SimpleNamespace(
+                response_id=i,
+                name=name,
+                value=round(rng.random(), 4),
+                metadata_json={"word_count": rng.randint(50, 400), "sentence_count": rng.randint(3, 30)},
+            )
+            for name in METRIC_NAMES
+        ]
+    return responses, metrics
+
+
+def legacy_serialize(responses, metrics) -> bytes:
+    """Previous read path: models per metric, dicts, then response_model validation"""
+    result = []
+    for response in responses:
+        metrics_data = [
+            MetricData(name=m.name, value=m.value, metadata=m.metadata_json).dict()
+            for m in metrics[response.id]
+        ]
+        validation_metadata = None
+        if response.validation_metadata:
+            validation_metadata = ValidationMetadata(**response.validation_metadata).dict()
+        result.append({
+            "id": response.id,
+            "experiment_id": response.experiment_id,
+            "temperature": response.temperature,
+            "top_p": response.top_p,
+            "max_tokens": response.max_tokens,
+            "text": response.text,
+            "finish_reason": response.finish_reason,
+            "validation_metadata": validation_metadata,
+            "created_at": response.created_at.isoformat() if response.created_at else "",
+            "metrics": metrics_data,
+        })
+    # What FastAPI does with response_model=List[ResponseWithMetrics]
+    validated = _response_list.validate_python(result)
+    content = _response_list.dump_python(validated, mode="json")
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def fast_serialize(responses, metrics) -> bytes:
+    """Current read path: payload dicts straight to JSON bytes"""
+    return serialization.dumps([
+        ResponseService._to_payload(response, metrics[response.id])
+        for response in responses
+    ])
+
+
+def bench(name: str, func, responses, metrics) -> float:
+    """Time one serializer; prints latency percentiles and throughput"""
+    func(responses, metrics)  # warm up
+    timings = []
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        func(responses, metrics)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    p50 = statistics.median(timings)
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(
+        f"{name:<28} p50 {p50 * 1000:7.1f} ms   p95 {p95 * 1000:7.1f} ms   "
+        f"{1 / p50:6.1f} req/s   {RESPONSE_COUNT / p50:9.0f} responses/s"
+    )
+    return p50
+
+
+def main():
+    warnings.filterwarnings("ignore", category=DeprecationWarning)
+    responses, metrics = make_rows(RESPONSE_COUNT)
+
+    legacy = json.loads(legacy_serialize(responses, metrics))
+    fast = json.loads(fast_serialize(responses, metrics))
+    assert legacy == fast, "serialized payloads differ"
+    print(f"Payloads identical ({len(fast)} responses, orjson={'yes' if serialization.USE_ORJSON else 'no'})")
+
+    before = bench("before (models + validation)", legacy_serialize, responses, metrics)
+    after = bench("after (dicts + dumps)", fast_serialize, responses, metrics)
+
+    if serialization.USE_ORJSON:
+        serialization.USE_ORJSON = False
+        bench("after, json fallback", fast_serialize, responses, metrics)
+        serialization.USE_ORJSON = True
+
+    print(f"Speedup: {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
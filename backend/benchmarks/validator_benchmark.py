@@ -0,0 +1,119 @@
+"""
+Benchmark - ResponseValidator corruption scan (precompiled patterns with prefilters vs. per-pattern scans)
+
+Checks that the current scan gives the same validation results as the previous
+implementation, then times both on ~4k-token responses at several noise rates.
+
+Usage (from backend/):
+    python -m benchmarks.validator_benchmark
+"""
+import random
+import re
+import string
+import time
+
+from app.services.response_validator import ResponseValidator
+
+WORDS = (
+    "the model response explains how temperature and top p change sampling "
+    "diversity while keeping answers coherent readable and complete however "
+    "higher values increase randomness therefore outputs vary"
+).split()
+NOISE = [
+    "import os", "from typing import List", "def main(", "const x =", "var y =",
+    "class Foo", "function bar(a, b) {", "<script>alert(1)</script>", "app.js",
+    "ABCDEFGHIJKLMNOPQRSTU", "aaaaaaaaaaaaaaaaaaaaaaaa", "12345678901234", "!!!!!!!!!!!!",
+    "thisisaverylongwordthatlooksgibberish", "...", "(see notes)", "e.g.", "--",
+]
+
+
+def legacy_scan(text: str):
+    """Indicator counts as computed before the prefilters (one full scan per pattern)"""
+    corruption_indicators = 0
+    for pattern in ResponseValidator.CORRUPTION_PATTERNS:
+        corruption_indicators += len(re.findall(pattern, text))
+    code_matches = sum(
+        1 for pattern in ResponseValidator.CODE_PATTERNS
+        if re.search(pattern, text, re.IGNORECASE | re.DOTALL)
+    )
+    special_chars = len(re.findall(r'[^\w\s]', text))
+    return corruption_indicators, code_matches, special_chars
+
+
+class LegacyValidator(ResponseValidator):
+    """Validator using the per-pattern scans"""
+
+    def _scan_indicators(self, text: str):
+        return legacy_scan(text)
+
+
+def make_response(rng: random.Random, tokens: int, noise_rate: float) -> str:
+    """Build a synthetic response of roughly the given number of tokens"""
+    parts = []
+    for i in range(tokens):
+        parts.append(rng.choice(NOISE) if rng.random() < noise_rate else rng.choice(WORDS))
+        if i % 15 == 14:
+            parts[-1] += rng.choice([".", ",", "!", "?", ".\n\n"])
+    return " ".join(parts)
+
+
+def check_parity(validator: ResponseValidator, rng: random.Random, samples: int = 20000) -> None:
+    """Compare current and legacy indicator counts and results on random and adversarial texts"""
+    legacy = LegacyValidator()
+    alphabet = string.ascii_letters + string.digits + string.punctuation + " \n" + "é漢_ſKİı"
+    pieces = list(alphabet) + NOISE + [
+        string.ascii_lowercase, string.ascii_uppercase, "Abcdefghijklmnop", "0123456789",
+        "<script", "</script>", "script", ".py", "import", "from", "class", "def", "claſs", "IMPORT",
+        "function", "const", "var", "=", "(", ")", "{", "!!!!!", ".....",
+    ]
+    for i in range(samples):
+        if i % 3 == 0:
+            text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 300)))
+        elif i % 3 == 1:
+            text = "".join(rng.choice(pieces) for _ in range(rng.randint(0, 60)))
+        else:
+            text = make_response(rng, rng.randint(0, 200), noise_rate=0.3)
+        expected = legacy_scan(text)
+        actual = validator._scan_indicators(text)
+        assert actual == expected, f"Mismatch for {text!r}: {actual} != {expected}"
+        for reason in ("stop", "length"):
+            assert validator._validate_response(text, reason) == legacy._validate_response(text, reason)
+
+
+def bench(fn, texts, repeat: int = 5) -> float:
+    """Best-of-N time in ms per text"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in texts:
+            fn(text)
+        best = min(best, time.perf_counter() - start)
+    return best / len(texts) * 1000
+
+
+def main() -> None:
+    rng = random.Random(42)
+    validator = ResponseValidator()
+
+    check_parity(validator, rng)
+    print("parity: scan matches per-pattern scans")
+    legacy = LegacyValidator()
+
+    for noise_rate in (0.0, 0.02, 0.1):
+        texts = [make_response(rng, 4000, noise_rate) for _ in range(20)]
+        legacy_ms = bench(legacy_scan, texts)
+        current_ms = bench(validator._scan_indicators, texts)
+        print(
+            f"4k tokens, noise {noise_rate:>4}: legacy {legacy_ms:7.3f} ms, "
+            f"current {current_ms:7.3f} ms, speedup {legacy_ms / current_ms:4.1f}x"
+        )
+        legacy_ms = bench(lambda text: legacy._validate_response(text, "stop"), texts)
+        current_ms = bench(lambda text: validator._validate_response(text, "stop"), texts)
+        print(
+            f"  full _validate_response: legacy {legacy_ms:7.3f} ms, "
+            f"current {current_ms:7.3f} ms, speedup {legacy_ms / current_ms:4.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -4,11 +4,14 @@ Main application entry point
 """
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
 
-from app.api.routes import experiments, responses, metrics, export
+from app.api.routes import experiments, responses, metrics, export, imports
+from app.api.caching import EncodedETagMiddleware
 from app.core.config import settings
+from app.core.cache import get_cache_stats
 from app.db.database import init_db
 
 
@@ -35,13 +38,20 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor"],
 )
 
+# Compress large payloads (response lists, summaries, exports) for clients that accept gzip
+app.add_middleware(GZipMiddleware, minimum_size=1000)
+# Outside GZipMiddleware: weak ETags for compressed bodies, Vary on every cacheable response
+app.add_middleware(EncodedETagMiddleware)
+
 # Include routers
 app.include_router(experiments.router, prefix="/api/experiments", tags=["experiments"])
 app.include_router(responses.router, prefix="/api/responses", tags=["responses"])
 app.include_router(metrics.router, prefix="/api/metrics", tags=["metrics"])
 app.include_router(export.router, prefix="/api/export", tags=["export"])
+app.include_router(imports.router, prefix="/api/import", tags=["import"])
 
 
 @app.get("/")
@@ -56,6 +66,12 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/health/cache")
+async def cache_stats():
+    """Size and hit rate of the in-process caches"""
+    return get_cache_stats()
+
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
     """Global exception handler"""
@@ -0,0 +1,5 @@
+-- Migration: MinHash signatures on responses
+-- Database: Supabase (PostgreSQL)
+-- Description: Stores a packed MinHash signature (64 x uint32) per response for diversity metrics
+
+ALTER TABLE responses ADD COLUMN IF NOT EXISTS minhash_signature BYTEA;
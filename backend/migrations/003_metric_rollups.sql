@@ -0,0 +1,42 @@
+-- Migration: Metric rollups
+-- Database: Supabase (PostgreSQL)
+-- Description: Running statistics per (experiment, metric, temperature, top_p), maintained on every metric insert
+
+CREATE TABLE IF NOT EXISTS metric_rollups (
+    experiment_id INTEGER NOT NULL,
+    metric_name VARCHAR(100) NOT NULL,
+    temperature DOUBLE PRECISION NOT NULL,
+    top_p DOUBLE PRECISION NOT NULL,
+    count INTEGER NOT NULL,
+    sum DOUBLE PRECISION NOT NULL,
+    sum_sq DOUBLE PRECISION NOT NULL,
+    mean DOUBLE PRECISION NOT NULL,
+    m2 DOUBLE PRECISION NOT NULL,
+    min DOUBLE PRECISION NOT NULL,
+    max DOUBLE PRECISION NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (experiment_id, metric_name, temperature, top_p),
+    CONSTRAINT fk_metric_rollups_experiment
+        FOREIGN KEY (experiment_id)
+        REFERENCES experiments(id)
+        ON DELETE CASCADE
+);
+
+-- Backfill from existing metrics (same as `python -m app.cli rebuild-rollups`)
+INSERT INTO metric_rollups (experiment_id, metric_name, temperature, top_p, count, sum, sum_sq, mean, m2, min, max)
+SELECT
+    r.experiment_id,
+    m.name,
+    r.temperature,
+    r.top_p,
+    COUNT(m.value),
+    SUM(m.value),
+    SUM(m.value * m.value),
+    AVG(m.value),
+    COALESCE(VAR_POP(m.value) * COUNT(m.value), 0),
+    MIN(m.value),
+    MAX(m.value)
+FROM metrics m
+JOIN responses r ON r.id = m.response_id
+GROUP BY r.experiment_id, m.name, r.temperature, r.top_p
+ON CONFLICT DO NOTHING;
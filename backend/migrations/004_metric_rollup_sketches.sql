@@ -0,0 +1,8 @@
+-- Migration: Quantile sketches on metric rollups
+-- Database: Supabase (PostgreSQL)
+-- Description: Stores a mergeable KLL quantile sketch per rollup row for metric percentiles
+
+ALTER TABLE metric_rollups ADD COLUMN IF NOT EXISTS sketch JSONB;
+
+-- Sketches are built in Python; fill them for existing rows with:
+--   python -m app.cli rebuild-rollups
@@ -0,0 +1,10 @@
+-- Migration: Model name on experiments
+-- Database: Supabase (PostgreSQL)
+-- Description: Records which LLM generated an experiment's responses (filter for cross-experiment heatmaps)
+
+ALTER TABLE experiments ADD COLUMN IF NOT EXISTS model VARCHAR(100);
+
+CREATE INDEX IF NOT EXISTS ix_experiments_model ON experiments(model);
+
+-- Rollups are filtered by metric first, then joined to experiments
+CREATE INDEX IF NOT EXISTS ix_metric_rollups_metric_name ON metric_rollups(metric_name);
@@ -0,0 +1,9 @@
+-- Migration: Leaderboard index on metrics
+-- Database: Supabase (PostgreSQL)
+-- Description: Composite (name, value, id) index so top/bottom-k queries per metric read
+--              index entries in order and page by keyset; covers response_id for the join
+
+CREATE INDEX IF NOT EXISTS idx_metrics_name_value_id ON metrics(name, value, id) INCLUDE (response_id);
+
+-- idx_metrics_name is a prefix of the new index
+DROP INDEX IF EXISTS idx_metrics_name;
@@ -0,0 +1,9 @@
+-- Migration: Keyset index on responses
+-- Database: Supabase (PostgreSQL)
+-- Description: (experiment_id, id) index so an experiment's responses are read in ID order,
+--              one page at a time, for /api/responses/experiment/{id}?after_id=&limit=
+
+CREATE INDEX IF NOT EXISTS idx_responses_experiment_id_id ON responses(experiment_id, id);
+
+-- idx_responses_experiment_id is a prefix of the new index
+DROP INDEX IF EXISTS idx_responses_experiment_id;
@@ -0,0 +1,9 @@
+-- Migration: Full-text search on responses
+-- Database: Supabase (PostgreSQL)
+-- Description: Generated tsvector of the response text with a GIN index, for
+--              /api/responses/search?q= (kept current on insert by Postgres itself)
+
+ALTER TABLE responses ADD COLUMN IF NOT EXISTS search_vector TSVECTOR
+    GENERATED ALWAYS AS (to_tsvector('english', text)) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_responses_search_vector ON responses USING GIN (search_vector);
@@ -0,0 +1,13 @@
+-- Migration: Experiment completion time
+-- Database: Supabase (PostgreSQL)
+-- Description: completed_at is set when an experiment's generation finishes. From then on its
+--              responses and exports are immutable and served with long-lived cache headers.
+
+ALTER TABLE experiments ADD COLUMN IF NOT EXISTS completed_at TIMESTAMP WITH TIME ZONE;
+
+-- Experiments created before this migration have finished generating
+UPDATE experiments SET completed_at = COALESCE(
+    (SELECT MAX(created_at) FROM responses WHERE responses.experiment_id = experiments.id),
+    experiments.created_at
+)
+WHERE completed_at IS NULL;
@@ -0,0 +1,91 @@
+-- Migration: Wide metric storage
+-- Database: Supabase (PostgreSQL)
+-- Description: Metrics move from six rows per response in `metrics` to typed columns on
+--              responses plus one optional JSONB document of their metadata. `metrics`
+--              becomes a view with the former table's columns, so metric rows can still be read.
+--              overall_score's component_scores repeat the other columns; they are not stored
+--              and the view rebuilds them.
+
+ALTER TABLE responses
+    ADD COLUMN IF NOT EXISTS length_score DOUBLE PRECISION,
+    ADD COLUMN IF NOT EXISTS coherence_score DOUBLE PRECISION,
+    ADD COLUMN IF NOT EXISTS completeness_score DOUBLE PRECISION,
+    ADD COLUMN IF NOT EXISTS structure_score DOUBLE PRECISION,
+    ADD COLUMN IF NOT EXISTS readability_score DOUBLE PRECISION,
+    ADD COLUMN IF NOT EXISTS overall_score DOUBLE PRECISION,
+    ADD COLUMN IF NOT EXISTS metric_metadata JSONB;
+
+-- Copy the metric rows onto their responses
+UPDATE responses r SET
+    length_score = m.length_score,
+    coherence_score = m.coherence_score,
+    completeness_score = m.completeness_score,
+    structure_score = m.structure_score,
+    readability_score = m.readability_score,
+    overall_score = m.overall_score,
+    metric_metadata = m.metric_metadata
+FROM (
+    SELECT
+        response_id,
+        MAX(value) FILTER (WHERE name = 'length_score') AS length_score,
+        MAX(value) FILTER (WHERE name = 'coherence_score') AS coherence_score,
+        MAX(value) FILTER (WHERE name = 'completeness_score') AS completeness_score,
+        MAX(value) FILTER (WHERE name = 'structure_score') AS structure_score,
+        MAX(value) FILTER (WHERE name = 'readability_score') AS readability_score,
+        MAX(value) FILTER (WHERE name = 'overall_score') AS overall_score,
+        jsonb_object_agg(
+            name,
+            CASE WHEN name = 'overall_score' THEN metadata_json - 'component_scores' ELSE metadata_json END
+        ) FILTER (WHERE metadata_json IS NOT NULL AND name IN (
+            'length_score', 'coherence_score', 'completeness_score',
+            'structure_score', 'readability_score', 'overall_score'
+        )) AS metric_metadata
+    FROM metrics
+    GROUP BY response_id
+) m
+WHERE r.id = m.response_id;
+
+-- Kept until the new layout has been checked (metrics with other names are only found here):
+--     DROP TABLE metrics_legacy;
+ALTER TABLE metrics RENAME TO metrics_legacy;
+DROP INDEX IF EXISTS idx_metrics_name_value_id;
+-- Responses are deleted without touching the legacy rows
+ALTER TABLE metrics_legacy DROP CONSTRAINT IF EXISTS fk_metrics_response;
+ALTER TABLE metrics_legacy DROP CONSTRAINT IF EXISTS metrics_response_id_fkey;
+
+-- Former metrics table shape; IDs are response ID * 8 + position of the metric
+CREATE OR REPLACE VIEW metrics AS
+SELECT
+    r.id::bigint * 8 + m.ordinal AS id,
+    r.id AS response_id,
+    m.name::varchar(100) AS name,
+    m.value,
+    m.metadata AS metadata_json,
+    r.created_at
+FROM responses r
+CROSS JOIN LATERAL (VALUES
+    (0, 'length_score', r.length_score, r.metric_metadata -> 'length_score'),
+    (1, 'coherence_score', r.coherence_score, r.metric_metadata -> 'coherence_score'),
+    (2, 'completeness_score', r.completeness_score, r.metric_metadata -> 'completeness_score'),
+    (3, 'structure_score', r.structure_score, r.metric_metadata -> 'structure_score'),
+    (4, 'readability_score', r.readability_score, r.metric_metadata -> 'readability_score'),
+    (5, 'overall_score', r.overall_score,
+        CASE WHEN (r.metric_metadata -> 'overall_score') -> 'component_scores' IS NULL
+        THEN (r.metric_metadata -> 'overall_score') || jsonb_build_object('component_scores', jsonb_build_object(
+            'length_score', r.length_score,
+            'coherence_score', r.coherence_score,
+            'completeness_score', r.completeness_score,
+            'structure_score', r.structure_score,
+            'readability_score', r.readability_score
+        ))
+        ELSE (r.metric_metadata -> 'overall_score') END)
+) AS m(ordinal, name, value, metadata)
+WHERE m.value IS NOT NULL;
+
+-- Leaderboards: ordered scan of one metric's values, keyset on (value, id)
+CREATE INDEX IF NOT EXISTS idx_responses_length_score_id ON responses(length_score, id);
+CREATE INDEX IF NOT EXISTS idx_responses_coherence_score_id ON responses(coherence_score, id);
+CREATE INDEX IF NOT EXISTS idx_responses_completeness_score_id ON responses(completeness_score, id);
+CREATE INDEX IF NOT EXISTS idx_responses_structure_score_id ON responses(structure_score, id);
+CREATE INDEX IF NOT EXISTS idx_responses_readability_score_id ON responses(readability_score, id);
+CREATE INDEX IF NOT EXISTS idx_responses_overall_score_id ON responses(overall_score, id);
@@ -0,0 +1,7 @@
+-- Migration: Experiment data version
+-- Database: Supabase (PostgreSQL)
+-- Description: data_version is incremented in the same transaction as every write to an
+--              experiment's responses, metrics or rollups. Cached payloads are keyed by it, so
+--              writes from any API worker or CLI process invalidate them.
+
+ALTER TABLE experiments ADD COLUMN IF NOT EXISTS data_version BIGINT NOT NULL DEFAULT 0;
@@ -0,0 +1,45 @@
+"""
+Shared test fixtures
+
+Unit tests need no database. Tests using the `db` fixture run against the
+PostgreSQL database at TEST_DATABASE_URL (tables are created with init_db;
+each test removes the experiments it creates) and are skipped without it.
+
+Usage (from backend/):
+    python -m pytest
+    TEST_DATABASE_URL=postgresql+psycopg2://postgres@localhost/llmlab_test python -m pytest
+"""
+import os
+
+import pytest
+
+# Settings are read on import; the engine needs a URL even when no test connects
+os.environ["DATABASE_URL"] = os.environ.get(
+    "TEST_DATABASE_URL", "postgresql+psycopg2://test@localhost/llmlab_test"
+)
+
+
+@pytest.fixture(scope="session")
+def database():
+    """Initialized test database (skips the test without TEST_DATABASE_URL)"""
+    if not os.environ.get("TEST_DATABASE_URL"):
+        pytest.skip("TEST_DATABASE_URL is not set")
+    from app.db.database import init_db
+    init_db()
+
+
+@pytest.fixture
+def db(database):
+    """Session on the test database; experiments created through it are deleted afterwards"""
+    from app.db.database import SessionLocal
+    from app.repositories.experiment_repository import ExperimentRepository
+    
+    session = SessionLocal()
+    before = set(ExperimentRepository.get_all_ids(session))
+    try:
+        yield session
+    finally:
+        session.rollback()
+        for experiment_id in set(ExperimentRepository.get_all_ids(session)) - before:
+            ExperimentRepository.delete(session, experiment_id)
+        session.close()
@@ -0,0 +1,79 @@
+"""
+ResponseValidator.clean_text truncation at the corruption point
+"""
+import random
+import re
+
+from app.services.response_validator import ResponseValidator
+
+SENTENCE = "The model answers the question in plain words and explains each step clearly."
+CODE_BLOCK = "def main(): {x[0]: y[1] for (x, y) in zip(a, b)}; return {'k': [1, 2, 3]}; # !@#$%^&*()"
+GARBAGE = "#$%&*@!^~ ;;;{{}}[[]] <<>>||\\\\ ^^^%%%$$$ ***&&&@@@ !!??!!?? ~~~```"
+
+
+def baseline_clean_text(text: str) -> str:
+    """clean_text as it was before prefix sums: windows over the last 100 words only"""
+    words = text.split()
+    if len(words) > 50:
+        corruption_point = None
+        for i in range(len(words) - 100, len(words)):
+            if i < 0:
+                continue
+            section = ' '.join(words[max(0, i - 10):i + 10])
+            special_char_ratio = len(re.findall(r'[^\w\s]', section)) / max(len(section), 1)
+            window = words[max(0, i - 10):i + 10]
+            avg_word_len = sum(len(w) for w in window) / max(len(window), 1)
+            if special_char_ratio > 0.4 or avg_word_len > 20:
+                corruption_point = i
+                break
+        if corruption_point and corruption_point > len(words) * 0.3:
+            truncated_text = ' '.join(words[:corruption_point])
+            last_period = max(truncated_text.rfind('.'), truncated_text.rfind('!'), truncated_text.rfind('?'))
+            if last_period > len(truncated_text) * 0.8:
+                text = truncated_text[:last_period + 1]
+            else:
+                text = truncated_text
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'\n{3,}', '\n\n', text)
+    return text.strip()
+
+
+def test_early_code_block_does_not_prevent_cutting_a_corrupted_tail():
+    text = " ".join([SENTENCE] * 2 + [CODE_BLOCK] * 3 + [SENTENCE] * 12 + [GARBAGE] * 4)
+    cleaned = ResponseValidator().clean_text(text)
+    
+    assert cleaned.endswith(SENTENCE)
+    assert GARBAGE.split()[0] not in cleaned
+    # The early code block is kept: only the tail is cut
+    assert CODE_BLOCK in cleaned
+
+
+def test_corruption_only_in_the_first_30_percent_is_not_cut():
+    text = " ".join([GARBAGE] * 3 + [SENTENCE] * 20)
+    assert ResponseValidator().clean_text(text) == " ".join(text.split())
+
+
+def test_corruption_in_the_middle_of_a_long_text_is_cut():
+    # Beyond the last 100 words, where the baseline did not look
+    text = " ".join([SENTENCE] * 10 + [GARBAGE] * 3 + [SENTENCE] * 20)
+    cleaned = ResponseValidator().clean_text(text)
+    
+    # Cut at the last sentence ending before the window that reaches the garbage
+    assert cleaned.endswith(SENTENCE)
+    assert " ".join([SENTENCE] * 8) in cleaned
+    assert GARBAGE.split()[0] not in cleaned
+    assert baseline_clean_text(text) == " ".join(text.split())
+
+
+def test_matches_baseline_when_corruption_is_in_the_last_100_words():
+    rng = random.Random(30)
+    noise = ["word", "text", "!!!!", "a.b.c;", "x" * 30, "ok,", "{[(<>)]}", "end."]
+    validator = ResponseValidator()
+    for _ in range(2000):
+        word_count = rng.randint(51, 300)
+        words = ["plain"] * max(0, word_count - 90) + [
+            rng.choice(noise) if rng.random() < 0.2 else "plain"
+            for _ in range(min(word_count, 90))
+        ]
+        text = " ".join(words)
+        assert validator.clean_text(text) == baseline_clean_text(text), text
@@ -0,0 +1,94 @@
+"""
+Keyset pagination cursors: encoding round-trips and walking paginated endpoints
+"""
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.constants import METRIC_NAMES
+from app.core.pagination import decode_cursor, encode_cursor
+from app.repositories.experiment_repository import ExperimentRepository
+from app.repositories.response_repository import ResponseRepository
+
+
+@pytest.mark.parametrize("values", [
+    (0.8731, 42),
+    (-1.5e-300, 2 ** 53),
+    (datetime(2024, 2, 29, 23, 59, 59, 999999, tzinfo=timezone.utc).isoformat(), 7),
+    ("naïve ünïcode ✓ / + =", 0),
+    (None, 1, 2.0),
+])
+def test_cursor_round_trip(values):
+    cursor = encode_cursor(*values)
+
+    assert decode_cursor(cursor, len(values)) == values
+    # Opaque URL-safe text without padding
+    assert not set(cursor) - set("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_")
+
+
+def test_float_keys_survive_exactly():
+    for value in (0.1 + 0.2, 1 / 3, 123456.789e-12):
+        assert decode_cursor(encode_cursor(value, 1), 2)[0] == value
+
+
+@pytest.mark.parametrize("cursor", ["", "not a cursor", "e30", encode_cursor(1), encode_cursor(1, 2, 3), "%%%"])
+def test_malformed_cursors_are_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, 2)
+
+
+def walk(client: TestClient, url: str, params: dict, next_cursor) -> list:
+    """Every page of a paginated endpoint; next_cursor(response) gives the next cursor or None"""
+    pages = []
+    cursor = None
+    while True:
+        response = client.get(url, params={**params, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        pages.append(response)
+        cursor = next_cursor(response)
+        if cursor is None:
+            return pages
+
+
+def test_experiment_list_pages_cover_every_experiment_once(db):
+    import main
+    client = TestClient(main.app)
+    name = f"cursor-{uuid.uuid4().hex}"
+    created = [ExperimentRepository.create(db=db, name=f"{name}-{i}", prompt="p").id for i in range(7)]
+
+    pages = walk(
+        client, "/api/experiments/", {"limit": 2, "name": name},
+        lambda response: response.headers.get("x-next-cursor")
+    )
+
+    listed = [experiment["id"] for page in pages for experiment in page.json()]
+    assert len(pages) == 4
+    assert listed == sorted(created, reverse=True)
+
+
+def test_leaderboard_pages_break_ties_by_id(db):
+    import main
+    client = TestClient(main.app)
+    experiment = ExperimentRepository.create(db=db, name="cursor-leaderboard", prompt="p")
+    metric = METRIC_NAMES[0]
+    # Repeated values: the cursor's ID keeps pages from skipping or repeating tied rows
+    response_ids = [
+        ResponseRepository.create(
+            db=db, experiment_id=experiment.id, temperature=1.93, top_p=0.123, max_tokens=10,
+            text="An answer.", finish_reason="stop", metrics={metric: {"value": value}}
+        ).id
+        for value in (0.5, 0.5, 0.5, 0.25, 0.75, 0.5, 0.25)
+    ]
+
+    pages = walk(
+        client, "/api/metrics/leaderboard",
+        {"metric": metric, "limit": 3, "min_temperature": 1.93, "max_temperature": 1.93,
+         "min_top_p": 0.123, "max_top_p": 0.123},
+        lambda response: response.json()["next_cursor"]
+    )
+
+    entries = [entry for page in pages for entry in page.json()["entries"]]
+    assert sorted(entry["response_id"] for entry in entries) == sorted(response_ids)
+    assert [entry["value"] for entry in entries] == [0.75, 0.5, 0.5, 0.5, 0.5, 0.25, 0.25]
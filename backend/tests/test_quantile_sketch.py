@@ -0,0 +1,71 @@
+"""
+KLLSketch rank error, merging and serialization
+"""
+import bisect
+import random
+
+import numpy as np
+import pytest
+
+from app.core.quantile_sketch import KLLSketch
+
+FRACTIONS = [i / 100 for i in range(1, 100)]
+
+# Normalized rank error allowed for k=128 (observed about 1% on 50,000 values)
+MAX_RANK_ERROR = 0.02
+
+
+def rank_error(sketch: KLLSketch, values: list) -> float:
+    """Largest distance between requested and actual normalized rank of an estimate"""
+    ordered = sorted(values)
+    return max(
+        abs(bisect.bisect_left(ordered, estimate) / len(ordered) - fraction)
+        for fraction, estimate in zip(FRACTIONS, sketch.quantiles(FRACTIONS))
+    )
+
+
+def total_weight(sketch: KLLSketch) -> int:
+    return sum(len(items) << level for level, items in enumerate(sketch.levels))
+
+
+def test_small_sketch_is_exact_like_percentile_cont():
+    values = [random.Random(1).uniform(0, 10) for _ in range(100)]
+    sketch = KLLSketch.from_values(values)
+
+    assert sketch.quantiles(FRACTIONS) == pytest.approx(np.percentile(values, [f * 100 for f in FRACTIONS]).tolist())
+    assert sketch.quantiles([0.0, 1.0]) == [min(values), max(values)]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_rank_error_is_bounded(seed):
+    rng = random.Random(seed)
+    values = [rng.lognormvariate(0, 1) for _ in range(50000)]
+    sketch = KLLSketch.from_values(values)
+
+    assert total_weight(sketch) == sketch.n == len(values)
+    assert sum(map(len, sketch.levels)) < 4 * sketch.k
+    assert rank_error(sketch, values) <= MAX_RANK_ERROR
+
+
+def test_merged_sketches_summarize_the_union():
+    rng = random.Random(7)
+    first = [rng.gauss(0, 1) for _ in range(30000)]
+    second = [rng.gauss(3, 2) for _ in range(20000)]
+    merged = KLLSketch.from_values(first)
+    merged.merge(KLLSketch.from_values(second))
+
+    assert total_weight(merged) == merged.n == len(first) + len(second)
+    assert (merged.min, merged.max) == (min(first + second), max(first + second))
+    assert rank_error(merged, first + second) <= MAX_RANK_ERROR
+
+
+def test_serialization_round_trip_and_reproducibility():
+    values = [random.Random(3).random() for _ in range(10000)]
+    sketch = KLLSketch.from_values(values)
+    restored = KLLSketch.from_dict(sketch.to_dict())
+
+    assert restored.to_dict() == sketch.to_dict() == KLLSketch.from_values(values).to_dict()
+    restored.update(0.5)
+    sketch.update(0.5)
+    assert restored.to_dict() == sketch.to_dict()
+    assert KLLSketch.from_dict(None).quantiles([0.5]) == [None]
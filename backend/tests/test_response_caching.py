@@ -0,0 +1,62 @@
+"""
+Versioned (immutable) and current (revalidated) URLs of single responses
+"""
+from unittest import mock
+
+from fastapi.testclient import TestClient
+
+from app.repositories.experiment_repository import ExperimentRepository
+from app.repositories.response_repository import ResponseRepository
+from app.services.metric_calculator import MetricCalculator
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+def completed_response(db):
+    experiment = ExperimentRepository.create(db=db, name="caching", prompt="Say something")
+    text = "A short answer that is long enough to keep."
+    response = ResponseRepository.create(
+        db=db, experiment_id=experiment.id, temperature=0.7, top_p=1.0, max_tokens=100,
+        text=text, finish_reason="stop", validation_metadata={"is_valid": True},
+        metrics=MetricCalculator().calculate_all_metrics(text)
+    )
+    ExperimentRepository.mark_completed(db, experiment.id)
+    return experiment.id, response.id
+
+
+def test_versioned_url_is_immutable_and_served_from_the_cache(db):
+    import main
+    client = TestClient(main.app)
+    experiment_id, response_id = completed_response(db)
+    version = client.get(f"/api/experiments/{experiment_id}").json()["data_version"]
+
+    current = client.get(f"/api/responses/{response_id}")
+    assert current.headers["cache-control"] == "no-cache"
+    assert current.headers["content-location"] == f"/api/responses/{response_id}?v={version}"
+
+    versioned = client.get(f"/api/responses/{response_id}?v={version}")
+    assert versioned.headers["cache-control"] == IMMUTABLE
+    assert versioned.content == current.content
+
+    with mock.patch.object(ResponseRepository, "get_experiment_version", side_effect=AssertionError):
+        cached = client.get(f"/api/responses/{response_id}?v={version}")
+    assert cached.headers["cache-control"] == IMMUTABLE
+    assert cached.content == current.content
+
+
+def test_outdated_version_gets_the_current_body_revalidated(db):
+    import main
+    client = TestClient(main.app)
+    experiment_id, response_id = completed_response(db)
+    version = client.get(f"/api/experiments/{experiment_id}").json()["data_version"]
+    ExperimentRepository.bump_version(db, experiment_id)
+    db.commit()
+
+    stale = client.get(f"/api/responses/{response_id}?v={version - 1}")
+    assert stale.headers["cache-control"] == "no-cache"
+    assert stale.headers["content-location"] == f"/api/responses/{response_id}?v={version + 1}"
+
+    export = client.get(f"/api/export/experiment/{experiment_id}/csv?v={version}")
+    assert export.headers["cache-control"] == "no-cache"
+    export = client.get(f"/api/export/experiment/{experiment_id}/csv?v={version + 1}")
+    assert export.headers["cache-control"] == IMMUTABLE
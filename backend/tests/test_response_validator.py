@@ -0,0 +1,142 @@
+"""
+ResponseValidator corruption scan parity with the baseline per-pattern scans
+"""
+import random
+import re
+import string
+
+import pytest
+
+from app.services.response_validator import ResponseValidator
+
+# CORRUPTION_PATTERNS and CODE_PATTERNS as they were before precompilation and prefilters
+BASELINE_CORRUPTION_PATTERNS = [
+    r'[a-zA-Z]{20,}',
+    r'[^\w\s]{10,}',
+    r'[A-Z]{15,}',
+    r'[a-z]{20,}',
+    r'\d{10,}',
+]
+BASELINE_CODE_PATTERNS = [
+    r'<script[^>]*>.*?</script>',
+    r'function\s+\w+\s*\([^)]*\)\s*\{',
+    r'import\s+\w+',
+    r'from\s+\w+\s+import',
+    r'class\s+\w+',
+    r'def\s+\w+\s*\(',
+    r'const\s+\w+\s*=',
+    r'var\s+\w+\s*=',
+    r'\.(js|py|html|css|json|xml)\b',
+]
+
+CODE_SAMPLES = [
+    "Here is the fix:\n\n```python\nimport os\nfrom typing import List\n\nclass Loader:\n    def load(self, path):\n        return open(path).read()\n```",
+    "<script type=\"text/javascript\">alert('hi');</script> then call function render(props) { return null; }",
+    "const total = items.reduce((a, b) => a + b, 0); var x = 1; let y = 2;",
+    "Save it as app.js, styles.css and data.json; the config lives in settings.PY or index.HTML.",
+    "IMPORT SYS\nFROM OS IMPORT PATH\nCLASS Foo:\n    DEF bar(self): pass",
+    "<SCRIPT>\nmulti\nline\n</SCRIPT>",
+]
+MARKDOWN_SAMPLES = [
+    "# Overview\n\n- **Temperature** controls randomness.\n- *Top p* limits the nucleus.\n\n| a | b |\n|---|---|\n| 1 | 2 |",
+    "## Steps\n\n1. Install the package.\n2. Run `python -m app.cli import data.ndjson`.\n3. Open [the docs](https://example.com/docs?page=1&q=x).",
+    "> Note: results vary between runs.\n\n---\n\n**Summary**: higher values -> more diverse outputs!!!",
+]
+CORRUPTED_SAMPLES = [
+    "The answer is aaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaa and ABCDEFGHIJKLMNOPQRSTUVWXYZ and 123456789012345.",
+    "Normal start. #$%^&*()_+{}|:<>?~`!@#$%^&* garbage !!!!!!!!!!!!!!!!!!!!!!",
+    "thisisaverylongwordthatlooksgibberish AnotherVeryLongMixedCaseWordHereNow xXxXxXxXxXxXxXxXxXxXxX",
+    "ok",
+    "",
+    "claſs Foo and ımport os and İMPORT sys and Kelvin K",
+]
+
+
+def baseline_indicators(text: str):
+    """(corruption indicator count, code patterns found, special characters) per the baseline scans"""
+    corruption_indicators = sum(len(re.findall(pattern, text)) for pattern in BASELINE_CORRUPTION_PATTERNS)
+    code_matches = sum(
+        1 for pattern in BASELINE_CODE_PATTERNS
+        if re.search(pattern, text, re.IGNORECASE | re.DOTALL)
+    )
+    special_chars = len(re.findall(r'[^\w\s]', text))
+    return corruption_indicators, code_matches, special_chars
+
+
+def baseline_validation(text: str, finish_reason: str) -> dict:
+    """Baseline validate_response without the cleaned text (cleaning is tested in test_clean_text)"""
+    warnings = []
+    is_truncated = finish_reason == "length"
+    if is_truncated:
+        warnings.append("Response was truncated due to max_tokens limit")
+    corruption_indicators, code_matches, special_chars = baseline_indicators(text)
+    if special_chars / max(len(text), 1) > 0.3:
+        corruption_indicators += 1
+    words = text.split()
+    if words and sum(len(w) for w in words) / len(words) > 15:
+        corruption_indicators += 1
+    corruption_score = min(1.0, corruption_indicators / len(BASELINE_CORRUPTION_PATTERNS))
+    if code_matches > 2:
+        corruption_score += 0.3
+        warnings.append("Response contains code-like patterns")
+    if len(text.strip()) < 10:
+        corruption_score = 1.0
+        warnings.append("Response is extremely short")
+    elif corruption_score > 0.5:
+        warnings.append("Response may be corrupted or low quality")
+    is_corrupted = corruption_score > 0.6 or (is_truncated and corruption_score > 0.3)
+    return {
+        "is_valid": not is_corrupted and len(text.strip()) > 0,
+        "is_corrupted": is_corrupted,
+        "is_truncated": is_truncated,
+        "corruption_score": round(corruption_score, 3),
+        "warnings": warnings,
+        "original_length": len(text),
+    }
+
+
+def random_texts(count: int):
+    """Random character soups and concatenations of pattern fragments"""
+    rng = random.Random(29)
+    alphabet = string.ascii_letters + string.digits + string.punctuation + " \n" + "é漢_ſKİı"
+    pieces = list(alphabet) + CODE_SAMPLES + MARKDOWN_SAMPLES + CORRUPTED_SAMPLES + [
+        string.ascii_lowercase, string.ascii_uppercase, "0123456789", "<script", "</script>",
+        ".py", "import", "from", "class", "def", "function", "const", "var", "=", "(", ")", "{",
+    ]
+    for i in range(count):
+        if i % 2:
+            yield "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 200)))
+        else:
+            yield " ".join(rng.choice(pieces) for _ in range(rng.randint(0, 30)))
+
+
+CORPUS = CODE_SAMPLES + MARKDOWN_SAMPLES + CORRUPTED_SAMPLES
+
+
+def test_code_patterns_are_the_baseline_patterns():
+    assert ResponseValidator.CODE_PATTERNS == BASELINE_CODE_PATTERNS
+    assert ResponseValidator.CORRUPTION_PATTERNS == BASELINE_CORRUPTION_PATTERNS
+
+
+@pytest.mark.parametrize("text", CORPUS)
+@pytest.mark.parametrize("finish_reason", ["stop", "length"])
+def test_validation_matches_baseline_on_corpus(text, finish_reason):
+    validator = ResponseValidator()
+    assert validator._scan_indicators(text) == baseline_indicators(text)
+    
+    validation = validator._validate_response(text, finish_reason)
+    assert {key: validation[key] for key in baseline_validation(text, finish_reason)} == baseline_validation(text, finish_reason)
+
+
+def test_scan_matches_baseline_on_random_texts():
+    validator = ResponseValidator()
+    for text in random_texts(5000):
+        assert validator._scan_indicators(text) == baseline_indicators(text), text
+
+
+def test_code_pattern_literals_occur_in_every_match():
+    for text in list(CORPUS) + list(random_texts(2000)):
+        for pattern, literal in ResponseValidator.CODE_PATTERN_LITERALS:
+            for match in re.finditer(pattern, text, re.IGNORECASE | re.DOTALL):
+                if match.group().isascii():
+                    assert literal in match.group().lower(), (pattern, match.group())
@@ -0,0 +1,85 @@
+"""
+Incremental rollups (RollupRepository.apply_metrics) against a full rebuild
+"""
+import random
+
+import pytest
+
+from app.core.constants import METRIC_NAMES
+from app.core.quantile_sketch import KLLSketch
+from app.repositories.experiment_repository import ExperimentRepository
+from app.repositories.metric_repository import MetricRepository
+from app.repositories.response_repository import ResponseRepository
+from app.repositories.rollup_repository import RollupRepository
+
+STATISTICS = ("count", "sum", "sum_sq", "mean", "m2", "min", "max")
+
+
+def snapshot(db, experiment_id: int) -> dict:
+    """{(metric, temperature, top_p): (statistics, sketch)} of an experiment's rollups"""
+    db.expire_all()
+    return {
+        (rollup.metric_name, rollup.temperature, rollup.top_p): (
+            tuple(getattr(rollup, name) for name in STATISTICS),
+            rollup.sketch
+        )
+        for rollup in RollupRepository.get_by_experiment_id(db, experiment_id)
+    }
+
+
+def test_apply_metrics_matches_rebuild(db):
+    rng = random.Random(11)
+    experiment = ExperimentRepository.create(db=db, name="rollups", prompt="Say something")
+    first, later = METRIC_NAMES[:4], METRIC_NAMES[4:6]
+
+    # One cell past the sketch's first compaction, one small cell
+    response_ids = []
+    for temperature, count in ((0.7, 200), (1.2, 15)):
+        for _ in range(count):
+            response = ResponseRepository.create(
+                db=db, experiment_id=experiment.id, temperature=temperature, top_p=0.9,
+                max_tokens=100, text="An answer.", finish_reason="stop",
+                metrics={name: {"value": rng.uniform(0, 1)} for name in first}
+            )
+            response_ids.append(response.id)
+    # Metrics added to existing responses are applied incrementally too
+    for response_id in response_ids:
+        MetricRepository.create_batch(db, response_id, {name: {"value": rng.gauss(5, 2)} for name in later})
+
+    incremental = snapshot(db, experiment.id)
+    RollupRepository.rebuild(db, experiment.id)
+    db.commit()
+    rebuilt = snapshot(db, experiment.id)
+
+    assert set(incremental) == set(rebuilt)
+    assert len(rebuilt) == 2 * len(first + later)
+    for key, (statistics, sketch) in rebuilt.items():
+        incremental_statistics, incremental_sketch = incremental[key]
+        assert incremental_statistics == pytest.approx(statistics, rel=1e-9, abs=1e-9)
+        # Values reach both sketches in response order
+        assert incremental_sketch == sketch
+        assert KLLSketch.from_dict(sketch).n == statistics[0]
+
+
+def test_overwritten_metric_rebuilds_its_cell(db):
+    experiment = ExperimentRepository.create(db=db, name="rollups", prompt="Say something")
+    name = METRIC_NAMES[0]
+    responses = [
+        ResponseRepository.create(
+            db=db, experiment_id=experiment.id, temperature=0.7, top_p=1.0,
+            max_tokens=100, text="An answer.", finish_reason="stop",
+            metrics={name: {"value": value}}
+        )
+        for value in (0.2, 0.4, 0.6)
+    ]
+    MetricRepository.create_batch(db, responses[0].id, {name: {"value": 1.0}})
+
+    incremental = snapshot(db, experiment.id)
+    RollupRepository.rebuild(db, experiment.id)
+    db.commit()
+    rebuilt = snapshot(db, experiment.id)
+
+    statistics, _ = rebuilt[(name, 0.7, 1.0)]
+    assert statistics[0] == 3
+    assert statistics[3] == pytest.approx(2.0 / 3)  # mean with the new value
+    assert incremental[(name, 0.7, 1.0)][0] == pytest.approx(statistics)
@@ -0,0 +1,29 @@
+"""
+TfidfIndex bookkeeping of indexed responses
+"""
+from types import SimpleNamespace
+
+from app.services.tfidf_index import TfidfIndex
+
+
+def response(response_id: int, text: str):
+    return SimpleNamespace(id=response_id, temperature=0.7, top_p=1.0, text=text)
+
+
+def test_a_lower_id_added_after_a_higher_one_is_indexed():
+    index = TfidfIndex("alpha beta")
+    index.add_responses([response(2, "alpha beta gamma")], version=1)
+    index.add_responses([response(1, "alpha beta delta")], version=2)
+    
+    assert set(index.row_by_id) == {1, 2}
+    assert set(index.prompt_relevance()) == {1, 2}
+    assert [similar["response_id"] for similar in index.most_similar(1, 5)] == [2]
+
+
+def test_indexed_responses_are_not_added_twice():
+    index = TfidfIndex("alpha beta")
+    index.add_responses([response(1, "alpha"), response(2, "beta")])
+    index.add_responses([response(2, "beta"), response(3, "gamma")])
+    
+    assert len(index.rows) == 4  # prompt row and three responses
+    assert index.most_similar(4, 5) is None
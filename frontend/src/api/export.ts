@@ -6,20 +6,22 @@ import { downloadBlob } from '../utils'
 
 export const exportApi = {
   /**
-   * Export experiment as CSV
+   * Export experiment as CSV (dataVersion makes the download cacheable as immutable)
    */
-  exportCSV: async (experimentId: number): Promise<void> => {
+  exportCSV: async (experimentId: number, dataVersion?: number): Promise<void> => {
     const response = await apiClient.get(`/export/experiment/${experimentId}/csv`, {
+      params: { v: dataVersion },
       responseType: 'blob',
     })
     downloadBlob(response.data, `experiment_${experimentId}.csv`)
   },
 
   /**
-   * Export experiment as JSON
+   * Export experiment as JSON (dataVersion makes the download cacheable as immutable)
    */
-  exportJSON: async (experimentId: number): Promise<void> => {
+  exportJSON: async (experimentId: number, dataVersion?: number): Promise<void> => {
     const response = await apiClient.get(`/export/experiment/${experimentId}/json`, {
+      params: { v: dataVersion },
       responseType: 'blob',
     })
     downloadBlob(response.data, `experiment_${experimentId}.json`)
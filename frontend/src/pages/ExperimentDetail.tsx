@@ -25,7 +25,7 @@ export default function ExperimentDetail() {
 
   const handleExportCSV = async () => {
     try {
-      await exportApi.exportCSV(experimentId)
+      await exportApi.exportCSV(experimentId, experiment?.data_version)
     } catch (error) {
       alert('Failed to export CSV: ' + (error as Error).message)
     }
@@ -33,7 +33,7 @@ export default function ExperimentDetail() {
 
   const handleExportJSON = async () => {
     try {
-      await exportApi.exportJSON(experimentId)
+      await exportApi.exportJSON(experimentId, experiment?.data_version)
     } catch (error) {
       alert('Failed to export JSON: ' + (error as Error).message)
     }
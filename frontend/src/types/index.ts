@@ -20,6 +20,7 @@ export interface Experiment {
 
 export interface ExperimentDetail extends Experiment {
   response_count: number
+  data_version: number
 }
 
 // Response types